@@ -0,0 +1,99 @@
+# Benchmark dos codecs de serialização do cache (pickle x json x msgpack, com e sem compressão)
+#
+# Uso: python benchmarks/bench_cache_codec.py [--repeticoes N]
+#
+# As cargas imitam as listas de opções (id, nome) de src/utils/opcoes.py
+# e listagens de parcelas, nos tamanhos típicos das nossas tabelas.
+import os
+import sys
+import time
+import random
+import datetime
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.cache_codec import CacheCodec, msgpack, lz4_frame
+
+NOMES = ['João', 'Maria', 'José', 'Ana', 'Antônio', 'Francisca', 'Carlos', 'Paulo', 'Luiza', 'Pedro']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Costa']
+MUNICIPIOS = ['Uberlândia', 'Rio Verde', 'Sorriso', 'Luís Eduardo Magalhães', 'Balsas', 'Chapadão do Sul']
+
+
+def pessoas_para_select(n):
+    return [{
+        'id': i,
+        'nome': f'{random.choice(NOMES)} {random.choice(SOBRENOMES)} {random.choice(SOBRENOMES)}',
+        'cpf_cnpj': f'{random.randint(0, 99999999999):011d}'
+    } for i in range(1, n + 1)]
+
+
+def fazendas_para_select(n):
+    return [{
+        'id': i,
+        'nome': f'Fazenda {random.choice(SOBRENOMES)} {i}',
+        'tamanho_total': round(random.uniform(10, 20000), 2)
+    } for i in range(1, n + 1)]
+
+
+def parcelas(n):
+    hoje = datetime.date.today()
+    return [{
+        'id': i,
+        'endividamento_id': i // 12 + 1,
+        'data_vencimento': hoje + datetime.timedelta(days=30 * (i % 120)),
+        'valor': Decimal(random.randint(10000, 5000000)) / 100,
+        'pago': bool(i % 3 == 0),
+        'municipio': random.choice(MUNICIPIOS)
+    } for i in range(1, n + 1)]
+
+
+def medir(codec, payload, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        serializado = codec.dumps(payload)
+    tempo_dumps = (time.perf_counter() - inicio) / repeticoes
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        codec.loads(serializado)
+    tempo_loads = (time.perf_counter() - inicio) / repeticoes
+    return len(serializado), tempo_dumps, tempo_loads
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos codecs de cache')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+    random.seed(42)
+
+    codecs = [('pickle', None), ('pickle', 'zlib'), ('json', None), ('json', 'zlib')]
+    if msgpack is not None:
+        codecs += [('msgpack', None), ('msgpack', 'zlib')]
+    if lz4_frame is not None:
+        codecs += [('json', 'lz4')] + ([('msgpack', 'lz4')] if msgpack is not None else [])
+
+    cargas = [
+        ('pessoas x 500', pessoas_para_select(500)),
+        ('pessoas x 20000', pessoas_para_select(20000)),
+        ('fazendas x 5000', fazendas_para_select(5000)),
+        ('parcelas x 10000', parcelas(10000)),
+    ]
+
+    print(f"{'carga':<18} {'codec':<16} {'bytes':>10} {'dumps (ms)':>11} {'loads (ms)':>11}")
+    for nome_carga, payload in cargas:
+        for codec_nome, compressao in codecs:
+            codec = CacheCodec(codec_nome, compressao, tamanho_minimo_compressao=1024)
+            tamanho, t_dumps, t_loads = medir(codec, payload, args.repeticoes)
+            rotulo = codec_nome + (f'+{compressao}' if compressao else '')
+            print(f'{nome_carga:<18} {rotulo:<16} {tamanho:>10} {t_dumps * 1000:>11.2f} {t_loads * 1000:>11.2f}')
+        print()
+    if msgpack is None:
+        print('msgpack não instalado: pip install msgpack para incluí-lo na comparação')
+    if lz4_frame is None:
+        print('lz4 não instalado: pip install lz4 para incluí-lo na comparação')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Benchmark da inicialização da aplicação (imports + create_app) em processos novos
+#
+# Uso: python benchmarks/bench_startup.py [--repeticoes N] [--db-init startup|lazy|off]
+#
+# Cada medição roda em um interpretador novo, como um worker do gunicorn ou uma
+# tarefa do maintenance.py. Metas: create_app() abaixo de 200ms com DB_INIT=off
+# e importação de src.main abaixo de 1,5s. A última linha mede create_worker_app(),
+# usada pelo maintenance.py.
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, time, io, contextlib
+inicio = time.perf_counter()
+from src.main import {fabrica}
+importado = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    {fabrica}({{'SQLALCHEMY_DATABASE_URI': {uri!r}, 'SECRET_KEY': 'bench', 'DB_INIT': {db_init!r}}})
+fim = time.perf_counter()
+print(json.dumps({{'import': importado - inicio, 'create_app': fim - importado}}))
+"""
+
+META_CREATE_APP = 0.2
+META_IMPORTACAO = 1.5
+
+
+def medir(db_init, uri, fabrica='create_app'):
+    saida = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(uri=uri, db_init=db_init, fabrica=fabrica)],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da inicialização da aplicação')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--db-init', choices=['startup', 'lazy', 'off'], default=None,
+                        help='Modo de inicialização do banco (padrão: todos)')
+    args = parser.parse_args()
+
+    modos = [args.db_init] if args.db_init else ['startup', 'lazy', 'off']
+    with tempfile.TemporaryDirectory() as diretorio:
+        uri = f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+        print(f"{'DB_INIT':<10}{'import (ms)':>14}{'create_app (ms)':>18}{'total (ms)':>14}")
+        perfis = [(modo, modo, 'create_app') for modo in modos] + [('worker', 'off', 'create_worker_app')]
+        for rotulo, modo, fabrica in perfis:
+            medicoes = [medir(modo, uri, fabrica) for _ in range(args.repeticoes)]
+            importacao = statistics.median(m['import'] for m in medicoes) * 1000
+            criacao = statistics.median(m['create_app'] for m in medicoes) * 1000
+            acima = criacao >= META_CREATE_APP * 1000 or importacao >= META_IMPORTACAO * 1000
+            marca = '  (acima da meta)' if acima else ''
+            print(f"{rotulo:<10}{importacao:>14.1f}{criacao:>18.1f}{importacao + criacao:>14.1f}{marca}")
+
+
+if __name__ == '__main__':
+    main()
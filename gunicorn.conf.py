@@ -0,0 +1,21 @@
+# Configuração do gunicorn (carregada automaticamente a partir da raiz do projeto)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _diretorio_metricas():
+    return os.environ.get('METRICS_MULTIPROC_DIR') or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+
+def worker_exit(server, worker):
+    # No worker: grava o último snapshot (a persistência periódica é a cada 5s)
+    from src.utils.metrics import registry
+    registry.persist()
+
+
+def child_exit(server, worker):
+    # No master: o snapshot do worker encerrado é consolidado e removido
+    from src.utils.metrics import marcar_processo_encerrado
+    marcar_processo_encerrado(_diretorio_metricas(), worker.pid)
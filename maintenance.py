@@ -9,10 +9,12 @@ from datetime import datetime
 # Adicionar o diretório pai ao PYTHONPATH
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.main import create_app
+from src.main import create_worker_app
 from src.utils.tasks_notificacao import processar_notificacoes_endividamento
+from src.utils.outbox import processar_outbox, executar_worker
 from src.utils.performance import PerformanceOptimizer
 from src.utils.cache import cache
+from src.utils.dashboard import reconciliar
 
 # Configurar logging
 logging.basicConfig(
@@ -26,31 +28,68 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+_app = None
+
+def obter_app():
+    """Aplicação de workers (sem rotas), criada uma vez e reutilizada pelas tarefas do scheduler"""
+    global _app
+    if _app is None:
+        _app = create_worker_app()
+    return _app
+
 def executar_notificacoes():
     """Executa o processamento de notificações"""
     try:
-        app = create_app()
+        app = obter_app()
         with app.app_context():
             notificacoes_enviadas = processar_notificacoes_endividamento()
             logger.info(f"Processamento de notificações concluído. {notificacoes_enviadas} notificações enviadas.")
     except Exception as e:
         logger.error(f"Erro ao executar notificações: {e}")
 
+def drenar_outbox():
+    """Envia os e-mails pendentes da outbox"""
+    try:
+        app = obter_app()
+        with app.app_context():
+            processar_outbox()
+    except Exception as e:
+        logger.error(f"Erro ao drenar outbox de e-mails: {e}")
+
+def executar_worker_outbox():
+    """Worker local da outbox de e-mails (alternativa ao Celery)"""
+    app = obter_app()
+    with app.app_context():
+        try:
+            executar_worker()
+        except KeyboardInterrupt:
+            logger.info("Worker da outbox interrompido pelo usuário")
+
+def reconciliar_dashboard():
+    """Recalcula o resumo do dashboard a partir das tabelas, corrigindo desvios"""
+    try:
+        app = obter_app()
+        with app.app_context():
+            resumo = reconciliar()
+            logger.info(f"Resumo do dashboard reconciliado: {resumo}")
+    except Exception as e:
+        logger.error(f"Erro ao reconciliar resumo do dashboard: {e}")
+
 def limpar_cache():
     """Limpa cache antigo"""
     try:
-        app = create_app()
+        app = obter_app()
         with app.app_context():
             # Limpar cache de dashboard (atualizar a cada hora)
-            cache.clear_pattern('dashboard:*')
-            logger.info("Cache de dashboard limpo com sucesso")
+            removidas = cache.clear_pattern('dashboard:*', time_budget=5)
+            logger.info(f"Cache de dashboard limpo com sucesso ({removidas} chaves removidas)")
     except Exception as e:
         logger.error(f"Erro ao limpar cache: {e}")
 
 def otimizar_banco():
     """Executa otimizações no banco de dados"""
     try:
-        app = create_app()
+        app = obter_app()
         with app.app_context():
             optimizer = PerformanceOptimizer()
             optimizer.optimize_database_queries()
@@ -93,6 +132,13 @@ def agendar_tarefas():
     # Notificações - executar a cada hora
     schedule.every().hour.do(executar_notificacoes)
     
+    # Outbox de e-mails - drenar a cada minuto
+    schedule.every().minute.do(drenar_outbox)
+    
+    # Resumo do dashboard - reconciliar a cada hora e na virada do dia
+    schedule.every().hour.do(reconciliar_dashboard)
+    schedule.every().day.at("00:01").do(reconciliar_dashboard)
+    
     # Limpeza de cache - executar a cada 2 horas
     schedule.every(2).hours.do(limpar_cache)
     
@@ -104,6 +150,8 @@ def agendar_tarefas():
     
     logger.info("Tarefas de manutenção agendadas:")
     logger.info("- Notificações: a cada hora")
+    logger.info("- Outbox de e-mails: a cada minuto")
+    logger.info("- Resumo do dashboard: a cada hora e às 00:01")
     logger.info("- Limpeza de cache: a cada 2 horas")
     logger.info("- Otimização de banco: diariamente às 2:00")
     logger.info("- Backup de logs: semanalmente aos domingos às 3:00")
@@ -127,13 +175,17 @@ if __name__ == '__main__':
     import argparse
     
     parser = argparse.ArgumentParser(description='Sistema de manutenção e tarefas agendadas')
-    parser.add_argument('--task', choices=['notificacoes', 'cache', 'banco', 'backup', 'scheduler'], 
+    parser.add_argument('--task', choices=['notificacoes', 'outbox', 'dashboard', 'cache', 'banco', 'backup', 'scheduler'], 
                        help='Executar uma tarefa específica')
     
     args = parser.parse_args()
     
     if args.task == 'notificacoes':
         executar_notificacoes()
+    elif args.task == 'outbox':
+        executar_worker_outbox()
+    elif args.task == 'dashboard':
+        reconciliar_dashboard()
     elif args.task == 'cache':
         limpar_cache()
     elif args.task == 'banco':
@@ -143,11 +195,13 @@ if __name__ == '__main__':
     elif args.task == 'scheduler':
         executar_scheduler()
     else:
-        print("Uso: python maintenance.py --task [notificacoes|cache|banco|backup|scheduler]")
+        print("Uso: python maintenance.py --task [notificacoes|outbox|dashboard|cache|banco|backup|scheduler]")
         print("Ou execute sem argumentos para ver as opções disponíveis")
         
         print("\nTarefas disponíveis:")
         print("- notificacoes: Processar notificações de endividamento")
+        print("- outbox: Executar o worker da outbox de e-mails")
+        print("- dashboard: Reconciliar o resumo do dashboard")
         print("- cache: Limpar cache do sistema")
         print("- banco: Otimizar banco de dados")
         print("- backup: Fazer backup dos logs")
@@ -0,0 +1,201 @@
+"""Esquema inicial (tabelas anteriores às migrações)
+
+Revision ID: 9b1f0c7e3a25
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f0c7e3a25'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABELAS = (
+    'usuario', 'auditoria', 'pessoa', 'fazenda', 'pessoa_fazenda', 'documento', 'endividamento',
+    'endividamento_pessoa', 'endividamento_fazenda', 'parcela', 'notificacao_endividamento',
+    'historico_notificacao',
+)
+
+
+def upgrade():
+    # Bancos criados pelo create_all da aplicação já têm estas tabelas:
+    # só as que faltam são criadas (em um banco vazio, todas)
+    existentes = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'usuario' not in existentes:
+        op.create_table(
+            'usuario',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('nome', sa.String(100), nullable=False),
+            sa.Column('email', sa.String(120), nullable=False, unique=True),
+            sa.Column('senha_hash', sa.String(512), nullable=False),
+            sa.Column('criado_em', sa.DateTime(), nullable=True),
+        )
+
+    if 'auditoria' not in existentes:
+        op.create_table(
+            'auditoria',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('usuario_id', sa.Integer(), sa.ForeignKey('usuario.id'), nullable=True),
+            sa.Column('acao', sa.String(100), nullable=False),
+            sa.Column('entidade', sa.String(100), nullable=False),
+            sa.Column('valor_anterior', sa.Text(), nullable=True),
+            sa.Column('valor_novo', sa.Text(), nullable=True),
+            sa.Column('data_hora', sa.DateTime(), nullable=True),
+        )
+
+    if 'pessoa' not in existentes:
+        op.create_table(
+            'pessoa',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('nome', sa.String(100), nullable=False),
+            sa.Column('cpf_cnpj', sa.String(20), nullable=False),
+            sa.Column('email', sa.String(100), nullable=True),
+            sa.Column('telefone', sa.String(20), nullable=True),
+            sa.Column('endereco', sa.String(200), nullable=True),
+            sa.Column('data_criacao', sa.Date(), nullable=False),
+            sa.Column('data_atualizacao', sa.Date(), nullable=False),
+        )
+        op.create_index('ix_pessoa_nome', 'pessoa', ['nome'])
+        op.create_index('ix_pessoa_cpf_cnpj', 'pessoa', ['cpf_cnpj'], unique=True)
+        op.create_index('ix_pessoa_email', 'pessoa', ['email'])
+        op.create_index('idx_pessoa_nome_cpf', 'pessoa', ['nome', 'cpf_cnpj'])
+
+    if 'fazenda' not in existentes:
+        op.create_table(
+            'fazenda',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('nome', sa.String(100), nullable=False),
+            sa.Column('matricula', sa.String(50), nullable=False),
+            sa.Column('tamanho_total', sa.Float(), nullable=False),
+            sa.Column('area_consolidada', sa.Float(), nullable=False),
+            sa.Column('tamanho_disponivel', sa.Float(), nullable=False),
+            sa.Column('tipo_posse', sa.Enum('PROPRIA', 'ARRENDADA', 'COMODATO', 'POSSE', name='tipoposse'), nullable=False),
+            sa.Column('municipio', sa.String(100), nullable=False),
+            sa.Column('estado', sa.String(2), nullable=False),
+            sa.Column('recibo_car', sa.String(100), nullable=True),
+            sa.Column('data_criacao', sa.Date(), nullable=False),
+            sa.Column('data_atualizacao', sa.Date(), nullable=False),
+        )
+        op.create_index('ix_fazenda_nome', 'fazenda', ['nome'])
+        op.create_index('ix_fazenda_matricula', 'fazenda', ['matricula'], unique=True)
+        op.create_index('ix_fazenda_tipo_posse', 'fazenda', ['tipo_posse'])
+        op.create_index('ix_fazenda_municipio', 'fazenda', ['municipio'])
+        op.create_index('ix_fazenda_estado', 'fazenda', ['estado'])
+        op.create_index('idx_fazenda_tipo_posse', 'fazenda', ['tipo_posse'])
+        op.create_index('idx_fazenda_estado_municipio', 'fazenda', ['estado', 'municipio'])
+
+    if 'pessoa_fazenda' not in existentes:
+        op.create_table(
+            'pessoa_fazenda',
+            sa.Column('pessoa_id', sa.Integer(), sa.ForeignKey('pessoa.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('fazenda_id', sa.Integer(), sa.ForeignKey('fazenda.id', ondelete='CASCADE'), primary_key=True),
+        )
+        op.create_index('idx_pessoa_fazenda', 'pessoa_fazenda', ['pessoa_id', 'fazenda_id'])
+
+    if 'documento' not in existentes:
+        op.create_table(
+            'documento',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('nome', sa.String(100), nullable=False),
+            sa.Column('tipo', sa.Enum('CERTIDOES', 'CONTRATOS', 'DOCUMENTOS_AREA', 'OUTROS', name='tipodocumento'),
+                      nullable=False),
+            sa.Column('tipo_personalizado', sa.String(100), nullable=True),
+            sa.Column('data_emissao', sa.Date(), nullable=False),
+            sa.Column('data_vencimento', sa.Date(), nullable=True),
+            sa.Column('tipo_entidade', sa.Enum('FAZENDA', 'PESSOA', name='tipoentidade'), nullable=False),
+            sa.Column('fazenda_id', sa.Integer(), sa.ForeignKey('fazenda.id', ondelete='SET NULL'), nullable=True),
+            sa.Column('pessoa_id', sa.Integer(), sa.ForeignKey('pessoa.id', ondelete='SET NULL'), nullable=True),
+            sa.Column('emails_notificacao', sa.Text(), nullable=True),
+            sa.Column('prazos_notificacao', sa.Text(), nullable=True),
+            sa.Column('data_criacao', sa.Date(), nullable=False),
+            sa.Column('data_atualizacao', sa.Date(), nullable=False),
+        )
+        op.create_index('ix_documento_nome', 'documento', ['nome'])
+        op.create_index('ix_documento_tipo', 'documento', ['tipo'])
+        op.create_index('ix_documento_data_vencimento', 'documento', ['data_vencimento'])
+        op.create_index('ix_documento_tipo_entidade', 'documento', ['tipo_entidade'])
+        op.create_index('ix_documento_fazenda_id', 'documento', ['fazenda_id'])
+        op.create_index('ix_documento_pessoa_id', 'documento', ['pessoa_id'])
+        op.create_index('idx_documento_entidade_tipo', 'documento', ['tipo_entidade', 'tipo'])
+        op.create_index('idx_documento_tipo_vencimento', 'documento', ['tipo', 'data_vencimento'])
+
+    if 'endividamento' not in existentes:
+        op.create_table(
+            'endividamento',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('banco', sa.String(255), nullable=False),
+            sa.Column('numero_proposta', sa.String(255), nullable=False),
+            sa.Column('data_emissao', sa.Date(), nullable=False),
+            sa.Column('data_vencimento_final', sa.Date(), nullable=False),
+            sa.Column('taxa_juros', sa.Numeric(10, 4), nullable=False),
+            sa.Column('tipo_taxa_juros', sa.String(10), nullable=False),
+            sa.Column('prazo_carencia', sa.Integer(), nullable=True),
+            sa.Column('valor_operacao', sa.Numeric(15, 2), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+    if 'endividamento_pessoa' not in existentes:
+        op.create_table(
+            'endividamento_pessoa',
+            sa.Column('endividamento_id', sa.Integer(), sa.ForeignKey('endividamento.id'), primary_key=True),
+            sa.Column('pessoa_id', sa.Integer(), sa.ForeignKey('pessoa.id'), primary_key=True),
+        )
+
+    if 'endividamento_fazenda' not in existentes:
+        op.create_table(
+            'endividamento_fazenda',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('endividamento_id', sa.Integer(), sa.ForeignKey('endividamento.id'), nullable=False),
+            sa.Column('fazenda_id', sa.Integer(), sa.ForeignKey('fazenda.id'), nullable=True),
+            sa.Column('hectares', sa.Numeric(10, 2), nullable=True),
+            sa.Column('tipo', sa.String(50), nullable=False),
+            sa.Column('descricao', sa.Text(), nullable=True),
+        )
+
+    if 'parcela' not in existentes:
+        op.create_table(
+            'parcela',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('endividamento_id', sa.Integer(), sa.ForeignKey('endividamento.id'), nullable=False),
+            sa.Column('data_vencimento', sa.Date(), nullable=False),
+            sa.Column('valor', sa.Numeric(10, 2), nullable=False),
+            sa.Column('pago', sa.Boolean(), nullable=True),
+            sa.Column('data_pagamento', sa.Date(), nullable=True),
+            sa.Column('valor_pago', sa.Numeric(10, 2), nullable=True),
+            sa.Column('observacoes', sa.Text(), nullable=True),
+        )
+
+    if 'notificacao_endividamento' not in existentes:
+        op.create_table(
+            'notificacao_endividamento',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('endividamento_id', sa.Integer(), sa.ForeignKey('endividamento.id'), nullable=False),
+            sa.Column('emails', sa.Text(), nullable=False),
+            sa.Column('ativo', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+    if 'historico_notificacao' not in existentes:
+        op.create_table(
+            'historico_notificacao',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('endividamento_id', sa.Integer(), sa.ForeignKey('endividamento.id'), nullable=False),
+            sa.Column('tipo_notificacao', sa.String(20), nullable=False),
+            sa.Column('data_envio', sa.DateTime(), nullable=True),
+            sa.Column('emails_enviados', sa.Text(), nullable=False),
+            sa.Column('sucesso', sa.Boolean(), nullable=True),
+            sa.Column('erro_mensagem', sa.Text(), nullable=True),
+        )
+
+
+def downgrade():
+    for tabela in reversed(TABELAS):
+        op.drop_table(tabela)
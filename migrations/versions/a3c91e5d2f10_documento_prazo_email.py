@@ -0,0 +1,106 @@
+"""Tabelas documento_prazo e documento_email a partir das colunas JSON
+
+Revision ID: a3c91e5d2f10
+Revises: 9b1f0c7e3a25
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91e5d2f10'
+down_revision = '9b1f0c7e3a25'
+branch_labels = None
+depends_on = None
+
+LOTE = 1000
+
+
+def _ler_lista(bruto):
+    try:
+        valores = json.loads(bruto) if bruto else []
+    except (TypeError, ValueError):
+        return []
+    return valores if isinstance(valores, list) else []
+
+
+def _sem_repeticao(valores):
+    vistos = []
+    for valor in valores:
+        if valor not in vistos:
+            vistos.append(valor)
+    return vistos
+
+
+def _criar_tabelas(inspector):
+    # O create_all da aplicação pode já ter criado as tabelas (vazias)
+    tabelas = inspector.get_table_names()
+    if 'documento_prazo' not in tabelas:
+        op.create_table(
+            'documento_prazo',
+            sa.Column('documento_id', sa.Integer(), sa.ForeignKey('documento.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('dias', sa.Integer(), primary_key=True),
+            sa.Column('posicao', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.create_index('idx_documento_prazo_dias', 'documento_prazo', ['dias', 'documento_id'])
+    if 'documento_email' not in tabelas:
+        op.create_table(
+            'documento_email',
+            sa.Column('documento_id', sa.Integer(), sa.ForeignKey('documento.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('email', sa.String(255), primary_key=True),
+            sa.Column('posicao', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.create_index('idx_documento_email_email', 'documento_email', ['email'])
+
+
+def upgrade():
+    conexao = op.get_bind()
+    _criar_tabelas(sa.inspect(conexao))
+
+    documento = sa.table('documento', sa.column('id', sa.Integer),
+                         sa.column('prazos_notificacao', sa.Text), sa.column('emails_notificacao', sa.Text))
+    documento_prazo = sa.table('documento_prazo', sa.column('documento_id', sa.Integer),
+                               sa.column('dias', sa.Integer), sa.column('posicao', sa.Integer))
+    documento_email = sa.table('documento_email', sa.column('documento_id', sa.Integer),
+                               sa.column('email', sa.String), sa.column('posicao', sa.Integer))
+
+    # Só documentos que ainda não têm linhas filhas (migração reexecutável)
+    ja_migrados = sa.select(documento_prazo.c.documento_id).union(sa.select(documento_email.c.documento_id))
+    resultado = conexao.execute(
+        sa.select(documento.c.id, documento.c.prazos_notificacao, documento.c.emails_notificacao)
+        .where(documento.c.id.not_in(ja_migrados))
+        .order_by(documento.c.id)
+    )
+
+    while True:
+        linhas = resultado.fetchmany(LOTE)
+        if not linhas:
+            break
+        prazos, emails = [], []
+        for documento_id, prazos_json, emails_json in linhas:
+            valores = []
+            for prazo in _ler_lista(prazos_json):
+                try:
+                    valores.append(int(prazo))
+                except (TypeError, ValueError):
+                    continue
+            for posicao, dias in enumerate(_sem_repeticao(valores)):
+                prazos.append({'documento_id': documento_id, 'dias': dias, 'posicao': posicao})
+            valores = [str(email).strip() for email in _ler_lista(emails_json) if email and str(email).strip()]
+            for posicao, email in enumerate(_sem_repeticao(valores)):
+                emails.append({'documento_id': documento_id, 'email': email[:255], 'posicao': posicao})
+        if prazos:
+            op.bulk_insert(documento_prazo, prazos)
+        if emails:
+            op.bulk_insert(documento_email, emails)
+
+
+def downgrade():
+    # As colunas JSON continuam sendo gravadas pelo modelo; nada se perde
+    op.drop_index('idx_documento_email_email', table_name='documento_email')
+    op.drop_table('documento_email')
+    op.drop_index('idx_documento_prazo_dias', table_name='documento_prazo')
+    op.drop_table('documento_prazo')
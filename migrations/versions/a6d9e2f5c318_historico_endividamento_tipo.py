@@ -0,0 +1,31 @@
+"""Índice (endividamento_id, tipo_notificacao) em historico_notificacao
+
+Revision ID: a6d9e2f5c318
+Revises: f4c1a8e2b657
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d9e2f5c318'
+down_revision = 'f4c1a8e2b657'
+branch_labels = None
+depends_on = None
+
+NOME = 'idx_historico_endividamento_tipo'
+COLUNAS = ('endividamento_id', 'tipo_notificacao')
+
+
+def upgrade():
+    # Consulta "já notificado?" do planejador; o create_all só cria o índice em tabelas novas
+    existentes = sa.inspect(op.get_bind()).get_indexes('historico_notificacao')
+    if not any(indice['name'] == NOME or tuple(indice['column_names']) == COLUNAS for indice in existentes):
+        op.create_index(NOME, 'historico_notificacao', list(COLUNAS))
+
+
+def downgrade():
+    if NOME in {indice['name'] for indice in sa.inspect(op.get_bind()).get_indexes('historico_notificacao')}:
+        op.drop_index(NOME, table_name='historico_notificacao')
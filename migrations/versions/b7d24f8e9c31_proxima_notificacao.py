@@ -0,0 +1,94 @@
+"""Coluna proxima_notificacao em documento e endividamento
+
+Revision ID: b7d24f8e9c31
+Revises: a3c91e5d2f10
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d24f8e9c31'
+down_revision = 'a3c91e5d2f10'
+branch_labels = None
+depends_on = None
+
+# Mesmos intervalos de src.models.endividamento.INTERVALOS_NOTIFICACAO
+INTERVALOS_ENDIVIDAMENTO = (180, 90, 30, 15, 7, 3, 1)
+
+LOTE = 1000
+
+
+def _adicionar_coluna(inspector, tabela):
+    # O create_all da aplicação não altera tabelas existentes, mas cria as novas já com a coluna
+    if 'proxima_notificacao' not in {coluna['name'] for coluna in inspector.get_columns(tabela)}:
+        op.add_column(tabela, sa.Column('proxima_notificacao', sa.Date(), nullable=True))
+        op.create_index(f'ix_{tabela}_proxima_notificacao', tabela, ['proxima_notificacao'])
+
+
+def _proxima(vencimento, prazos, hoje):
+    futuras = [vencimento - timedelta(days=dias) for dias in prazos if dias >= 0]
+    futuras = [data for data in futuras if data >= hoje]
+    return min(futuras) if futuras else None
+
+
+def _atualizar(conexao, tabela, valores):
+    if valores:
+        conexao.execute(
+            tabela.update().where(tabela.c.id == sa.bindparam('_id')).values(proxima_notificacao=sa.bindparam('_proxima')),
+            valores
+        )
+
+
+def upgrade():
+    conexao = op.get_bind()
+    inspector = sa.inspect(conexao)
+    _adicionar_coluna(inspector, 'documento')
+    _adicionar_coluna(inspector, 'endividamento')
+
+    hoje = date.today()
+    documento = sa.table('documento', sa.column('id', sa.Integer), sa.column('data_vencimento', sa.Date),
+                         sa.column('proxima_notificacao', sa.Date))
+    documento_prazo = sa.table('documento_prazo', sa.column('documento_id', sa.Integer), sa.column('dias', sa.Integer))
+    endividamento = sa.table('endividamento', sa.column('id', sa.Integer), sa.column('data_vencimento_final', sa.Date),
+                             sa.column('proxima_notificacao', sa.Date))
+
+    # Só registros ainda não vencidos têm notificação futura
+    linhas = conexao.execute(
+        sa.select(documento.c.id, documento.c.data_vencimento, documento_prazo.c.dias)
+        .select_from(documento.join(documento_prazo, documento_prazo.c.documento_id == documento.c.id))
+        .where(documento.c.data_vencimento >= hoje)
+    ).fetchall()
+    prazos = defaultdict(list)
+    vencimentos = {}
+    for documento_id, vencimento, dias in linhas:
+        prazos[documento_id].append(dias)
+        vencimentos[documento_id] = vencimento
+    valores = [{'_id': documento_id, '_proxima': _proxima(vencimentos[documento_id], dias, hoje)}
+               for documento_id, dias in prazos.items()]
+    for inicio in range(0, len(valores), LOTE):
+        _atualizar(conexao, documento, valores[inicio:inicio + LOTE])
+
+    resultado = conexao.execute(
+        sa.select(endividamento.c.id, endividamento.c.data_vencimento_final)
+        .where(endividamento.c.data_vencimento_final >= hoje)
+    )
+    while True:
+        lote = resultado.fetchmany(LOTE)
+        if not lote:
+            break
+        _atualizar(conexao, endividamento, [
+            {'_id': endividamento_id, '_proxima': _proxima(vencimento, INTERVALOS_ENDIVIDAMENTO, hoje)}
+            for endividamento_id, vencimento in lote
+        ])
+
+
+def downgrade():
+    op.drop_index('ix_endividamento_proxima_notificacao', table_name='endividamento')
+    op.drop_column('endividamento', 'proxima_notificacao')
+    op.drop_index('ix_documento_proxima_notificacao', table_name='documento')
+    op.drop_column('documento', 'proxima_notificacao')
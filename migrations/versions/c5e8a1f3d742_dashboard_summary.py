@@ -0,0 +1,32 @@
+"""Tabela dashboard_summary
+
+Revision ID: c5e8a1f3d742
+Revises: b7d24f8e9c31
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a1f3d742'
+down_revision = 'b7d24f8e9c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Criada vazia: a primeira leitura (ou maintenance.py --task dashboard) a preenche
+    if 'dashboard_summary' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'dashboard_summary',
+            sa.Column('chave', sa.String(50), primary_key=True),
+            sa.Column('valor', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('referencia', sa.Date(), nullable=False),
+            sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table('dashboard_summary')
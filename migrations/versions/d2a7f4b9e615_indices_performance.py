@@ -0,0 +1,53 @@
+"""Índices de performance que antes eram criados a cada inicialização
+
+Revision ID: d2a7f4b9e615
+Revises: c5e8a1f3d742
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7f4b9e615'
+down_revision = 'c5e8a1f3d742'
+branch_labels = None
+depends_on = None
+
+INDICES = (
+    ('idx_endividamento_data_vencimento', 'endividamento', ('data_vencimento_final',)),
+    ('idx_endividamento_banco', 'endividamento', ('banco',)),
+    ('idx_endividamento_created_at', 'endividamento', ('created_at',)),
+    ('idx_parcela_data_vencimento', 'parcela', ('data_vencimento',)),
+    ('idx_parcela_pago', 'parcela', ('pago',)),
+    ('idx_parcela_endividamento_id', 'parcela', ('endividamento_id',)),
+    ('idx_pessoa_nome', 'pessoa', ('nome',)),
+    ('idx_pessoa_cpf_cnpj', 'pessoa', ('cpf_cnpj',)),
+    ('idx_documento_data_vencimento', 'documento', ('data_vencimento',)),
+    ('idx_documento_tipo', 'documento', ('tipo',)),
+    ('idx_notificacao_endividamento_ativo', 'notificacao_endividamento', ('ativo',)),
+    ('idx_historico_notificacao_data', 'historico_notificacao', ('data_envio',)),
+)
+
+
+def upgrade():
+    # Só os que faltam: bancos antigos já têm parte deles (criados pelo create_app)
+    # e um índice com as mesmas colunas declarado no modelo conta como existente
+    inspetor = sa.inspect(op.get_bind())
+    tabelas = set(inspetor.get_table_names())
+    for nome, tabela, colunas in INDICES:
+        if tabela not in tabelas:
+            continue
+        existentes = inspetor.get_indexes(tabela)
+        if any(indice['name'] == nome or tuple(indice['column_names']) == colunas for indice in existentes):
+            continue
+        op.create_index(nome, tabela, list(colunas))
+
+
+def downgrade():
+    inspetor = sa.inspect(op.get_bind())
+    tabelas = set(inspetor.get_table_names())
+    for nome, tabela, _ in reversed(INDICES):
+        if tabela in tabelas and nome in {indice['name'] for indice in inspetor.get_indexes(tabela)}:
+            op.drop_index(nome, table_name=tabela)
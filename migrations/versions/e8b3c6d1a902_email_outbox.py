@@ -0,0 +1,51 @@
+"""Tabela email_outbox (fila transacional de e-mails)
+
+Revision ID: e8b3c6d1a902
+Revises: d2a7f4b9e615
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3c6d1a902'
+down_revision = 'd2a7f4b9e615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    if 'email_outbox' not in inspetor.get_table_names():
+        op.create_table(
+            'email_outbox',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('destinatarios', sa.Text(), nullable=False),
+            sa.Column('assunto', sa.String(255), nullable=False),
+            sa.Column('corpo', sa.Text(), nullable=False),
+            sa.Column('html', sa.Boolean(), nullable=True),
+            sa.Column('status', sa.String(10), nullable=False, server_default='pendente'),
+            sa.Column('tentativas', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('max_tentativas', sa.Integer(), nullable=False, server_default='5'),
+            sa.Column('disponivel_em', sa.DateTime(), nullable=False),
+            sa.Column('erro_mensagem', sa.Text(), nullable=True),
+            sa.Column('reservado_por', sa.String(100), nullable=True),
+            sa.Column('endividamento_id', sa.Integer(), sa.ForeignKey('endividamento.id'), nullable=True),
+            sa.Column('tipo_notificacao', sa.String(20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('enviado_em', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('endividamento_id', 'tipo_notificacao', name='uq_email_outbox_notificacao'),
+        )
+        op.create_index('idx_email_outbox_status_disponivel', 'email_outbox', ['status', 'disponivel_em'])
+        return
+
+    # Tabela criada pelo create_all antes da coluna de dono da reserva
+    if 'reservado_por' not in {coluna['name'] for coluna in inspetor.get_columns('email_outbox')}:
+        op.add_column('email_outbox', sa.Column('reservado_por', sa.String(100), nullable=True))
+
+
+def downgrade():
+    op.drop_index('idx_email_outbox_status_disponivel', table_name='email_outbox')
+    op.drop_table('email_outbox')
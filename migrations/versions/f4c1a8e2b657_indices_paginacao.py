@@ -0,0 +1,40 @@
+"""Índices compostos da paginação por keyset
+
+Revision ID: f4c1a8e2b657
+Revises: e8b3c6d1a902
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1a8e2b657'
+down_revision = 'e8b3c6d1a902'
+branch_labels = None
+depends_on = None
+
+# Mesmos índices declarados nos modelos: ordenação (coluna, id) das listagens
+INDICES = (
+    ('idx_pessoa_nome_id', 'pessoa', ('nome', 'id')),
+    ('idx_fazenda_nome_id', 'fazenda', ('nome', 'id')),
+    ('idx_documento_vencimento_id', 'documento', ('data_vencimento', 'id')),
+)
+
+
+def upgrade():
+    # O create_all cria os índices em tabelas novas; nas existentes eles faltam
+    inspetor = sa.inspect(op.get_bind())
+    for nome, tabela, colunas in INDICES:
+        existentes = inspetor.get_indexes(tabela)
+        if any(indice['name'] == nome or tuple(indice['column_names']) == colunas for indice in existentes):
+            continue
+        op.create_index(nome, tabela, list(colunas))
+
+
+def downgrade():
+    inspetor = sa.inspect(op.get_bind())
+    for nome, tabela, _ in reversed(INDICES):
+        if nome in {indice['name'] for indice in inspetor.get_indexes(tabela)}:
+            op.drop_index(nome, table_name=tabela)
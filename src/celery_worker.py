@@ -0,0 +1,18 @@
+# Aplicação Celery dos workers: celery -A src.celery_worker worker -B
+#
+# Usa a aplicação mínima (create_worker_app) e registra a drenagem periódica
+# da outbox de e-mails. Sem Celery, o mesmo trabalho é feito por
+# `python maintenance.py --task outbox` ou pelo scheduler de manutenção.
+from src.main import create_worker_app
+from src.utils.tasks import make_celery, registrar_tarefas_outbox
+
+
+def create_celery_app(test_config=None):
+    """Celery configurado com a aplicação de workers e as tarefas da outbox"""
+    app = create_worker_app(test_config)
+    celery = make_celery(app)
+    registrar_tarefas_outbox(celery, intervalo=app.config['OUTBOX_DRAIN_INTERVAL'])
+    return celery
+
+
+celery = create_celery_app()
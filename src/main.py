@@ -4,6 +4,7 @@ import os
 import sys
 import logging
 import datetime
+import threading
 from logging.handlers import RotatingFileHandler
 
 # Ajuste o sys.path ANTES dos imports locais do projeto:
@@ -12,20 +13,15 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
 from werkzeug.utils import secure_filename
 
+# Blueprints, formulários, Flask-Login e Flask-Migrate são importados dentro de
+# create_app(): create_worker_app() (CLI, scheduler, workers) não precisa deles
 from src.models.db import db
-from src.routes.admin import admin_bp
-from src.routes.pessoa import pessoa_bp
-from src.routes.fazenda import fazenda_bp
-from src.routes.documento import documento_bp
-from src.routes.endividamento import endividamento_bp
-from src.routes.auth import auth_bp
-from src.routes.auditoria import auditoria_bp
-from src.utils.performance import init_performance_optimizations, PerformanceMiddleware
+from src.utils.cache import cache
+from src.utils.performance import init_performance_optimizations, init_rate_limits, PerformanceMiddleware
+from src.utils.metrics import init_metrics, registry
+from src.utils.db_pool import opcoes_engine, estado_pool
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from sqlalchemy import text
-from flask_login import LoginManager
-from src.utils.filters import register_filters
-from src.routes.test import test_bp
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -46,23 +42,8 @@ def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def create_app(test_config=None):
-    app = Flask(__name__)
-
-    register_filters(app)
-
-    print("MAIL_USERNAME:", os.environ.get('MAIL_USERNAME'))
-    print("MAIL_DEFAULT_SENDER:", os.environ.get('MAIL_DEFAULT_SENDER'))
-    
-    login_manager = LoginManager()
-    login_manager.init_app(app)
-    login_manager.login_view = 'auth.login'
-
-    from src.models.usuario import Usuario
-    @login_manager.user_loader
-    def load_user(user_id):
-        return Usuario.query.get(int(user_id))
-
+def configurar(app, test_config=None):
+    """Configuração comum à aplicação web e à de workers (variáveis de ambiente ou ``test_config``)"""
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or os.urandom(24)
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -88,6 +69,14 @@ def create_app(test_config=None):
     else:
         app.config.update(test_config)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool de conexões; DB_POOL_RECYCLE deve ficar abaixo do wait_timeout do MySQL
+    app.config.setdefault('DB_POOL_SIZE', int(os.environ.get('DB_POOL_SIZE', 10)))
+    app.config.setdefault('DB_MAX_OVERFLOW', int(os.environ.get('DB_MAX_OVERFLOW', 20)))
+    app.config.setdefault('DB_POOL_RECYCLE', int(os.environ.get('DB_POOL_RECYCLE', 280)))
+    app.config.setdefault('DB_POOL_PRE_PING', os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1'])
+    app.config.setdefault('DB_POOL_TIMEOUT', int(os.environ.get('DB_POOL_TIMEOUT', 30)))
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config))
+    app.config.setdefault('DB_INIT', os.environ.get('DB_INIT', 'startup').lower())
 
     app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
@@ -95,16 +84,90 @@ def create_app(test_config=None):
     app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', '')
     app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', '')
     app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@gestaofazendas.com.br')
+    app.config.setdefault('MAIL_POOL_MAX_CONNECTIONS', int(os.environ.get('MAIL_POOL_MAX_CONNECTIONS', 4)))
+    app.config.setdefault('MAIL_DISPATCH_WORKERS', int(os.environ.get('MAIL_DISPATCH_WORKERS', 4)))
+    app.config.setdefault('MAIL_TIMEOUT', int(os.environ.get('MAIL_TIMEOUT', 30)))
+    app.config.setdefault('OUTBOX_DRAIN_INTERVAL', int(os.environ.get('OUTBOX_DRAIN_INTERVAL', 30)))
     app.config['REDIS_URL'] = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    app.config.setdefault('CACHE_LOCAL_MAX_SIZE', int(os.environ.get('CACHE_LOCAL_MAX_SIZE', 256)))
+    app.config.setdefault('CACHE_LOCAL_TTL', int(os.environ.get('CACHE_LOCAL_TTL', 60)))
+    app.config.setdefault('CACHE_CODEC', os.environ.get('CACHE_CODEC', 'json'))
+    app.config.setdefault('CACHE_COMPRESSION', os.environ.get('CACHE_COMPRESSION', 'zlib'))
+    app.config.setdefault('OPCOES_LIMITE_SELECT', int(os.environ.get('OPCOES_LIMITE_SELECT', 200)))
+    app.config.setdefault('SQL_PROFILER_SAMPLE_RATE', float(os.environ.get('SQL_PROFILER_SAMPLE_RATE', 0.05)))
+    app.config.setdefault(
+        'METRICS_MULTIPROC_DIR',
+        os.environ.get('METRICS_MULTIPROC_DIR') or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    )
+    app.config.setdefault('PROXY_FIX_X_FOR', int(os.environ.get('PROXY_FIX_X_FOR', 0)))
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    app.config.setdefault('METRICS_ALLOWED_IPS', os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1'))
 
+def create_worker_app(test_config=None):
+    """
+    Aplicação mínima para comandos, scheduler e workers: configuração, banco,
+    cache, métricas e modelos, sem blueprints, formulários nem middlewares.
+    Não cria tabelas (o esquema é do create_app/migrações).
+    """
+    app = Flask(__name__)
+    configurar(app, test_config)
+    configure_logging(app)
+    db.init_app(app)
+    cache.init_app(app)
+    registry.configure(app.config.get('METRICS_MULTIPROC_DIR'))
+    # Modelos e listeners de sessão (resumo do dashboard, proxima_notificacao,
+    # invalidação do cache) precisam estar registrados antes da primeira escrita
+    import src.models
+    import src.models.usuario
+    import src.models.auditoria
+    import src.utils.dashboard
+    return app
+
+def create_app(test_config=None):
+    from flask_login import LoginManager
+    from src.utils.filters import register_filters
+    from src.routes.admin import admin_bp
+    from src.routes.pessoa import pessoa_bp
+    from src.routes.fazenda import fazenda_bp
+    from src.routes.documento import documento_bp
+    from src.routes.endividamento import endividamento_bp
+    from src.routes.auth import auth_bp
+    from src.routes.auditoria import auditoria_bp
+    from src.routes.jobs import jobs_bp
+    from src.routes.test import test_bp
+
+    app = Flask(__name__)
+
+    register_filters(app)
+
+    print("MAIL_USERNAME:", os.environ.get('MAIL_USERNAME'))
+    print("MAIL_DEFAULT_SENDER:", os.environ.get('MAIL_DEFAULT_SENDER'))
+    
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+
+    from src.models.usuario import Usuario
+    @login_manager.user_loader
+    def load_user(user_id):
+        return Usuario.query.get(int(user_id))
+
+    configurar(app, test_config)
     configure_logging(app)
 
     db.init_app(app)
     from flask_migrate import Migrate
     Migrate(app, db)
 
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        saltos = app.config['PROXY_FIX_X_FOR']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=saltos, x_proto=saltos)
+
     init_performance_optimizations(app)
+    init_rate_limits(app)
     PerformanceMiddleware(app)
+    init_metrics(app)
 
     os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'documentos'), exist_ok=True)
 
@@ -115,6 +178,7 @@ def create_app(test_config=None):
     app.register_blueprint(endividamento_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(auditoria_bp)
+    app.register_blueprint(jobs_bp)
     app.register_blueprint(test_bp)
 
     @app.route('/')
@@ -159,7 +223,7 @@ def create_app(test_config=None):
             flash('Ocorreu um erro no banco de dados. Por favor, tente novamente.', 'danger')
         return redirect(url_for('admin.index'))
 
-    with app.app_context():
+    def inicializar_banco():
         try:
             db.create_all()
             app.logger.info('Banco de dados inicializado com sucesso')
@@ -167,11 +231,31 @@ def create_app(test_config=None):
             app.logger.error(f'Erro ao inicializar banco de dados: {e}')
             print(f"ERRO: Não foi possível conectar ao banco de dados: {e}")
 
+    # DB_INIT: 'startup' cria as tabelas ao iniciar; 'lazy' na primeira requisição;
+    # 'off' nunca (esquema mantido pelas migrações e por `flask ensure-indexes`)
+    if app.config['DB_INIT'] == 'startup':
+        with app.app_context():
+            inicializar_banco()
+    elif app.config['DB_INIT'] == 'lazy':
+        estado_inicializacao = {'pendente': True, 'lock': threading.Lock()}
+
+        @app.before_request
+        def inicializar_banco_na_primeira_requisicao():
+            if estado_inicializacao['pendente']:
+                with estado_inicializacao['lock']:
+                    if estado_inicializacao['pendente']:
+                        inicializar_banco()
+                        estado_inicializacao['pendente'] = False
+
     @app.route('/health')
     def health_check():
         try:
             db.session.execute(text('SELECT 1'))
-            return jsonify({'status': 'ok', 'database': 'connected'}), 200
+            resposta = {'status': 'ok', 'database': 'connected'}
+            pool = estado_pool(db.engine)
+            if pool:
+                resposta['pool'] = pool
+            return jsonify(resposta), 200
         except Exception as e:
             app.logger.error(f'Erro no health check: {e}')
             return jsonify({'status': 'error', 'database': 'disconnected', 'error': str(e)}), 500
@@ -1,7 +1,9 @@
 from src.models.pessoa import Pessoa
 from src.models.fazenda import Fazenda, TipoPosse
-from src.models.documento import Documento, TipoDocumento
+from src.models.documento import Documento, TipoDocumento, DocumentoPrazo, DocumentoEmail
 from src.models.endividamento import Endividamento, EndividamentoFazenda, Parcela
 from src.models.notificacao_endividamento import NotificacaoEndividamento, HistoricoNotificacao
+from src.models.email_outbox import EmailOutbox
+from src.models.dashboard_summary import DashboardSummary
 
-__all__ = ['Pessoa', 'Fazenda', 'TipoPosse', 'Documento', 'TipoDocumento', 'Endividamento', 'EndividamentoFazenda', 'Parcela', 'NotificacaoEndividamento', 'HistoricoNotificacao']
+__all__ = ['Pessoa', 'Fazenda', 'TipoPosse', 'Documento', 'TipoDocumento', 'DocumentoPrazo', 'DocumentoEmail', 'Endividamento', 'EndividamentoFazenda', 'Parcela', 'NotificacaoEndividamento', 'HistoricoNotificacao', 'EmailOutbox', 'DashboardSummary']
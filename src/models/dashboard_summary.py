@@ -0,0 +1,19 @@
+# Modelo para os agregados do dashboard mantidos incrementalmente
+from src.models.db import db
+from datetime import datetime
+
+class DashboardSummary(db.Model):
+    """
+    Um contador por linha (``chave`` -> ``valor``). Os contadores que dependem
+    da data (vencidos, a vencer, próximos 30 dias) valem para o dia em
+    ``referencia``; em outro dia o resumo é reconciliado antes do uso.
+    """
+    __tablename__ = 'dashboard_summary'
+
+    chave = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
+    referencia = db.Column(db.Date, nullable=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DashboardSummary {self.chave}={self.valor}>'
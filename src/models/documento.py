@@ -2,6 +2,7 @@
 from sqlalchemy import Column, Integer, String, Date, ForeignKey, Enum, Table, Text, Index
 from sqlalchemy.orm import relationship, backref
 from src.models.db import db
+from src.models.proxima_notificacao import ProximaNotificacaoMixin
 import enum
 import datetime
 import json
@@ -16,12 +17,15 @@ class TipoEntidade(enum.Enum):
     FAZENDA = "Fazenda/Área"
     PESSOA = "Pessoa"
 
-class Documento(db.Model):
+class Documento(ProximaNotificacaoMixin, db.Model):
     """
     Modelo para cadastro de documentos associados às fazendas/áreas ou pessoas.
     """
     __tablename__ = 'documento'
     
+    # Campos que alteram a data da próxima notificação
+    CAMPOS_PROXIMA_NOTIFICACAO = ('data_vencimento', '_prazos_notificacao')
+    
     id = Column(Integer, primary_key=True)
     nome = Column(String(100), nullable=False, index=True)
     tipo = Column(Enum(TipoDocumento), nullable=False, index=True)
@@ -36,24 +40,31 @@ class Documento(db.Model):
     fazenda_id = Column(Integer, ForeignKey('fazenda.id', ondelete='SET NULL'), nullable=True, index=True)
     pessoa_id = Column(Integer, ForeignKey('pessoa.id', ondelete='SET NULL'), nullable=True, index=True)
     
-    # Emails para notificação (armazenados como JSON)
+    # Cópia em JSON dos emails e prazos de notificação; a fonte de verdade são
+    # as tabelas documento_email e documento_prazo (ver propriedades abaixo)
     _emails_notificacao = Column("emails_notificacao", Text, nullable=True)
-    
-    # Prazos de notificação armazenados como JSON
     _prazos_notificacao = Column("prazos_notificacao", Text, nullable=True)
     
     # Data de criação e atualização para auditoria
     data_criacao = Column(Date, default=datetime.date.today, nullable=False)
     data_atualizacao = Column(Date, default=datetime.date.today, onupdate=datetime.date.today, nullable=False)
     
-    # Relacionamentos com lazy loading otimizado
-    fazenda = relationship('Fazenda', back_populates='documentos', lazy='joined')
-    pessoa = relationship('Pessoa', back_populates='documentos', lazy='joined')
+    # Tudo carregado sob demanda; listagens e notificações pedem prazos e
+    # e-mails com selectinload (perfis de src/utils/carregamento.py e src/utils/vencimentos.py).
+    # Sem passive_deletes: ao excluir, o ORM carrega e apaga as linhas filhas, sem
+    # depender do ON DELETE CASCADE (o SQLite não aplica chaves estrangeiras por padrão)
+    fazenda = relationship('Fazenda', back_populates='documentos', lazy='select')
+    pessoa = relationship('Pessoa', back_populates='documentos', lazy='select')
+    prazos = relationship('DocumentoPrazo', order_by='DocumentoPrazo.posicao', lazy='select',
+                          cascade='all, delete-orphan')
+    emails = relationship('DocumentoEmail', order_by='DocumentoEmail.posicao', lazy='select',
+                          cascade='all, delete-orphan')
     
     # Índices compostos para consultas frequentes
     __table_args__ = (
         Index('idx_documento_tipo_vencimento', 'tipo', 'data_vencimento'),
         Index('idx_documento_entidade_tipo', 'tipo_entidade', 'tipo'),
+        Index('idx_documento_vencimento_id', 'data_vencimento', 'id'),  # paginação por (data_vencimento, id)
     )
     
     def __repr__(self):
@@ -62,56 +73,83 @@ class Documento(db.Model):
     
     @property
     def emails_notificacao(self):
-        """Retorna a lista de emails para notificação."""
-        if not self._emails_notificacao:
-            return []
-        try:
-            return json.loads(self._emails_notificacao)
-        except json.JSONDecodeError:
-            return []
+        """Retorna a lista de emails para notificação.
+
+        Sem linhas em documento_email vale a cópia JSON: bancos criados com
+        create_all não passam pela migração que preenche as tabelas filhas.
+        """
+        if self.emails:
+            return [registro.email for registro in self.emails]
+        return self._ler_json(self._emails_notificacao)
     
     @emails_notificacao.setter
     def emails_notificacao(self, value):
         """Define a lista de emails para notificação."""
-        try:
-            if isinstance(value, list):
-                self._emails_notificacao = json.dumps(value)
-            elif isinstance(value, str):
-                # Se for uma string única, converte para lista
-                emails = [email.strip() for email in value.split(',') if email.strip()]
-                self._emails_notificacao = json.dumps(emails)
-            else:
-                self._emails_notificacao = json.dumps([])
-        except Exception:
-            self._emails_notificacao = json.dumps([])
+        if isinstance(value, list):
+            emails = [str(email) for email in value if email]
+        elif isinstance(value, str):
+            # Se for uma string única, converte para lista
+            emails = [email.strip() for email in value.split(',') if email.strip()]
+        else:
+            emails = []
+        self._sincronizar(self.emails, DocumentoEmail, 'email', emails)
+        self._emails_notificacao = json.dumps([registro.email for registro in self.emails])
     
     @property
     def prazos_notificacao(self):
-        """Retorna a lista de prazos de notificação."""
-        if not self._prazos_notificacao:
-            return []
-        try:
-            return json.loads(self._prazos_notificacao)
-        except json.JSONDecodeError:
-            return []
+        """Retorna a lista de prazos de notificação (cópia JSON sem linhas em documento_prazo)."""
+        if self.prazos:
+            return [registro.dias for registro in self.prazos]
+        return self._ler_json(self._prazos_notificacao)
     
     @prazos_notificacao.setter
     def prazos_notificacao(self, value):
         """Define a lista de prazos de notificação."""
         try:
             if isinstance(value, list):
-                self._prazos_notificacao = json.dumps(value)
+                prazos = [int(prazo) for prazo in value]
             elif isinstance(value, str):
                 # Se for uma string, tenta converter para lista
-                try:
-                    prazos = [int(prazo.strip()) for prazo in value.split(',') if prazo.strip()]
-                    self._prazos_notificacao = json.dumps(prazos)
-                except ValueError:
-                    self._prazos_notificacao = json.dumps([30])  # Valor padrão
+                prazos = [int(prazo.strip()) for prazo in value.split(',') if prazo.strip()]
             else:
-                self._prazos_notificacao = json.dumps([30])  # Valor padrão
-        except Exception:
-            self._prazos_notificacao = json.dumps([30])
+                prazos = [30]  # Valor padrão
+        except (TypeError, ValueError):
+            prazos = [30]  # Valor padrão
+        self._sincronizar(self.prazos, DocumentoPrazo, 'dias', prazos)
+        self._prazos_notificacao = json.dumps([registro.dias for registro in self.prazos])
+    
+    @staticmethod
+    def _ler_json(valor):
+        if not valor:
+            return []
+        try:
+            return json.loads(valor)
+        except json.JSONDecodeError:
+            return []
+    
+    @staticmethod
+    def _sincronizar(colecao, classe, atributo, valores):
+        """Ajusta as linhas filhas aos ``valores``, na ordem dada e sem repetições.
+
+        Linhas cujo valor continua na lista são reaproveitadas: apagar e
+        reinserir a mesma chave no mesmo flush violaria a chave primária.
+        """
+        existentes = {getattr(registro, atributo): registro for registro in colecao}
+        novos = []
+        for valor in valores:
+            if any(getattr(registro, atributo) == valor for registro in novos):
+                continue
+            registro = existentes.pop(valor, None) or classe(**{atributo: valor})
+            registro.posicao = len(novos)
+            novos.append(registro)
+        colecao[:] = novos
+    
+    def datas_notificacao(self):
+        """Datas de notificação: vencimento menos cada prazo."""
+        if not self.data_vencimento:
+            return []
+        return [self.data_vencimento - datetime.timedelta(days=prazo)
+                for prazo in self.prazos_notificacao if prazo >= 0]
     
     @property
     def esta_vencido(self):
@@ -153,3 +191,35 @@ class Documento(db.Model):
         """Retorna o nome da entidade relacionada."""
         entidade = self.entidade_relacionada
         return entidade.nome if entidade else "Não definido"
+
+
+class DocumentoPrazo(db.Model):
+    """Prazo de notificação (em dias antes do vencimento) de um documento."""
+    __tablename__ = 'documento_prazo'
+    
+    documento_id = Column(Integer, ForeignKey('documento.id', ondelete='CASCADE'), primary_key=True)
+    dias = Column(Integer, primary_key=True)
+    posicao = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('idx_documento_prazo_dias', 'dias', 'documento_id'),  # "quem notifica a N dias"
+    )
+    
+    def __repr__(self):
+        return f'<DocumentoPrazo {self.documento_id} - {self.dias} dias>'
+
+
+class DocumentoEmail(db.Model):
+    """Email que recebe as notificações de vencimento de um documento."""
+    __tablename__ = 'documento_email'
+    
+    documento_id = Column(Integer, ForeignKey('documento.id', ondelete='CASCADE'), primary_key=True)
+    email = Column(String(255), primary_key=True)
+    posicao = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('idx_documento_email_email', 'email'),
+    )
+    
+    def __repr__(self):
+        return f'<DocumentoEmail {self.documento_id} - {self.email}>'
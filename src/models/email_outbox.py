@@ -0,0 +1,61 @@
+# Modelo para a fila transacional (outbox) de e-mails
+from src.models.db import db
+from datetime import datetime
+import json
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    PENDENTE = 'pendente'
+    ENVIANDO = 'enviando'
+    ENVIADO = 'enviado'
+    FALHA = 'falha'
+
+    id = db.Column(db.Integer, primary_key=True)
+    destinatarios = db.Column(db.Text, nullable=False)  # JSON string com lista de emails
+    assunto = db.Column(db.String(255), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Boolean, default=True)
+    status = db.Column(db.String(10), nullable=False, default=PENDENTE)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=5)
+    # Próxima tentativa; para linhas 'enviando', prazo após o qual a reserva expira
+    disponivel_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    erro_mensagem = db.Column(db.Text, nullable=True)
+    # Worker ("host:pid") que reservou a mensagem enquanto ela está 'enviando'
+    reservado_por = db.Column(db.String(100), nullable=True)
+
+    # Origem da mensagem (notificações de endividamento)
+    endividamento_id = db.Column(db.Integer, db.ForeignKey('endividamento.id'), nullable=True)
+    tipo_notificacao = db.Column(db.String(20), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    enviado_em = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_email_outbox_status_disponivel', 'status', 'disponivel_em'),
+        # Cada notificação de endividamento entra na fila uma única vez
+        db.UniqueConstraint('endividamento_id', 'tipo_notificacao', name='uq_email_outbox_notificacao'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} - {self.status}>'
+
+    @property
+    def lista_destinatarios(self):
+        return json.loads(self.destinatarios) if self.destinatarios else []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'destinatarios': self.lista_destinatarios,
+            'assunto': self.assunto,
+            'status': self.status,
+            'tentativas': self.tentativas,
+            'disponivel_em': self.disponivel_em.isoformat() if self.disponivel_em else None,
+            'erro_mensagem': self.erro_mensagem,
+            'endividamento_id': self.endividamento_id,
+            'tipo_notificacao': self.tipo_notificacao,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'enviado_em': self.enviado_em.isoformat() if self.enviado_em else None
+        }
@@ -3,11 +3,25 @@
 # Modelo para Endividamento
 
 from src.models.db import db
-from datetime import datetime
+from src.models.proxima_notificacao import ProximaNotificacaoMixin
+from datetime import datetime, timedelta
 
-class Endividamento(db.Model):
+# Intervalos de notificação antes do vencimento final, em dias
+INTERVALOS_NOTIFICACAO = {
+    '6_meses': 180,
+    '3_meses': 90,
+    '30_dias': 30,
+    '15_dias': 15,
+    '7_dias': 7,
+    '3_dias': 3,
+    '1_dia': 1
+}
+
+class Endividamento(ProximaNotificacaoMixin, db.Model):
     __tablename__ = 'endividamento'
     
+    CAMPOS_PROXIMA_NOTIFICACAO = ('data_vencimento_final',)
+    
     id = db.Column(db.Integer, primary_key=True)
     banco = db.Column(db.String(255), nullable=False)
     numero_proposta = db.Column(db.String(255), nullable=False)
@@ -43,6 +57,11 @@ class Endividamento(db.Model):
         cascade="all, delete-orphan"
     )
     
+    def datas_notificacao(self):
+        if not self.data_vencimento_final:
+            return []
+        return [self.data_vencimento_final - timedelta(days=dias) for dias in INTERVALOS_NOTIFICACAO.values()]
+    
     def __repr__(self):
         return f'<Endividamento {self.banco} - {self.numero_proposta}>'
     
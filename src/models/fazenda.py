@@ -34,16 +34,17 @@ class Fazenda(db.Model):
     data_criacao = Column(db.Date, default=datetime.date.today, nullable=False)
     data_atualizacao = Column(db.Date, default=datetime.date.today, onupdate=datetime.date.today, nullable=False)
     
-    # Relacionamento muitos-para-muitos com Pessoa (otimizado)
-    pessoas = relationship('Pessoa', secondary=pessoa_fazenda, back_populates='fazendas', lazy='selectin')
+    # Relacionamentos carregados sob demanda (perfis em src/utils/carregamento.py)
+    pessoas = relationship('Pessoa', secondary=pessoa_fazenda, back_populates='fazendas', lazy='select')
     
-    # Relacionamento um-para-muitos com Documento (otimizado)
-    documentos = relationship('Documento', back_populates='fazenda', cascade='all, delete-orphan', lazy='selectin')
+    # Relacionamento um-para-muitos com Documento
+    documentos = relationship('Documento', back_populates='fazenda', cascade='all, delete-orphan', lazy='select')
     
     # Índices compostos para consultas frequentes
     __table_args__ = (
         Index('idx_fazenda_estado_municipio', 'estado', 'municipio'),
         Index('idx_fazenda_tipo_posse', 'tipo_posse'),
+        Index('idx_fazenda_nome_id', 'nome', 'id'),  # paginação por (nome, id)
     )
     
     def __repr__(self):
@@ -46,6 +46,11 @@ class HistoricoNotificacao(db.Model):
     # Relacionamento simples (caso queira histórico por endividamento)
     endividamento = db.relationship('Endividamento')
     
+    # Anti-join do planejador de notificações
+    __table_args__ = (
+        db.Index('idx_historico_endividamento_tipo', 'endividamento_id', 'tipo_notificacao'),
+    )
+    
     def __repr__(self):
         return f'<HistoricoNotificacao {self.endividamento_id} - {self.tipo_notificacao}>'
     
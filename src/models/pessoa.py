@@ -32,11 +32,12 @@ class Pessoa(db.Model):
     data_criacao = Column(db.Date, default=datetime.date.today, nullable=False)
     data_atualizacao = Column(db.Date, default=datetime.date.today, onupdate=datetime.date.today, nullable=False)
     
-    # Relacionamento muitos-para-muitos com Fazenda (otimizado)
-    fazendas = relationship('Fazenda', secondary=pessoa_fazenda, back_populates='pessoas', lazy='selectin')
+    # Relacionamentos carregados sob demanda; cada consulta escolhe o que carrega
+    # junto com os perfis de src/utils/carregamento.py
+    fazendas = relationship('Fazenda', secondary=pessoa_fazenda, back_populates='pessoas', lazy='select')
     
     # Relacionamento um-para-muitos com Documento
-    documentos = relationship('Documento', back_populates='pessoa', cascade='all, delete-orphan', lazy='selectin')
+    documentos = relationship('Documento', back_populates='pessoa', cascade='all, delete-orphan', lazy='select')
     
     # Relacionamento muitos-para-muitos com Endividamento
     endividamentos = relationship('Endividamento', secondary='endividamento_pessoa', back_populates='pessoas')
@@ -44,6 +45,7 @@ class Pessoa(db.Model):
     # Índices compostos para consultas frequentes
     __table_args__ = (
         Index('idx_pessoa_nome_cpf', 'nome', 'cpf_cnpj'),
+        Index('idx_pessoa_nome_id', 'nome', 'id'),  # paginação por (nome, id)
     )
     
     def __repr__(self):
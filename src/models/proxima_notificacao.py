@@ -0,0 +1,57 @@
+# Data da próxima notificação, derivada e indexada, mantida na escrita
+from datetime import date, timedelta
+from sqlalchemy import Column, Date, event, inspect
+from sqlalchemy.orm import Session
+
+
+def hoje():
+    return date.today()
+
+
+def prazo_devido(dias_restantes, prazos):
+    """Menor prazo (em dias) maior ou igual à distância real até o vencimento
+
+    É o lembrete mais recente cuja data já chegou. ``proxima_notificacao`` pode
+    ter ficado para trás (configuração criada depois, job parado), então o
+    prazo é sempre derivado de ``vencimento - hoje``, nunca dela.
+    """
+    alcancados = [prazo for prazo in prazos if prazo >= dias_restantes]
+    return min(alcancados) if alcancados else None
+
+
+class ProximaNotificacaoMixin:
+    """
+    Acrescenta a coluna ``proxima_notificacao``: a menor data de notificação
+    ainda não atingida. É recalculada no ``before_flush`` quando um dos
+    ``CAMPOS_PROXIMA_NOTIFICACAO`` muda e avançada com ``avancar_notificacao``
+    depois do envio, de modo que a rotina diária só precisa de
+    ``WHERE proxima_notificacao <= hoje``.
+    """
+    CAMPOS_PROXIMA_NOTIFICACAO = ()
+
+    proxima_notificacao = Column(Date, nullable=True, index=True)
+
+    def datas_notificacao(self):
+        """Todas as datas em que o registro deve ser notificado (os modelos sobrescrevem)"""
+        return []
+
+    def calcular_proxima_notificacao(self, a_partir_de=None):
+        a_partir_de = a_partir_de or hoje()
+        futuras = [data for data in self.datas_notificacao() if data >= a_partir_de]
+        return min(futuras) if futuras else None
+
+    def avancar_notificacao(self, enviada_em=None):
+        """Passa para a primeira data de notificação posterior ao envio"""
+        self.proxima_notificacao = self.calcular_proxima_notificacao((enviada_em or hoje()) + timedelta(days=1))
+
+
+def _alterou(objeto):
+    estado = inspect(objeto)
+    return any(estado.attrs[campo].history.has_changes() for campo in objeto.CAMPOS_PROXIMA_NOTIFICACAO)
+
+
+@event.listens_for(Session, 'before_flush')
+def _recalcular_proxima_notificacao(session, flush_context, instances):
+    for objeto in list(session.new) + list(session.dirty):
+        if isinstance(objeto, ProximaNotificacaoMixin) and (objeto in session.new or _alterou(objeto)):
+            objeto.proxima_notificacao = objeto.calcular_proxima_notificacao()
@@ -13,6 +13,10 @@ from src.models.fazenda import Fazenda, TipoPosse
 from src.models.pessoa import Pessoa
 from src.utils.email_service import verificar_documentos_vencendo, EmailService, formatar_email_notificacao
 from src.utils.auditoria import registrar_auditoria 
+from src.utils.jobs import iniciar_job
+from src.utils.dashboard import obter_resumo
+from src.utils.opcoes import opcoes_select
+from src.utils.carregamento import consulta, fazendas_por_pessoa, pessoas_por_fazenda, documentos_por_fazenda
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -31,29 +35,29 @@ def dashboard():
     venc_page = int(request.args.get('venc_page', 1))
     per_page = 10
 
-    docs_proximos_query = Documento.query.filter(
+    # Contadores vêm do resumo mantido incrementalmente (uma consulta)
+    resumo = obter_resumo(hoje)
+
+    docs_proximos_query = consulta(Documento, 'lista').filter(
         Documento.data_vencimento >= hoje
     ).order_by(Documento.data_vencimento.asc())
-    total_proximos = docs_proximos_query.count()
+    total_proximos = resumo['documentos_a_vencer']
     docs_proximos = docs_proximos_query.offset((prox_page-1)*per_page).limit(per_page).all()
     total_pag_proximos = ceil(total_proximos / per_page)
 
-    docs_vencidos_query = Documento.query.filter(
+    docs_vencidos_query = consulta(Documento, 'lista').filter(
         Documento.data_vencimento < hoje
     ).order_by(Documento.data_vencimento.asc())
-    total_vencidos = docs_vencidos_query.count()
+    total_vencidos = resumo['documentos_vencidos']
     docs_vencidos = docs_vencidos_query.offset((venc_page-1)*per_page).limit(per_page).all()
     total_pag_vencidos = ceil(total_vencidos / per_page)
 
-    total_pessoas = Pessoa.query.count()
-    total_fazendas = Fazenda.query.count()
-    total_documentos = Documento.query.count()
-
     return render_template(
         'admin/index.html',
-        total_pessoas=total_pessoas,
-        total_fazendas=total_fazendas,
-        total_documentos=total_documentos,
+        total_pessoas=resumo['total_pessoas'],
+        total_fazendas=resumo['total_fazendas'],
+        total_documentos=resumo['total_documentos'],
+        total_vencidos=total_vencidos,
         documentos_proximos=docs_proximos,
         documentos_vencidos=docs_vencidos,
         prox_page=prox_page,
@@ -66,8 +70,8 @@ def dashboard():
 @admin_bp.route('/pessoas')
 @login_required
 def listar_pessoas():
-    pessoas = Pessoa.query.all()
-    return render_template('admin/pessoas/listar.html', pessoas=pessoas)
+    pessoas = consulta(Pessoa, 'lista').all()
+    return render_template('admin/pessoas/listar.html', pessoas=pessoas, total_fazendas=fazendas_por_pessoa())
 
 @admin_bp.route('/pessoas/nova', methods=['GET', 'POST'])
 @login_required
@@ -187,7 +191,7 @@ def excluir_pessoa(id):
 @login_required
 def listar_fazendas_pessoa(id):
     """Lista as fazendas associadas a uma pessoa."""
-    pessoa = Pessoa.query.get_or_404(id)
+    pessoa = consulta(Pessoa, 'com_fazendas_detalhe').filter_by(id=id).first_or_404()
     return render_template('admin/pessoas/fazendas.html', pessoa=pessoa)
 
 @admin_bp.route('/pessoas/<int:pessoa_id>/associar-fazenda', methods=['GET', 'POST'])
@@ -198,7 +202,7 @@ def associar_fazenda_pessoa(pessoa_id):
     
     # Obter fazendas que ainda não estão associadas a esta pessoa
     fazendas_associadas = [f.id for f in pessoa.fazendas]
-    fazendas_disponiveis = Fazenda.query.filter(~Fazenda.id.in_(fazendas_associadas)).all() if fazendas_associadas else Fazenda.query.all()
+    fazendas_disponiveis = opcoes_select('fazendas', excluir=fazendas_associadas)
     
     if request.method == 'POST':
         fazenda_id = request.form.get('fazenda_id')
@@ -267,8 +271,9 @@ def desassociar_fazenda_pessoa(pessoa_id, fazenda_id):
 @login_required
 def listar_fazendas():
     """Lista todas as fazendas cadastradas."""
-    fazendas = Fazenda.query.all()
-    return render_template('admin/fazendas/listar.html', fazendas=fazendas)
+    fazendas = consulta(Fazenda, 'lista').all()
+    return render_template('admin/fazendas/listar.html', fazendas=fazendas,
+                           total_pessoas=pessoas_por_fazenda(), total_documentos=documentos_por_fazenda())
 
 @admin_bp.route('/fazendas/nova', methods=['GET', 'POST'])
 @login_required
@@ -479,23 +484,21 @@ def excluir_fazenda(id):
 @login_required
 def listar_documentos_fazenda(id):
     """Lista os documentos associados a uma fazenda."""
-    fazenda = Fazenda.query.get_or_404(id)
-    documentos = Documento.query.filter_by(fazenda_id=id).all()
-    return render_template('admin/fazendas/documentos.html', fazenda=fazenda, documentos=documentos)
+    fazenda = consulta(Fazenda, 'com_documentos').filter_by(id=id).first_or_404()
+    return render_template('admin/fazendas/documentos.html', fazenda=fazenda, documentos=fazenda.documentos)
 
 # Rotas para Documentos
 @admin_bp.route('/documentos')
 @login_required
 def listar_documentos():
     """Lista todos os documentos cadastrados, com filtros."""
-    fazendas = Fazenda.query.order_by(Fazenda.nome).all()
-    pessoas = Pessoa.query.order_by(Pessoa.nome).all()
-
     fazenda_id = request.args.get("fazenda_id", type=int)
     pessoa_id = request.args.get("pessoa_id", type=int)
+    fazendas = opcoes_select('fazendas', [fazenda_id])
+    pessoas = opcoes_select('pessoas', [pessoa_id])
     nome_busca = request.args.get("busca", "")
 
-    query = Documento.query
+    query = consulta(Documento, 'lista')
 
     if fazenda_id:
         query = query.filter(Documento.fazenda_id == fazenda_id)
@@ -521,8 +524,8 @@ def listar_documentos():
 @login_required
 def novo_documento():
     """Cadastra um novo documento."""
-    fazendas = Fazenda.query.all()
-    pessoas = Pessoa.query.all()
+    fazendas = opcoes_select('fazendas', [request.form.get('fazenda_id')])
+    pessoas = opcoes_select('pessoas', [request.form.get('pessoa_id')])
     tipos_documento = TipoDocumento  # Enum para template
 
     if request.method == 'POST':
@@ -609,8 +612,8 @@ def novo_documento():
 def editar_documento(id):
     """Edita um documento existente."""
     documento = Documento.query.get_or_404(id)
-    fazendas = Fazenda.query.all()
-    pessoas = Pessoa.query.all()
+    fazendas = opcoes_select('fazendas', [documento.fazenda_id, request.form.get('fazenda_id')])
+    pessoas = opcoes_select('pessoas', [documento.pessoa_id, request.form.get('pessoa_id')])
     
     if request.method == 'POST':
         nome = request.form.get('nome')
@@ -786,13 +789,13 @@ def listar_documentos_vencidos():
     hoje = datetime.date.today()
     
     # Documentos já vencidos
-    documentos_vencidos = Documento.query.filter(
+    documentos_vencidos = consulta(Documento, 'lista').filter(
         Documento.data_vencimento < hoje
     ).order_by(Documento.data_vencimento).all()
     
     # Documentos próximos do vencimento (30 dias)
     data_limite = hoje + datetime.timedelta(days=30)
-    documentos_proximos = Documento.query.filter(
+    documentos_proximos = consulta(Documento, 'lista').filter(
         Documento.data_vencimento >= hoje,
         Documento.data_vencimento <= data_limite
     ).order_by(Documento.data_vencimento).all()
@@ -802,40 +805,67 @@ def listar_documentos_vencidos():
                           documentos_proximos=documentos_proximos)
 
 # --------- Envio real de notificações de documentos ---------
+# Mensagens por chamada ao send_many (granularidade do progresso do job)
+LOTE_NOTIFICACOES = 20
+
+def _job_notificacoes_documentos(progresso):
+    """Job em segundo plano: envia as notificações de vencimento de documentos."""
+    documentos = []
+    mensagens = []
+    # chave: dias que faltam de fato até o vencimento (não o prazo de proxima_notificacao)
+    for dias_restantes, docs in verificar_documentos_vencendo().items():
+        for doc in docs:
+            emails = []
+            if hasattr(doc, 'emails_notificacao') and doc.emails_notificacao:
+                if isinstance(doc.emails_notificacao, list):
+                    emails = doc.emails_notificacao
+                else:
+                    emails = [e.strip() for e in doc.emails_notificacao.split(',') if e.strip()]
+            if not emails:
+                # Nada a enviar neste prazo
+                doc.avancar_notificacao()
+                continue
+            assunto, corpo_html = formatar_email_notificacao(doc, dias_restantes)
+            documentos.append(doc)
+            mensagens.append((emails, assunto, corpo_html, True))
+    progresso.definir_total(len(mensagens))
+
+    email_service = EmailService()
+    erros = []
+    for inicio in range(0, len(mensagens), LOTE_NOTIFICACOES):
+        # Envio em paralelo, reutilizando as conexões SMTP
+        resultados = email_service.send_many(mensagens[inicio:inicio + LOTE_NOTIFICACOES])
+        falhas = []
+        for doc, enviado in zip(documentos[inicio:], resultados):
+            if enviado:
+                doc.avancar_notificacao()
+            else:
+                # Continua devida: será tentada na próxima execução
+                falhas.append(doc.nome)
+        db.session.commit()
+        erros.extend(falhas)
+        progresso.registrar(enviados=len(resultados) - len(falhas), falhas=len(falhas))
+    db.session.commit()
+    return {'total': len(mensagens), 'enviados': len(mensagens) - len(erros), 'erros': erros}
+
 @admin_bp.route('/documentos/notificacoes', methods=['GET', 'POST'])
 @login_required
 def notificacoes_documentos():
-    """Gerencia notificações de vencimento de documentos."""
-    documentos_por_prazo = verificar_documentos_vencendo()
+    """Gerencia notificações de vencimento de documentos.
+
+    O POST apenas agenda o envio em segundo plano; o progresso é
+    acompanhado em ``/jobs/<id>``.
+    """
     if request.method == 'POST':
-        total = 0
-        enviados = 0
-        erros = []
-        for prazo, docs in documentos_por_prazo.items():
-            for doc in docs:
-                emails = []
-                if hasattr(doc, 'emails_notificacao') and doc.emails_notificacao:
-                    if isinstance(doc.emails_notificacao, list):
-                        emails = doc.emails_notificacao
-                    else:
-                        emails = [e.strip() for e in doc.emails_notificacao.split(',') if e.strip()]
-                if not emails:
-                    continue
-                assunto, corpo_html = formatar_email_notificacao(doc, prazo)
-                enviado = EmailService().send_email(emails, assunto, corpo_html, html=True)
-                total += 1
-                if enviado:
-                    enviados += 1
-                else:
-                    erros.append(doc.nome)
-        if enviados:
-            flash(f'{enviados} de {total} notificações enviadas com sucesso!', 'success')
-        else:
-            flash('Nenhuma notificação enviada. Verifique se há e-mails cadastrados.', 'warning')
-        if erros:
-            flash(f'Falha ao enviar notificação para: {", ".join(erros)}', 'danger')
-        return redirect(url_for('admin.notificacoes_documentos'))
-    return render_template('admin/documentos/notificacoes.html', documentos_por_prazo=documentos_por_prazo)
+        job_id = iniciar_job('notificacoes_documentos', _job_notificacoes_documentos)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job_id, 'status_url': url_for('jobs.status_job', job_id=job_id)}), 202
+        flash('Envio de notificações em andamento. Acompanhe o progresso abaixo.', 'info')
+        return redirect(url_for('admin.notificacoes_documentos', job=job_id))
+    documentos_por_prazo = verificar_documentos_vencendo()
+    return render_template('admin/documentos/notificacoes.html',
+                           documentos_por_prazo=documentos_por_prazo,
+                           job_id=request.args.get('job'))
 
 
 @admin_bp.route('/testar-email', methods=['POST'])
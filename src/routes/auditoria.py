@@ -6,6 +6,7 @@ from flask_login import login_required
 from src.models.fazenda import Fazenda
 from src.models.pessoa import Pessoa
 from src.models.db import db
+from src.utils.opcoes import listar_opcoes
 import json
 
 auditoria_bp = Blueprint('auditoria', __name__)
@@ -58,8 +59,8 @@ def painel_auditoria():
     logs = query.order_by(Auditoria.data_hora.desc()).limit(100).all()
 
     # Pré-carregar todas as fazendas e pessoas em dicionários para evitar N+1 queries
-    fazendas = {f.id: f.nome for f in Fazenda.query.all()}
-    pessoas = {p.id: p.nome for p in Pessoa.query.all()}
+    fazendas = dict(listar_opcoes('fazendas'))
+    pessoas = dict(listar_opcoes('pessoas'))
 
     def extrair_identificacao(log):
         try:
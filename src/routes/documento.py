@@ -12,6 +12,10 @@ from src.models.documento import Documento, TipoDocumento, TipoEntidade
 from src.models.fazenda import Fazenda
 from src.models.pessoa import Pessoa
 from src.utils.email_service import enviar_email_teste
+from src.utils.carregamento import consulta
+from src.utils.exportacao import resposta_exportacao
+from src.utils.vencimentos import classificar_documentos
+from src.utils.paginacao import ParametroInvalido, ler_campos, selecionar_campos, pedido_paginado, paginar_keyset
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import os
 import datetime
@@ -27,42 +31,85 @@ def data_valida(data_str):
     except ValueError:
         return None
 
+CAMPOS_DOCUMENTO = (
+    'id', 'nome', 'tipo', 'tipo_personalizado', 'data_emissao', 'data_vencimento', 'tipo_entidade',
+    'fazenda_id', 'pessoa_id', 'entidade_nome', 'emails_notificacao', 'prazos_notificacao',
+    'esta_vencido', 'proximo_vencimento'
+)
+CAMPOS_NOTIFICACAO = ('emails_notificacao', 'prazos_notificacao')
+
+def _serializar_documento(documento, campos=None):
+    dados = {
+        'id': documento.id,
+        'nome': documento.nome,
+        'tipo': documento.tipo.value,
+        'tipo_personalizado': documento.tipo_personalizado,
+        'data_emissao': documento.data_emissao.isoformat(),
+        'data_vencimento': documento.data_vencimento.isoformat() if documento.data_vencimento else None,
+        'tipo_entidade': documento.tipo_entidade.value,
+        'fazenda_id': documento.fazenda_id,
+        'pessoa_id': documento.pessoa_id,
+        'esta_vencido': documento.esta_vencido,
+        'proximo_vencimento': documento.proximo_vencimento
+    }
+    # prazos e e-mails só quando pedidos: vêm de um SELECT próprio cada
+    for campo in CAMPOS_NOTIFICACAO:
+        if campos is None or campo in campos:
+            dados[campo] = getattr(documento, campo)
+    if campos is None or 'entidade_nome' in campos:
+        entidade_nome = None
+        if documento.tipo_entidade == TipoEntidade.FAZENDA and documento.fazenda:
+            entidade_nome = documento.fazenda.nome
+        elif documento.tipo_entidade == TipoEntidade.PESSOA and documento.pessoa:
+            entidade_nome = documento.pessoa.nome
+        dados['entidade_nome'] = entidade_nome
+    return selecionar_campos(dados, campos)
+
 @documento_bp.route('/', methods=['GET'])
 def listar_documentos():
-    """Lista todos os documentos cadastrados."""
+    """Lista os documentos cadastrados.
+
+    Com ``limit`` ou ``cursor`` a resposta é paginada por ``(data_vencimento, id)``,
+    com os documentos sem vencimento ao final: ``{'itens': [...], 'next_cursor': ...}``.
+    ``fields`` restringe os campos.
+    """
     try:
-        documentos = Documento.query.all()
-        resultado = []
-        
-        for documento in documentos:
-            entidade_nome = None
-            if documento.tipo_entidade == TipoEntidade.FAZENDA and documento.fazenda:
-                entidade_nome = documento.fazenda.nome
-            elif documento.tipo_entidade == TipoEntidade.PESSOA and documento.pessoa:
-                entidade_nome = documento.pessoa.nome
-                
-            resultado.append({
-                'id': documento.id,
-                'nome': documento.nome,
-                'tipo': documento.tipo.value,
-                'tipo_personalizado': documento.tipo_personalizado,
-                'data_emissao': documento.data_emissao.isoformat(),
-                'data_vencimento': documento.data_vencimento.isoformat() if documento.data_vencimento else None,
-                'tipo_entidade': documento.tipo_entidade.value,
-                'fazenda_id': documento.fazenda_id,
-                'pessoa_id': documento.pessoa_id,
-                'entidade_nome': entidade_nome,
-                'emails_notificacao': documento.emails_notificacao,
-                'prazos_notificacao': documento.prazos_notificacao,
-                'esta_vencido': documento.esta_vencido,
-                'proximo_vencimento': documento.proximo_vencimento
-            })
-        
-        return jsonify(resultado)
+        campos = ler_campos(request.args, CAMPOS_DOCUMENTO)
+        # o nome da entidade vem no mesmo SELECT (perfil "lista")
+        query = Documento.query
+        if campos is None or 'entidade_nome' in campos:
+            query = consulta(Documento, 'lista')
+        elif campos.intersection(CAMPOS_NOTIFICACAO):
+            query = consulta(Documento, 'notificacao')
+
+        if not pedido_paginado(request.args):
+            return jsonify([_serializar_documento(d, campos) for d in query.all()])
+
+        documentos, proximo_cursor, limite = paginar_keyset(
+            query, Documento.data_vencimento, Documento.id, request.args,
+            converter=datetime.date.fromisoformat, nulos=True
+        )
+        return jsonify({
+            'itens': [_serializar_documento(d, campos) for d in documentos],
+            'next_cursor': proximo_cursor,
+            'limit': limite
+        })
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Erro ao listar documentos: {str(e)}")
         return jsonify({'erro': 'Erro ao listar documentos', 'detalhes': str(e)}), 500
 
+@documento_bp.route('/export', methods=['GET'])
+def exportar_documentos():
+    """Exporta os documentos em streaming (``?format=ndjson|csv``)."""
+    try:
+        # as entidades vêm no mesmo SELECT, sem carregar as coleções delas
+        query = consulta(Documento, 'lista').order_by(Documento.id)
+        return resposta_exportacao(query, _serializar_documento, CAMPOS_DOCUMENTO, 'documentos')
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+
 @documento_bp.route('/<int:id>', methods=['GET'])
 def obter_documento(id):
     """Obtém detalhes de um documento específico."""
@@ -359,47 +406,47 @@ def excluir_documento(id):
         current_app.logger.error(f"Erro ao excluir documento {id}: {str(e)}")
         return jsonify({'erro': 'Erro ao excluir documento', 'detalhes': str(e)}), 500
 
+def _nome_entidade(documento):
+    if documento.tipo_entidade == TipoEntidade.FAZENDA and documento.fazenda:
+        return documento.fazenda.nome
+    if documento.tipo_entidade == TipoEntidade.PESSOA and documento.pessoa:
+        return documento.pessoa.nome
+    return None
+
 @documento_bp.route('/vencidos', methods=['GET'])
 def listar_documentos_vencidos():
     """Lista todos os documentos vencidos ou próximos do vencimento."""
     try:
-        documentos = Documento.query.filter(Documento.data_vencimento.isnot(None)).all()
+        documentos_vencidos, documentos_proximos = classificar_documentos()
         vencidos = []
         proximos_vencimento = []
         
-        for documento in documentos:
-            entidade_nome = None
-            if documento.tipo_entidade == TipoEntidade.FAZENDA and documento.fazenda:
-                entidade_nome = documento.fazenda.nome
-            elif documento.tipo_entidade == TipoEntidade.PESSOA and documento.pessoa:
-                entidade_nome = documento.pessoa.nome
-                
-            if documento.esta_vencido:
-                vencidos.append({
-                    'id': documento.id,
-                    'nome': documento.nome,
-                    'tipo': documento.tipo.value,
-                    'data_vencimento': documento.data_vencimento.isoformat(),
-                    'tipo_entidade': documento.tipo_entidade.value,
-                    'fazenda_id': documento.fazenda_id,
-                    'pessoa_id': documento.pessoa_id,
-                    'entidade_nome': entidade_nome,
-                    'emails_notificacao': documento.emails_notificacao
-                })
-            elif documento.precisa_notificar:
-                proximos_vencimento.append({
-                    'id': documento.id,
-                    'nome': documento.nome,
-                    'tipo': documento.tipo.value,
-                    'data_vencimento': documento.data_vencimento.isoformat(),
-                    'dias_restantes': documento.proximo_vencimento,
-                    'tipo_entidade': documento.tipo_entidade.value,
-                    'fazenda_id': documento.fazenda_id,
-                    'pessoa_id': documento.pessoa_id,
-                    'entidade_nome': entidade_nome,
-                    'emails_notificacao': documento.emails_notificacao,
-                    'prazos_notificacao': documento.prazos_notificacao
-                })
+        for documento in documentos_vencidos:
+            vencidos.append({
+                'id': documento.id,
+                'nome': documento.nome,
+                'tipo': documento.tipo.value,
+                'data_vencimento': documento.data_vencimento.isoformat(),
+                'tipo_entidade': documento.tipo_entidade.value,
+                'fazenda_id': documento.fazenda_id,
+                'pessoa_id': documento.pessoa_id,
+                'entidade_nome': _nome_entidade(documento),
+                'emails_notificacao': documento.emails_notificacao
+            })
+        for documento in documentos_proximos:
+            proximos_vencimento.append({
+                'id': documento.id,
+                'nome': documento.nome,
+                'tipo': documento.tipo.value,
+                'data_vencimento': documento.data_vencimento.isoformat(),
+                'dias_restantes': documento.proximo_vencimento,
+                'tipo_entidade': documento.tipo_entidade.value,
+                'fazenda_id': documento.fazenda_id,
+                'pessoa_id': documento.pessoa_id,
+                'entidade_nome': _nome_entidade(documento),
+                'emails_notificacao': documento.emails_notificacao,
+                'prazos_notificacao': documento.prazos_notificacao
+            })
         
         return jsonify({
             'vencidos': vencidos,
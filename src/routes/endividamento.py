@@ -6,54 +6,67 @@ from src.models.db import db
 from src.models.endividamento import Endividamento, EndividamentoFazenda, Parcela
 from src.models.notificacao_endividamento import NotificacaoEndividamento
 from src.models.pessoa import Pessoa
-from src.models.fazenda import Fazenda
 from src.forms.endividamento import EndividamentoForm, FiltroEndividamentoForm
 from src.forms.notificacao_endividamento import NotificacaoEndividamentoForm
 from src.utils.validators import validate_required_fields, sanitize_input
 from src.utils.notificacao_endividamento_service import NotificacaoEndividamentoService
+from src.utils.performance import rate_limit
+from src.utils.exportacao import resposta_exportacao
+from src.utils.jobs import iniciar_job
+from src.utils.paginacao import selecionar_campos
+from src.utils.opcoes import opcoes_select
+from src.utils.fluxo_endividamento import projetar_fluxo, MESES_PADRAO, MESES_MAXIMO
 from datetime import datetime, date
 import json
 
 endividamento_bp = Blueprint('endividamento', __name__, url_prefix='/endividamentos')
 
-@endividamento_bp.route('/')
-def listar():
-    """Lista todos os endividamentos com filtros opcionais"""
-    form_filtro = FiltroEndividamentoForm()
+def _filtrar_endividamentos(query, args):
+    """Aplica os filtros da listagem (também usados na exportação)"""
+    if args.get('banco'):
+        query = query.filter(Endividamento.banco.ilike(f"%{args.get('banco')}%"))
     
-    # Preencher opções dos selects
-    form_filtro.pessoa_id.choices = [(0, 'Todas as pessoas')] + [(p.id, p.nome) for p in Pessoa.query.all()]
-    form_filtro.fazenda_id.choices = [(0, 'Todas as fazendas')] + [(f.id, f.nome) for f in Fazenda.query.all()]
+    if args.get('pessoa_id') and int(args.get('pessoa_id')) > 0:
+        query = query.join(Endividamento.pessoas).filter(Pessoa.id == int(args.get('pessoa_id')))
     
-    # Construir query base
-    query = Endividamento.query
+    if args.get('fazenda_id') and int(args.get('fazenda_id')) > 0:
+        query = query.join(Endividamento.fazenda_vinculos).filter(EndividamentoFazenda.fazenda_id == int(args.get('fazenda_id')))
     
-    # Aplicar filtros se fornecidos
-    if request.args.get('banco'):
-        query = query.filter(Endividamento.banco.ilike(f"%{request.args.get('banco')}%"))
-    
-    if request.args.get('pessoa_id') and int(request.args.get('pessoa_id')) > 0:
-        query = query.join(Endividamento.pessoas).filter(Pessoa.id == int(request.args.get('pessoa_id')))
-    
-    if request.args.get('fazenda_id') and int(request.args.get('fazenda_id')) > 0:
-        query = query.join(Endividamento.fazenda_vinculos).filter(EndividamentoFazenda.fazenda_id == int(request.args.get('fazenda_id')))
-    
-    if request.args.get('data_inicio'):
-        data_inicio = datetime.strptime(request.args.get('data_inicio'), '%Y-%m-%d').date()
+    if args.get('data_inicio'):
+        data_inicio = datetime.strptime(args.get('data_inicio'), '%Y-%m-%d').date()
         query = query.filter(Endividamento.data_emissao >= data_inicio)
     
-    if request.args.get('data_fim'):
-        data_fim = datetime.strptime(request.args.get('data_fim'), '%Y-%m-%d').date()
+    if args.get('data_fim'):
+        data_fim = datetime.strptime(args.get('data_fim'), '%Y-%m-%d').date()
         query = query.filter(Endividamento.data_emissao <= data_fim)
     
-    if request.args.get('vencimento_inicio'):
-        venc_inicio = datetime.strptime(request.args.get('vencimento_inicio'), '%Y-%m-%d').date()
+    if args.get('vencimento_inicio'):
+        venc_inicio = datetime.strptime(args.get('vencimento_inicio'), '%Y-%m-%d').date()
         query = query.filter(Endividamento.data_vencimento_final >= venc_inicio)
     
-    if request.args.get('vencimento_fim'):
-        venc_fim = datetime.strptime(request.args.get('vencimento_fim'), '%Y-%m-%d').date()
+    if args.get('vencimento_fim'):
+        venc_fim = datetime.strptime(args.get('vencimento_fim'), '%Y-%m-%d').date()
         query = query.filter(Endividamento.data_vencimento_final <= venc_fim)
     
+    return query
+
+@endividamento_bp.route('/')
+def listar():
+    """Lista todos os endividamentos com filtros opcionais"""
+    form_filtro = FiltroEndividamentoForm()
+    
+    # Preencher opções dos selects
+    pessoas = opcoes_select('pessoas', [request.args.get('pessoa_id')])
+    fazendas = opcoes_select('fazendas', [request.args.get('fazenda_id')])
+    form_filtro.pessoa_id.choices = [(0, 'Todas as pessoas')] + pessoas
+    form_filtro.fazenda_id.choices = [(0, 'Todas as fazendas')] + fazendas
+    if pessoas.typeahead:
+        form_filtro.pessoa_id.render_kw = {'data-opcoes-url': url_for('pessoa.opcoes_pessoas')}
+    if fazendas.typeahead:
+        form_filtro.fazenda_id.render_kw = {'data-opcoes-url': url_for('fazenda.opcoes_fazendas')}
+    
+    query = _filtrar_endividamentos(Endividamento.query, request.args)
+    
     # Ordenar por data de vencimento final
     endividamentos = query.order_by(Endividamento.data_vencimento_final.asc()).all()
     
@@ -142,13 +155,11 @@ def novo():
         else:
             flash('Erro na validação do formulário. Verifique os dados informados.', 'danger')
     
-    # Carregar dados para os selects
-    pessoas = Pessoa.query.all()
-    fazendas = Fazenda.query.all()
+    # Carregar dados para os selects (as pessoas são buscadas por /buscar-pessoas)
+    fazendas = opcoes_select('fazendas', request.form.getlist('objeto_fazenda') + request.form.getlist('garantia_fazenda'))
     
     return render_template('admin/endividamentos/form.html', 
                          form=form, 
-                         pessoas=pessoas, 
                          fazendas=fazendas,
                          endividamento=None)
 
@@ -219,18 +230,21 @@ def editar(id):
                     )
                     db.session.add(vinculo)
                 
-                # Remover parcelas existentes
-                Parcela.query.filter_by(endividamento_id=id).delete()
+                # Remover parcelas existentes com session.delete, e não por DELETE em massa
+                # nem por delete-orphan, que não aparecem em session.deleted: o resumo do
+                # dashboard (src/utils/dashboard.py) precisa ver as remoções
+                for parcela in list(endividamento.parcelas):
+                    db.session.delete(parcela)
                 
                 # Recriar parcelas
                 parcelas  = json.loads(request.form.get('parcelas') or '[]')
-                for parc in parcelas:
-                    parcela = Parcela(
-                        endividamento_id=endividamento.id,
+                endividamento.parcelas = [
+                    Parcela(
                         data_vencimento=datetime.strptime(parc['data_vencimento'], '%Y-%m-%d').date(),
                         valor=float(parc['valor'])
                     )
-                    db.session.add(parcela)
+                    for parc in parcelas
+                ]
                 
                 db.session.commit()
                 flash('Endividamento atualizado com sucesso!', 'success')
@@ -242,13 +256,11 @@ def editar(id):
         else:
             flash('Erro na validação do formulário. Verifique os dados informados.', 'danger')
     
-    # Carregar dados para os selects
-    pessoas = Pessoa.query.all()
-    fazendas = Fazenda.query.all()
+    # Carregar dados para os selects (as pessoas são buscadas por /buscar-pessoas)
+    fazendas = opcoes_select('fazendas', [vinculo.fazenda_id for vinculo in endividamento.fazenda_vinculos])
     
     return render_template('admin/endividamentos/form.html', 
                          form=form, 
-                         pessoas=pessoas, 
                          fazendas=fazendas,
                          endividamento=endividamento)
 
@@ -313,6 +325,79 @@ def pagar_parcela(id):
     
     return redirect(url_for('endividamento.vencimentos'))
 
+CAMPOS_EXPORTACAO_ENDIVIDAMENTO = (
+    'id', 'banco', 'numero_proposta', 'data_emissao', 'data_vencimento_final', 'taxa_juros',
+    'tipo_taxa_juros', 'prazo_carencia', 'valor_operacao', 'created_at', 'updated_at'
+)
+CAMPOS_EXPORTACAO_PARCELA = (
+    'id', 'endividamento_id', 'data_vencimento', 'valor', 'pago', 'data_pagamento', 'valor_pago', 'observacoes'
+)
+
+def _serializar_para_exportacao(registro, campos):
+    return selecionar_campos(registro.to_dict(), campos)
+
+# Varreduras completas das tabelas: limites menores que os da API de cadastro
+@endividamento_bp.route('/api/export')
+@rate_limit(max_requests=10, window=60)
+def exportar_endividamentos():
+    """Exporta os endividamentos em streaming (``?format=ndjson|csv``), com os filtros da listagem"""
+    try:
+        query = _filtrar_endividamentos(Endividamento.query, request.args).order_by(Endividamento.id)
+        return resposta_exportacao(query, _serializar_para_exportacao, CAMPOS_EXPORTACAO_ENDIVIDAMENTO, 'endividamentos')
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+
+@endividamento_bp.route('/api/parcelas/export')
+@rate_limit(max_requests=10, window=60)
+def exportar_parcelas():
+    """Exporta as parcelas em streaming, filtrando por endividamento, situação e vencimento"""
+    try:
+        query = Parcela.query
+        if request.args.get('endividamento_id'):
+            query = query.filter(Parcela.endividamento_id == int(request.args.get('endividamento_id')))
+        if request.args.get('pago') in ('true', 'false'):
+            query = query.filter(Parcela.pago == (request.args.get('pago') == 'true'))
+        if request.args.get('vencimento_inicio'):
+            venc_inicio = datetime.strptime(request.args.get('vencimento_inicio'), '%Y-%m-%d').date()
+            query = query.filter(Parcela.data_vencimento >= venc_inicio)
+        if request.args.get('vencimento_fim'):
+            venc_fim = datetime.strptime(request.args.get('vencimento_fim'), '%Y-%m-%d').date()
+            query = query.filter(Parcela.data_vencimento <= venc_fim)
+        query = query.order_by(Parcela.id)
+        return resposta_exportacao(query, _serializar_para_exportacao, CAMPOS_EXPORTACAO_PARCELA, 'parcelas')
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+
+@endividamento_bp.route('/api/analise')
+@rate_limit(max_requests=30, window=60)
+def analise_carteira():
+    """Saldo devedor, VPL, taxa média e fluxo mensal da carteira (total, por banco e por pessoa)"""
+    # Import tardio: o NumPy só é carregado quando a análise é pedida
+    from src.utils.analise_endividamento import analisar_carteira, AnaliseIndisponivel
+    try:
+        taxa_desconto = float(request.args.get('taxa_desconto', 0.1))
+        if not 0 <= taxa_desconto < 10:
+            raise ValueError('taxa_desconto deve estar entre 0 e 10 (fração anual, ex.: 0.12)')
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    detalhar = request.args.get('detalhar') in ('1', 'true')
+    try:
+        return jsonify(analisar_carteira(date.today().isoformat(), taxa_desconto, detalhar))
+    except AnaliseIndisponivel as e:
+        return jsonify({'erro': str(e)}), 503
+
+@endividamento_bp.route('/api/fluxo')
+@rate_limit(max_requests=30, window=60)
+def fluxo_pagamentos():
+    """Valor a pagar por mês nos próximos meses, no total, por banco e por pessoa"""
+    try:
+        meses = int(request.args.get('meses', MESES_PADRAO))
+        if not 1 <= meses <= MESES_MAXIMO:
+            raise ValueError(f'meses deve estar entre 1 e {MESES_MAXIMO}')
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    return jsonify(projetar_fluxo(date.today().isoformat(), meses))
+
 @endividamento_bp.route('/api/fazendas/<int:pessoa_id>')
 def api_fazendas_pessoa(pessoa_id):
     """API para obter fazendas de uma pessoa"""
@@ -323,6 +408,7 @@ def api_fazendas_pessoa(pessoa_id):
 
 
 @endividamento_bp.route('/buscar-pessoas')
+@rate_limit(max_requests=60, window=60)
 def buscar_pessoas():
     """Endpoint para busca AJAX de pessoas"""
     termo = request.args.get('q', '').strip()
@@ -394,17 +480,23 @@ def configurar_notificacoes(id):
                          historico=historico)
 
 @endividamento_bp.route('/api/processar-notificacoes', methods=['POST'])
+@rate_limit(max_requests=5, window=60)
 def processar_notificacoes():
-    """API para processar notificações manualmente (para testes)"""
+    """API para processar notificações manualmente.
+
+    Agenda um job que enfileira as notificações do dia e drena a outbox;
+    o progresso é acompanhado em ``/jobs/<id>``.
+    """
     try:
         service = NotificacaoEndividamentoService()
-        notificacoes_enviadas = service.verificar_e_enviar_notificacoes()
+        job_id = iniciar_job('notificacoes_endividamento', service.job_enviar_notificacoes)
         
         return jsonify({
             'sucesso': True,
-            'notificacoes_enviadas': notificacoes_enviadas,
-            'mensagem': f'{notificacoes_enviadas} notificações foram enviadas.'
-        })
+            'job_id': job_id,
+            'status_url': url_for('jobs.status_job', job_id=job_id),
+            'mensagem': 'Processamento de notificações iniciado.'
+        }), 202
         
     except Exception as e:
         return jsonify({
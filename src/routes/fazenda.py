@@ -3,39 +3,85 @@
 from flask import Blueprint, request, jsonify, current_app
 from src.models.db import db
 from src.models.fazenda import Fazenda, TipoPosse
+from src.utils.carregamento import consulta
+from src.utils.exportacao import resposta_exportacao
+from src.utils.opcoes import buscar_opcoes, LIMITE_BUSCA
+from src.utils.paginacao import ParametroInvalido, ler_limite, ler_campos, selecionar_campos, pedido_paginado, paginar_keyset
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import traceback
 
 fazenda_bp = Blueprint('fazenda', __name__, url_prefix='/api/fazendas')
 
+CAMPOS_FAZENDA = (
+    'id', 'nome', 'matricula', 'tamanho_total', 'area_consolidada', 'tamanho_disponivel',
+    'tipo_posse', 'municipio', 'estado', 'recibo_car', 'pessoas'
+)
+CAMPOS_EXPORTACAO_FAZENDA = CAMPOS_FAZENDA[:-1]  # exportação sem relacionamentos
+
+def _serializar_fazenda(fazenda, campos=None):
+    dados = {
+        'id': fazenda.id,
+        'nome': fazenda.nome,
+        'matricula': fazenda.matricula,
+        'tamanho_total': fazenda.tamanho_total,
+        'area_consolidada': fazenda.area_consolidada,
+        'tamanho_disponivel': fazenda.tamanho_disponivel,
+        'tipo_posse': fazenda.tipo_posse.value,
+        'municipio': fazenda.municipio,
+        'estado': fazenda.estado,
+        'recibo_car': fazenda.recibo_car
+    }
+    if campos is None or 'pessoas' in campos:
+        dados['pessoas'] = [{'id': p.id, 'nome': p.nome} for p in fazenda.pessoas]
+    return selecionar_campos(dados, campos)
+
 @fazenda_bp.route('/', methods=['GET'])
 def listar_fazendas():
-    """Lista todas as fazendas/áreas cadastradas."""
+    """Lista as fazendas/áreas cadastradas.
+
+    Com ``limit`` ou ``cursor`` a resposta é paginada por ``(nome, id)``:
+    ``{'itens': [...], 'next_cursor': ...}``. ``fields`` restringe os campos.
+    """
     try:
-        fazendas = Fazenda.query.all()
-        resultado = []
-        
-        for fazenda in fazendas:
-            pessoas = [{'id': p.id, 'nome': p.nome} for p in fazenda.pessoas]
-            resultado.append({
-                'id': fazenda.id,
-                'nome': fazenda.nome,
-                'matricula': fazenda.matricula,
-                'tamanho_total': fazenda.tamanho_total,
-                'area_consolidada': fazenda.area_consolidada,
-                'tamanho_disponivel': fazenda.tamanho_disponivel,
-                'tipo_posse': fazenda.tipo_posse.value,
-                'municipio': fazenda.municipio,
-                'estado': fazenda.estado,
-                'recibo_car': fazenda.recibo_car,
-                'pessoas': pessoas
-            })
-        
-        return jsonify(resultado)
+        campos = ler_campos(request.args, CAMPOS_FAZENDA)
+        # só as pessoas são serializadas (id e nome)
+        perfil = 'lista' if campos is not None and 'pessoas' not in campos else 'com_pessoas'
+        query = consulta(Fazenda, perfil)
+
+        if not pedido_paginado(request.args):
+            return jsonify([_serializar_fazenda(f, campos) for f in query.all()])
+
+        fazendas, proximo_cursor, limite = paginar_keyset(query, Fazenda.nome, Fazenda.id, request.args)
+        return jsonify({
+            'itens': [_serializar_fazenda(f, campos) for f in fazendas],
+            'next_cursor': proximo_cursor,
+            'limit': limite
+        })
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Erro ao listar fazendas: {str(e)}")
         return jsonify({'erro': 'Erro ao listar fazendas', 'detalhes': str(e)}), 500
 
+@fazenda_bp.route('/export', methods=['GET'])
+def exportar_fazendas():
+    """Exporta as fazendas/áreas em streaming (``?format=ndjson|csv``)."""
+    try:
+        query = consulta(Fazenda, 'lista').order_by(Fazenda.id)
+        return resposta_exportacao(query, _serializar_fazenda, CAMPOS_EXPORTACAO_FAZENDA, 'fazendas')
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+
+@fazenda_bp.route('/opcoes', methods=['GET'])
+def opcoes_fazendas():
+    """Busca por nome para os campos de seleção (``?q=termo&limit=n``): ``[{'id', 'nome'}]``."""
+    try:
+        limite = min(ler_limite(request.args), LIMITE_BUSCA)
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+    opcoes = buscar_opcoes('fazendas', request.args.get('q', '').strip(), limite)
+    return jsonify([opcao._asdict() for opcao in opcoes])
+
 @fazenda_bp.route('/<int:id>', methods=['GET'])
 def obter_fazenda(id):
     """Obtém detalhes de uma fazenda/área específica."""
@@ -286,7 +332,8 @@ def listar_pessoas_fazenda(id):
 def listar_documentos_fazenda(id):
     """Lista todos os documentos associados a uma fazenda/área."""
     try:
-        fazenda = Fazenda.query.get_or_404(id)
+        # documentos com prazos e e-mails, sem um SELECT por documento
+        fazenda = consulta(Fazenda, 'com_documentos').filter_by(id=id).first_or_404()
         documentos = []
         
         for documento in fazenda.documentos:
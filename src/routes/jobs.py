@@ -0,0 +1,16 @@
+#/src/routes/jobs.py
+
+from flask import Blueprint, jsonify
+from flask_login import login_required
+from src.utils.jobs import registry
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@login_required
+def status_job(job_id):
+    """Estado e progresso (total, enviados, falhas) de um job em segundo plano."""
+    estado = registry.obter(job_id)
+    if estado is None:
+        return jsonify({'erro': 'Job não encontrado'}), 404
+    return jsonify(estado)
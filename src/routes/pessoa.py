@@ -1,35 +1,78 @@
 from flask import Blueprint, request, jsonify, current_app
 from src.models.db import db
 from src.models.pessoa import Pessoa
+from src.utils.carregamento import consulta
+from src.utils.exportacao import resposta_exportacao
+from src.utils.opcoes import buscar_opcoes, LIMITE_BUSCA
+from src.utils.paginacao import ParametroInvalido, ler_limite, ler_campos, selecionar_campos, pedido_paginado, paginar_keyset
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import traceback
 
 pessoa_bp = Blueprint('pessoa', __name__, url_prefix='/api/pessoas')
 
+CAMPOS_PESSOA = ('id', 'nome', 'cpf_cnpj', 'email', 'telefone', 'endereco', 'fazendas')
+CAMPOS_EXPORTACAO_PESSOA = CAMPOS_PESSOA[:-1]  # exportação sem relacionamentos
+
+def _serializar_pessoa(pessoa, campos=None):
+    dados = {
+        'id': pessoa.id,
+        'nome': pessoa.nome,
+        'cpf_cnpj': pessoa.cpf_cnpj,
+        'email': pessoa.email,
+        'telefone': pessoa.telefone,
+        'endereco': pessoa.endereco
+    }
+    if campos is None or 'fazendas' in campos:
+        dados['fazendas'] = [{'id': f.id, 'nome': f.nome} for f in pessoa.fazendas]
+    return selecionar_campos(dados, campos)
+
 @pessoa_bp.route('/', methods=['GET'])
 def listar_pessoas():
-    """Lista todas as pessoas cadastradas."""
+    """Lista as pessoas cadastradas.
+
+    Com ``limit`` ou ``cursor`` a resposta é paginada por ``(nome, id)``:
+    ``{'itens': [...], 'next_cursor': ...}``. ``fields`` restringe os campos.
+    """
     try:
-        pessoas = Pessoa.query.all()
-        resultado = []
-        
-        for pessoa in pessoas:
-            fazendas = [{'id': f.id, 'nome': f.nome} for f in pessoa.fazendas]
-            resultado.append({
-                'id': pessoa.id,
-                'nome': pessoa.nome,
-                'cpf_cnpj': pessoa.cpf_cnpj,
-                'email': pessoa.email,
-                'telefone': pessoa.telefone,
-                'endereco': pessoa.endereco,
-                'fazendas': fazendas
-            })
-        
-        return jsonify(resultado)
+        campos = ler_campos(request.args, CAMPOS_PESSOA)
+        # só as fazendas são serializadas (id e nome)
+        perfil = 'lista' if campos is not None and 'fazendas' not in campos else 'com_fazendas'
+        query = consulta(Pessoa, perfil)
+
+        if not pedido_paginado(request.args):
+            return jsonify([_serializar_pessoa(p, campos) for p in query.all()])
+
+        pessoas, proximo_cursor, limite = paginar_keyset(query, Pessoa.nome, Pessoa.id, request.args)
+        return jsonify({
+            'itens': [_serializar_pessoa(p, campos) for p in pessoas],
+            'next_cursor': proximo_cursor,
+            'limit': limite
+        })
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Erro ao listar pessoas: {str(e)}")
         return jsonify({'erro': 'Erro ao listar pessoas', 'detalhes': str(e)}), 500
 
+@pessoa_bp.route('/export', methods=['GET'])
+def exportar_pessoas():
+    """Exporta as pessoas em streaming (``?format=ndjson|csv``)."""
+    try:
+        query = consulta(Pessoa, 'lista').order_by(Pessoa.id)
+        return resposta_exportacao(query, _serializar_pessoa, CAMPOS_EXPORTACAO_PESSOA, 'pessoas')
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+
+@pessoa_bp.route('/opcoes', methods=['GET'])
+def opcoes_pessoas():
+    """Busca por nome para os campos de seleção (``?q=termo&limit=n``): ``[{'id', 'nome'}]``."""
+    try:
+        limite = min(ler_limite(request.args), LIMITE_BUSCA)
+    except ParametroInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+    opcoes = buscar_opcoes('pessoas', request.args.get('q', '').strip(), limite)
+    return jsonify([opcao._asdict() for opcao in opcoes])
+
 @pessoa_bp.route('/<int:id>', methods=['GET'])
 def obter_pessoa(id):
     """Obtém detalhes de uma pessoa específica."""
@@ -290,7 +333,8 @@ def desassociar_fazenda(pessoa_id, fazenda_id):
 def listar_documentos_pessoa(id):
     """Lista todos os documentos associados a uma pessoa."""
     try:
-        pessoa = Pessoa.query.get_or_404(id)
+        # documentos com prazos e e-mails, sem um SELECT por documento
+        pessoa = consulta(Pessoa, 'com_documentos').filter_by(id=id).first_or_404()
         documentos = []
         
         for documento in pessoa.documentos:
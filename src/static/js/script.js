@@ -329,4 +329,40 @@ window.buscarPessoas = function() {
                 $resultados.show();
             }
         });
-};
\ No newline at end of file
+};
+// Selects com muitas opções (data-opcoes-url): busca por nome na API em vez de listar tudo
+window.ativarBuscaOpcoes = function(select) {
+    var $select = $(select);
+    if ($select.data('busca-ativa')) {
+        return;
+    }
+    $select.data('busca-ativa', true);
+    var $busca = $('<input type="search" class="form-control mb-1" autocomplete="off" placeholder="Digite ao menos 2 letras para buscar...">');
+    $select.before($busca);
+    var temporizador = null;
+    $busca.on('input', function() {
+        clearTimeout(temporizador);
+        var termo = $busca.val().trim();
+        if (termo.length < 2) {
+            return;
+        }
+        temporizador = setTimeout(function() {
+            $.getJSON($select.data('opcoes-url'), {q: termo}, function(opcoes) {
+                // mantém a opção vazia ("Todas"/"Selecione...") e a selecionada
+                var $manter = $select.find('option:selected').add($select.find('option').first());
+                $select.find('option').not($manter).remove();
+                opcoes.forEach(function(opcao) {
+                    if ($manter.filter(function() { return this.value === String(opcao.id); }).length === 0) {
+                        $select.append($('<option>').val(opcao.id).text(opcao.nome));
+                    }
+                });
+            });
+        }, 250);
+    });
+};
+
+$(document).ready(function() {
+    $('select[data-opcoes-url]').each(function() {
+        window.ativarBuscaOpcoes(this);
+    });
+});
@@ -0,0 +1,170 @@
+# Análise da carteira de endividamentos com cálculos vetorizados (NumPy)
+import logging
+from datetime import date
+from sqlalchemy import select, or_
+from src.models.db import db
+from src.models.endividamento import Endividamento, Parcela, endividamento_pessoa
+from src.models.pessoa import Pessoa
+from src.utils.performance import cached
+
+try:
+    import numpy as np
+except ImportError:  # dependência opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Tag de cache invalidada a cada escrita em endividamentos/parcelas
+TAG_CACHE = 'endividamentos'
+
+_EPOCA = date(1970, 1, 1).toordinal()
+
+
+class AnaliseIndisponivel(RuntimeError):
+    """NumPy não está instalado"""
+
+
+class Carteira:
+    """Parcelas em aberto em arrays, com índices para endividamento, banco e pessoa.
+
+    ``parcela_*`` têm uma posição por parcela; ``endividamento_*`` uma por
+    endividamento; ``vinculo_*`` uma por par (endividamento, pessoa).
+    """
+
+    def __init__(self, endividamentos, parcelas, vinculos):
+        self.endividamento_ids = np.array([linha[0] for linha in endividamentos], dtype=np.int64)
+        ordem = np.argsort(self.endividamento_ids)
+        self.endividamento_ids = self.endividamento_ids[ordem]
+        endividamentos = [endividamentos[i] for i in ordem]
+
+        self.bancos, self.endividamento_banco = np.unique(
+            np.array([linha[1] for linha in endividamentos], dtype=object).astype(str), return_inverse=True
+        )
+        taxas = np.array([float(linha[2] or 0) for linha in endividamentos], dtype=np.float64) / 100
+        mensal = np.array([linha[3] == 'mes' for linha in endividamentos], dtype=bool)
+        # Taxa efetiva anual: mensal -> (1 + i)^12 - 1
+        self.endividamento_taxa_anual = np.where(mensal, (1 + taxas) ** 12 - 1, taxas)
+
+        n = len(parcelas)
+        self.parcela_endividamento = np.searchsorted(
+            self.endividamento_ids, np.fromiter((linha[0] for linha in parcelas), np.int64, n)
+        )
+        self.parcela_ordinal = np.fromiter((linha[1].toordinal() for linha in parcelas), np.int64, n)
+        self.parcela_valor = np.fromiter((float(linha[2]) for linha in parcelas), np.float64, n)
+
+        pessoas = {}
+        for _, pessoa_id, nome in vinculos:
+            pessoas.setdefault(pessoa_id, nome)
+        self.pessoa_ids = np.array(sorted(pessoas), dtype=np.int64)
+        self.pessoa_nomes = [pessoas[pessoa_id] for pessoa_id in self.pessoa_ids.tolist()]
+        m = len(vinculos)
+        self.vinculo_endividamento = np.searchsorted(
+            self.endividamento_ids, np.fromiter((linha[0] for linha in vinculos), np.int64, m)
+        )
+        self.vinculo_pessoa = np.searchsorted(
+            self.pessoa_ids, np.fromiter((linha[1] for linha in vinculos), np.int64, m)
+        )
+
+
+def carregar_carteira():
+    """Lê, sem instanciar modelos, as parcelas em aberto e os dados necessários"""
+    if np is None:
+        raise AnaliseIndisponivel('NumPy não está instalado')
+    endividamentos = db.session.execute(select(
+        Endividamento.id, Endividamento.banco, Endividamento.taxa_juros, Endividamento.tipo_taxa_juros
+    )).all()
+    parcelas = db.session.execute(select(
+        Parcela.endividamento_id, Parcela.data_vencimento, Parcela.valor
+    ).where(or_(Parcela.pago == False, Parcela.pago.is_(None)))).all()
+    vinculos = db.session.execute(select(
+        endividamento_pessoa.c.endividamento_id, Pessoa.id, Pessoa.nome
+    ).join(Pessoa, Pessoa.id == endividamento_pessoa.c.pessoa_id)).all()
+    return Carteira(endividamentos, parcelas, vinculos)
+
+
+def _taxa_media(taxas, saldos, grupos, n):
+    """Média das taxas ponderada pelo saldo devedor, por grupo"""
+    pesos = np.bincount(grupos, weights=saldos, minlength=n)
+    somas = np.bincount(grupos, weights=taxas * saldos, minlength=n)
+    return np.divide(somas, pesos, out=np.zeros(n), where=pesos > 0)
+
+
+def _numero(nome, valor):
+    return int(valor) if nome == 'parcelas_em_aberto' else round(float(valor), 2)
+
+
+def _linhas(chaves, metricas, ordem):
+    return [
+        dict(chaves(i), **{nome: _numero(nome, valores[i]) for nome, valores in metricas.items()})
+        for i in ordem.tolist()
+    ]
+
+
+def calcular_resumo(carteira, hoje, taxa_desconto, detalhar=False):
+    """
+    Calcula saldo devedor, valor vencido, VPL (taxa anual ``taxa_desconto``),
+    taxa média ponderada (% a.a.) e fluxo mensal, no total e por banco e por
+    pessoa. Em endividamentos com várias pessoas o valor integral conta para
+    cada uma (obrigação solidária).
+    """
+    n = len(carteira.endividamento_ids)
+    dias = carteira.parcela_ordinal - hoje.toordinal()
+    valor = carteira.parcela_valor
+    # Parcelas vencidas são descontadas como se vencessem hoje
+    fator = (1 + taxa_desconto) ** (-np.maximum(dias, 0) / 365.0)
+
+    por_endividamento = {
+        'saldo_devedor': np.bincount(carteira.parcela_endividamento, weights=valor, minlength=n),
+        'vencido': np.bincount(carteira.parcela_endividamento, weights=valor * (dias < 0), minlength=n),
+        'vpl': np.bincount(carteira.parcela_endividamento, weights=valor * fator, minlength=n),
+        'parcelas_em_aberto': np.bincount(carteira.parcela_endividamento, minlength=n),
+    }
+    taxa = carteira.endividamento_taxa_anual
+    saldo = por_endividamento['saldo_devedor']
+
+    def agrupar(grupos, tamanho, origem):
+        metricas = {nome: np.bincount(grupos, weights=valores[origem], minlength=tamanho)
+                    for nome, valores in por_endividamento.items()}
+        metricas['taxa_media_ponderada'] = _taxa_media(taxa[origem], saldo[origem], grupos, tamanho) * 100
+        return metricas
+
+    todos = np.arange(n)
+    bancos = agrupar(carteira.endividamento_banco, len(carteira.bancos), todos)
+    pessoas = agrupar(carteira.vinculo_pessoa, len(carteira.pessoa_ids), carteira.vinculo_endividamento)
+
+    futuras = dias >= 0
+    meses_parcela = (carteira.parcela_ordinal[futuras] - _EPOCA).astype('datetime64[D]').astype('datetime64[M]')
+    meses, posicoes = np.unique(meses_parcela, return_inverse=True)
+    fluxo = np.bincount(posicoes, weights=valor[futuras], minlength=len(meses))
+
+    resumo = {
+        'referencia': hoje.isoformat(),
+        'taxa_desconto': taxa_desconto,
+        'total': {
+            'saldo_devedor': round(float(saldo.sum()), 2),
+            'vencido': round(float(por_endividamento['vencido'].sum()), 2),
+            'vpl': round(float(por_endividamento['vpl'].sum()), 2),
+            'parcelas_em_aberto': int(len(valor)),
+            'taxa_media_ponderada': round(float((taxa * saldo).sum() / saldo.sum() * 100), 2) if saldo.sum() > 0 else 0.0,
+        },
+        'por_banco': _linhas(lambda i: {'banco': str(carteira.bancos[i])}, bancos,
+                             np.argsort(-bancos['saldo_devedor'], kind='stable')),
+        'por_pessoa': _linhas(lambda i: {'pessoa_id': int(carteira.pessoa_ids[i]), 'nome': carteira.pessoa_nomes[i]},
+                              pessoas, np.argsort(-pessoas['saldo_devedor'], kind='stable')),
+        'fluxo_mensal': [{'mes': str(mes), 'valor': round(float(total), 2)} for mes, total in zip(meses, fluxo)],
+    }
+    if detalhar:
+        por_endividamento['taxa_anual'] = taxa * 100
+        resumo['por_endividamento'] = _linhas(
+            lambda i: {'endividamento_id': int(carteira.endividamento_ids[i]),
+                       'banco': str(carteira.bancos[carteira.endividamento_banco[i]])},
+            por_endividamento, np.argsort(-saldo, kind='stable')
+        )
+    return resumo
+
+
+@cached(timeout=600, key_prefix='analise_endividamento', tags=(TAG_CACHE,))
+def analisar_carteira(hoje=None, taxa_desconto=0.1, detalhar=False):
+    """Resumo da carteira de endividamentos (em cache até a próxima escrita)"""
+    hoje = date.fromisoformat(hoje) if isinstance(hoje, str) else (hoje or date.today())
+    return calcular_resumo(carregar_carteira(), hoje, taxa_desconto, detalhar)
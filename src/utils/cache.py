@@ -2,102 +2,596 @@
 import redis
 from flask import current_app
 import json
-import pickle
+import fnmatch
+import hashlib
+import datetime
+import decimal
+import enum
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import timedelta
+from functools import wraps
+from src.utils.cache_codec import CacheCodec, CodecError
+from src.utils.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Canal Redis usado para invalidar o cache local dos demais workers
+CANAL_INVALIDACAO = 'cache:invalidate'
+
+# Prefixo dos contadores de versão das tags (invalidação O(1))
+PREFIXO_TAG = 'cache:tag'
+
+# Prefixo dos locks de recomputação (single-flight)
+PREFIXO_LOCK = 'cache:lock'
+
+# Libera o lock apenas se ainda pertencer a quem o adquiriu
+_SCRIPT_LIBERAR_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Renova o prazo do lock apenas se ainda pertencer a quem o adquiriu
+_SCRIPT_RENOVAR_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Limites do cache local por prefixo de chave (max_size em entradas, ttl em segundos)
+LOCAL_CACHE_PREFIXOS_PADRAO = {
+    'dashboard': {'max_size': 32, 'ttl': 60},
+    # Listas (id, nome) dos selects: poucas entradas, invalidadas pela versão da tag
+    'opcoes': {'max_size': 16, 'ttl': 300},
+    # Versões de tags: TTL curto limita a defasagem caso o pub/sub falhe
+    'cache': {'max_size': 128, 'ttl': 30},
+}
+
+_AUSENTE = object()
+
+
+class LocalCache:
+    """Cache LRU em memória com expiração (TTL), limitado por número de entradas"""
+
+    def __init__(self, max_size=256, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Recupera valor do cache local, removendo-o se já expirou"""
+        with self._lock:
+            item = self._dados.get(key, _AUSENTE)
+            if item is _AUSENTE:
+                return default
+            expira_em, value = item
+            if expira_em <= time.monotonic():
+                del self._dados[key]
+                return default
+            self._dados.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Armazena valor; o TTL efetivo nunca ultrapassa o TTL do tier local"""
+        ttl = self.ttl if timeout is None else min(timeout, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            return False
+        with self._lock:
+            self._dados[key] = (time.monotonic() + ttl, value)
+            self._dados.move_to_end(key)
+            while len(self._dados) > self.max_size:
+                self._dados.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._dados.pop(key, _AUSENTE) is not _AUSENTE
+
+    def clear_pattern(self, pattern):
+        """Remove as chaves que correspondem ao padrão (sintaxe glob do Redis)"""
+        with self._lock:
+            chaves = [k for k in self._dados if fnmatch.fnmatchcase(k, pattern)]
+            for k in chaves:
+                del self._dados[k]
+            return len(chaves)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
 
 class CacheManager:
-    """Gerenciador de cache usando Redis"""
-    
+    """Gerenciador de cache em dois níveis: LRU em memória na frente do Redis"""
+
     def __init__(self, app=None):
         self.redis_client = None
+        self._instancia_id = uuid.uuid4().hex
+        self._pubsub_thread = None
+        self._prefixos = dict(LOCAL_CACHE_PREFIXOS_PADRAO)
+        self._local_padrao = {'max_size': 256, 'ttl': 60}
+        self._locais = {}
+        self._locais_lock = threading.Lock()
+        self._versoes_tags = {}
+        self._locks_locais = {}
+        self._locks_locais_mutex = threading.Lock()
+        self._usar_unlink = True
+        self._clear_batch_size = 500
+        self._clear_time_budget = None
+        self.codec = CacheCodec()
         if app:
             self.init_app(app)
-    
+
     def init_app(self, app):
         """Inicializa o cache com a aplicação Flask"""
+        self._prefixos = dict(LOCAL_CACHE_PREFIXOS_PADRAO)
+        self._prefixos.update(app.config.get('CACHE_LOCAL_PREFIXOS', {}))
+        self._local_padrao = {
+            'max_size': int(app.config.get('CACHE_LOCAL_MAX_SIZE', 256)),
+            'ttl': int(app.config.get('CACHE_LOCAL_TTL', 60)),
+        }
+        with self._locais_lock:
+            self._locais = {}
+        self._versoes_tags = {}
+        self._usar_unlink = True
+        self._clear_batch_size = int(app.config.get('CACHE_CLEAR_BATCH_SIZE', 500))
+        self._clear_time_budget = app.config.get('CACHE_CLEAR_TIME_BUDGET')
+        self.codec = CacheCodec(
+            codec=app.config.get('CACHE_CODEC', 'json'),
+            compressao=app.config.get('CACHE_COMPRESSION', 'zlib') or None,
+            tamanho_minimo_compressao=int(app.config.get('CACHE_COMPRESS_MIN_SIZE', 1024))
+        )
+        self._parar_listener()
+
         redis_url = app.config.get('REDIS_URL', 'redis://localhost:6379/0')
         try:
             self.redis_client = redis.from_url(redis_url, decode_responses=False)
             # Testar conexão
             self.redis_client.ping()
             app.logger.info('Cache Redis conectado com sucesso')
+            self._iniciar_listener(app)
         except Exception as e:
-            app.logger.warning(f'Não foi possível conectar ao Redis: {e}')
+            app.logger.warning(f'Não foi possível conectar ao Redis, usando apenas cache local: {e}')
             self.redis_client = None
-    
+
+    # --- Cache local (nível 1) ---
+
+    def _local(self, key):
+        """Retorna o cache local responsável pelo prefixo da chave"""
+        prefixo = key.split(':', 1)[0]
+        local = self._locais.get(prefixo)
+        if local is None:
+            with self._locais_lock:
+                local = self._locais.get(prefixo)
+                if local is None:
+                    config = self._prefixos.get(prefixo, self._local_padrao)
+                    local = LocalCache(
+                        max_size=config.get('max_size', self._local_padrao['max_size']),
+                        ttl=config.get('ttl', self._local_padrao['ttl'])
+                    )
+                    self._locais[prefixo] = local
+        return local
+
+    def _limpar_local(self, pattern):
+        prefixo = pattern.split(':', 1)[0]
+        if any(c in prefixo for c in '*?['):
+            locais = list(self._locais.values())
+        else:
+            locais = [self._locais[prefixo]] if prefixo in self._locais else []
+        return sum(local.clear_pattern(pattern) for local in locais)
+
+    # --- Invalidação entre workers via pub/sub ---
+
+    def _iniciar_listener(self, app):
+        if not app.config.get('CACHE_PUBSUB_ENABLED', True):
+            return
+        try:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{CANAL_INVALIDACAO: self._on_invalidacao})
+            self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+        except Exception as e:
+            app.logger.warning(f'Invalidação entre workers indisponível: {e}')
+            self._pubsub_thread = None
+
+    def _parar_listener(self):
+        if self._pubsub_thread is not None:
+            try:
+                self._pubsub_thread.stop()
+            except Exception:
+                pass
+            self._pubsub_thread = None
+
+    def _on_invalidacao(self, message):
+        """Processa mensagens de invalidação publicadas por outros workers"""
+        try:
+            dados = json.loads(message['data'])
+            if dados.get('origem') == self._instancia_id:
+                return
+            if dados.get('op') == 'pattern':
+                self._limpar_local(dados['key'])
+            else:
+                self._local(dados['key']).delete(dados['key'])
+        except Exception as e:
+            logger.error(f'Mensagem de invalidação de cache inválida: {e}')
+
+    def _publicar_invalidacao(self, op, key):
+        if not self.redis_client:
+            return
+        try:
+            self.redis_client.publish(CANAL_INVALIDACAO, json.dumps({
+                'op': op,
+                'key': key,
+                'origem': self._instancia_id
+            }))
+        except Exception as e:
+            logger.warning(f'Falha ao publicar invalidação de cache {key}: {e}')
+
+    # --- API pública ---
+
     def get(self, key):
-        """Recupera valor do cache"""
+        """Recupera valor do cache (primeiro na memória local, depois no Redis)
+
+        O nível local guarda os bytes serializados, como no Redis: cada leitura
+        devolve um objeto novo, do mesmo tipo nos dois níveis, e alterá-lo não
+        afeta o que está em cache.
+        """
+        prefixo = key.split(':', 1)[0]
+        local = self._local(key)
+        raw = local.get(key)
+        if raw is not None:
+            try:
+                value = self.codec.loads(raw)
+                cache_requests.inc(prefix=prefixo, result='hit_local')
+                return value
+            except CodecError as e:
+                logger.warning(f'Valor do cache local {key} ignorado: {e}')
+                local.delete(key)
+
         if not self.redis_client:
+            cache_requests.inc(prefix=prefixo, result='miss')
             return None
-        
+
         try:
-            value = self.redis_client.get(key)
-            if value:
-                return pickle.loads(value)
+            raw = self.redis_client.get(key)
+            if raw:
+                value = self.codec.loads(raw)
+                local.set(key, raw)
+                cache_requests.inc(prefix=prefixo, result='hit_redis')
+                return value
+        except CodecError as e:
+            logger.warning(f'Valor do cache {key} ignorado: {e}')
         except Exception as e:
             current_app.logger.error(f'Erro ao recuperar cache {key}: {e}')
-        
+
+        cache_requests.inc(prefix=prefixo, result='miss')
         return None
-    
+
     def set(self, key, value, timeout=300):
         """Armazena valor no cache"""
-        if not self.redis_client:
+        try:
+            serialized_value = self.codec.dumps(value)
+        except Exception as e:
+            current_app.logger.error(f'Erro ao serializar cache {key}: {e}')
             return False
-        
+        self._local(key).set(key, serialized_value, timeout)
+        if not self.redis_client:
+            return True
+
         try:
-            serialized_value = pickle.dumps(value)
-            return self.redis_client.setex(key, timeout, serialized_value)
+            resultado = self.redis_client.setex(key, timeout, serialized_value)
+            self._publicar_invalidacao('delete', key)
+            return resultado
         except Exception as e:
             current_app.logger.error(f'Erro ao armazenar cache {key}: {e}')
             return False
-    
+
     def delete(self, key):
         """Remove valor do cache"""
+        removido = self._local(key).delete(key)
         if not self.redis_client:
-            return False
-        
+            return removido
+
         try:
-            return self.redis_client.delete(key)
+            resultado = self.redis_client.delete(key)
+            self._publicar_invalidacao('delete', key)
+            return resultado
         except Exception as e:
             current_app.logger.error(f'Erro ao deletar cache {key}: {e}')
             return False
-    
-    def clear_pattern(self, pattern):
-        """Remove todas as chaves que correspondem ao padrão"""
+
+    def get_tag_version(self, tag):
+        """Retorna a versão atual de uma tag (0 se nunca invalidada)"""
+        key = f'{PREFIXO_TAG}:{tag}'
+        if not self.redis_client:
+            return self._versoes_tags.get(tag, 0)
+
+        local = self._local(key)
+        versao = local.get(key)
+        if versao is not None:
+            return versao
+
+        try:
+            raw = self.redis_client.get(key)
+            versao = int(raw) if raw else 0
+        except Exception as e:
+            logger.error(f'Erro ao recuperar versão da tag {tag}: {e}')
+            return self._versoes_tags.get(tag, 0)
+
+        local.set(key, versao)
+        return versao
+
+    def invalidate_tags(self, *tags):
+        """Invalida todas as entradas associadas às tags incrementando suas versões.
+
+        Custa um INCR por tag; as entradas antigas deixam de ser alcançáveis e
+        expiram sozinhas pelo TTL.
+        """
+        for tag in tags:
+            key = f'{PREFIXO_TAG}:{tag}'
+            self._versoes_tags[tag] = self._versoes_tags.get(tag, 0) + 1
+            self._local(key).delete(key)
+            if not self.redis_client:
+                continue
+            try:
+                self._versoes_tags[tag] = self.redis_client.incr(key)
+                self._publicar_invalidacao('delete', key)
+            except Exception as e:
+                logger.error(f'Erro ao invalidar tag de cache {tag}: {e}')
+
+    def acquire_lock(self, name, timeout=30, token=None):
+        """Tenta adquirir um lock com expiração; retorna o token ou None.
+
+        Com Redis o lock vale para todos os workers (SET NX PX); sem Redis,
+        apenas para as threads deste processo. ``token`` permite gravar um
+        valor conhecido (ex.: o id do job), lido depois com ``lock_owner``.
+        """
+        key = f'{PREFIXO_LOCK}:{name}'
+        token = token or uuid.uuid4().hex
+        if self.redis_client:
+            try:
+                if self.redis_client.set(key, token, nx=True, px=int(timeout * 1000)):
+                    return token
+                return None
+            except Exception as e:
+                logger.error(f'Erro ao adquirir lock {name}: {e}')
+
+        agora = time.monotonic()
+        with self._locks_locais_mutex:
+            atual = self._locks_locais.get(key)
+            if atual and atual[1] > agora:
+                return None
+            self._locks_locais[key] = (token, agora + timeout)
+        return token
+
+    def lock_owner(self, name):
+        """Token do lock ``name`` enquanto ele estiver ativo (ou None)"""
+        key = f'{PREFIXO_LOCK}:{name}'
+        if self.redis_client:
+            try:
+                valor = self.redis_client.get(key)
+                return valor.decode() if isinstance(valor, bytes) else valor
+            except Exception as e:
+                logger.error(f'Erro ao consultar lock {name}: {e}')
+        with self._locks_locais_mutex:
+            atual = self._locks_locais.get(key)
+        return atual[0] if atual and atual[1] > time.monotonic() else None
+
+    def extend_lock(self, name, token, timeout):
+        """Renova por ``timeout`` segundos um lock ainda pertencente a ``token``"""
+        key = f'{PREFIXO_LOCK}:{name}'
+        with self._locks_locais_mutex:
+            atual = self._locks_locais.get(key)
+            if atual and atual[0] == token:
+                self._locks_locais[key] = (token, time.monotonic() + timeout)
+                return True
         if not self.redis_client:
             return False
-        
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return True
+            return bool(self.redis_client.eval(_SCRIPT_RENOVAR_LOCK, 1, key, token, int(timeout * 1000)))
         except Exception as e:
-            current_app.logger.error(f'Erro ao limpar cache com padrão {pattern}: {e}')
+            logger.error(f'Erro ao renovar lock {name}: {e}')
+            return False
+
+    def release_lock(self, name, token):
+        """Libera um lock adquirido com ``acquire_lock``"""
+        key = f'{PREFIXO_LOCK}:{name}'
+        with self._locks_locais_mutex:
+            atual = self._locks_locais.get(key)
+            if atual and atual[0] == token:
+                del self._locks_locais[key]
+                return True
+        if not self.redis_client:
             return False
+        try:
+            return bool(self.redis_client.eval(_SCRIPT_LIBERAR_LOCK, 1, key, token))
+        except Exception as e:
+            logger.error(f'Erro ao liberar lock {name}: {e}')
+            return False
+
+    def iter_keys(self, pattern, count=500, deadline=None):
+        """Itera, em lotes, as chaves do Redis que correspondem ao padrão usando SCAN.
+
+        Diferente de KEYS, cada chamada ao servidor examina apenas ``count`` chaves,
+        sem bloquear os demais clientes. Interrompe ao atingir ``deadline``
+        (instante de ``time.monotonic()``).
+        """
+        if not self.redis_client:
+            return
+        cursor = 0
+        while True:
+            cursor, keys = self.redis_client.scan(cursor=cursor, match=pattern, count=count)
+            if keys:
+                yield keys
+            if cursor == 0:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f'Varredura do padrão {pattern} interrompida: orçamento de tempo esgotado')
+                break
+
+    def _remover_lote(self, keys):
+        """Remove um lote de chaves via UNLINK em pipeline (DEL se o servidor não suportar)"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        if self._usar_unlink:
+            pipe.unlink(*keys)
+        else:
+            pipe.delete(*keys)
+        try:
+            return sum(pipe.execute())
+        except redis.exceptions.ResponseError:
+            if not self._usar_unlink:
+                raise
+            self._usar_unlink = False
+            return self._remover_lote(keys)
+
+    def clear_pattern(self, pattern, batch_size=None, time_budget=None):
+        """Remove todas as chaves que correspondem ao padrão.
+
+        Usa SCAN + UNLINK em lotes de ``batch_size`` chaves e para após
+        ``time_budget`` segundos. Retorna o número de chaves removidas do Redis
+        (ou do cache local, quando o Redis não está disponível).
+        """
+        if not self.redis_client:
+            return self._limpar_local(pattern)
+
+        batch_size = batch_size or self._clear_batch_size
+        time_budget = time_budget if time_budget is not None else self._clear_time_budget
+        deadline = time.monotonic() + time_budget if time_budget else None
+
+        removidas = 0
+        try:
+            for keys in self.iter_keys(pattern, count=batch_size, deadline=deadline):
+                for inicio in range(0, len(keys), batch_size):
+                    removidas += self._remover_lote(keys[inicio:inicio + batch_size])
+        except Exception as e:
+            logger.error(f'Erro ao limpar cache com padrão {pattern}: {e}')
+        # Só depois do UNLINK: um worker que limpasse o nível local antes disso
+        # poderia recarregá-lo do Redis com o valor antigo
+        self._limpar_local(pattern)
+        self._publicar_invalidacao('pattern', pattern)
+        return removidas
 
 # Instância global do cache
 cache = CacheManager()
 
-def cached(timeout=300, key_prefix=''):
-    """Decorator para cache de funções"""
+def _normalizar_argumento(obj):
+    """Converte argumentos não-JSON em representações estáveis entre processos"""
+    if isinstance(obj, (datetime.date, datetime.datetime, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return f'{type(obj).__name__}.{obj.name}'
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    if isinstance(obj, bytes):
+        return obj.hex()
+    # Modelos do SQLAlchemy e demais objetos: classe + id, nunca o endereço de memória
+    identificador = getattr(obj, 'id', None)
+    if identificador is not None:
+        return f'{type(obj).__module__}.{type(obj).__qualname__}:{identificador}'
+    return f'{type(obj).__module__}.{type(obj).__qualname__}:{obj!r}'
+
+def make_cache_key(key_prefix, nome_funcao, args=(), kwargs=None, versoes=()):
+    """Gera chave de cache determinística (igual em todos os workers e reinícios)"""
+    payload = json.dumps(
+        [list(args), kwargs or {}, list(versoes)],
+        sort_keys=True,
+        separators=(',', ':'),
+        default=_normalizar_argumento
+    )
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    return f"{key_prefix}:{nome_funcao}:{digest}"
+
+def _atualizar_em_segundo_plano(cache_key, lock_token, f, args, kwargs, timeout, stale_ttl):
+    """Recalcula um valor vencido numa thread, mantendo o contexto da aplicação"""
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        app = None
+
+    def executar():
+        try:
+            if app is not None:
+                with app.app_context():
+                    _recalcular(cache_key, f, args, kwargs, timeout, stale_ttl)
+            else:
+                _recalcular(cache_key, f, args, kwargs, timeout, stale_ttl)
+        except Exception as e:
+            logger.error(f'Erro ao atualizar cache {cache_key} em segundo plano: {e}')
+        finally:
+            cache.release_lock(cache_key, lock_token)
+
+    thread = threading.Thread(target=executar, name=f'cache-refresh-{f.__name__}', daemon=True)
+    thread.start()
+    return thread
+
+def _recalcular(cache_key, f, args, kwargs, timeout, stale_ttl):
+    """Executa a função e grava o resultado com o instante em que deixa de ser fresco"""
+    result = f(*args, **kwargs)
+    cache.set(cache_key, {'valor': result, 'fresco_ate': time.time() + timeout}, timeout + stale_ttl)
+    return result
+
+def cached(timeout=300, key_prefix='', tags=None, lock=False, stale_ttl=0, lock_timeout=30, lock_wait=5):
+    """Decorator para cache de funções.
+
+    As entradas são agrupadas pelas ``tags`` (por padrão, o próprio ``key_prefix``);
+    ``cache.invalidate_tags(tag)`` descarta todas elas sem varrer o Redis.
+
+    Com ``lock=True`` apenas um worker recalcula uma entrada ausente; os demais
+    aguardam até ``lock_wait`` segundos pelo resultado. Com ``stale_ttl`` > 0 o
+    valor continua sendo servido por mais ``stale_ttl`` segundos após expirar,
+    enquanto uma única thread o atualiza em segundo plano.
+    """
+    tags_funcao = tuple(tags) if tags else ((key_prefix,) if key_prefix else ())
+
     def decorator(f):
+        @wraps(f)
         def wrapper(*args, **kwargs):
             # Gerar chave do cache
-            cache_key = f"{key_prefix}:{f.__name__}:{hash(str(args) + str(kwargs))}"
-            
+            versoes = [(tag, cache.get_tag_version(tag)) for tag in tags_funcao]
+            cache_key = make_cache_key(key_prefix, f.__name__, args, kwargs, versoes)
+
             # Tentar recuperar do cache
-            result = cache.get(cache_key)
-            if result is not None:
-                return result
-            
-            # Executar função e armazenar no cache
-            result = f(*args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            
-            return result
-        
-        wrapper.__name__ = f.__name__
+            entrada = cache.get(cache_key)
+            if entrada is not None:
+                if entrada['fresco_ate'] > time.time():
+                    return entrada['valor']
+                if stale_ttl > 0:
+                    # Vencido, mas dentro da janela stale: serve e atualiza em segundo plano
+                    token = cache.acquire_lock(cache_key, lock_timeout)
+                    if token:
+                        _atualizar_em_segundo_plano(cache_key, token, f, args, kwargs, timeout, stale_ttl)
+                    return entrada['valor']
+
+            if not lock:
+                return _recalcular(cache_key, f, args, kwargs, timeout, stale_ttl)
+
+            # Single-flight: só quem obtém o lock executa a função
+            token = cache.acquire_lock(cache_key, lock_timeout)
+            if token is None:
+                limite = time.monotonic() + lock_wait
+                while time.monotonic() < limite:
+                    time.sleep(0.05)
+                    entrada = cache.get(cache_key)
+                    if entrada is not None:
+                        return entrada['valor']
+                logger.warning(f'Tempo de espera pelo cache {cache_key} esgotado; recalculando')
+                return _recalcular(cache_key, f, args, kwargs, timeout, stale_ttl)
+
+            try:
+                return _recalcular(cache_key, f, args, kwargs, timeout, stale_ttl)
+            finally:
+                cache.release_lock(cache_key, token)
+
+        wrapper.cache_tags = tags_funcao
         return wrapper
     return decorator
-
@@ -0,0 +1,162 @@
+# Codecs de serialização para os valores armazenados no Redis
+import datetime
+import decimal
+import json
+import logging
+import pickle
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # dependência opcional
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # dependência opcional
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho de 2 bytes: identificador do codec + identificador da compressão
+CODEC_IDS = {'json': b'J', 'msgpack': b'M', 'pickle': b'P'}
+COMPRESSAO_IDS = {None: b'-', 'zlib': b'Z', 'lz4': b'L'}
+
+_AUSENTE = object()
+
+# Códigos de extensão do msgpack
+_EXT_DATE = 1
+_EXT_DATETIME = 2
+_EXT_DECIMAL = 3
+
+
+class CodecError(Exception):
+    """Valor do cache em formato desconhecido ou não permitido"""
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return {'__tipo__': 'datetime', 'v': obj.isoformat()}
+    if isinstance(obj, datetime.date):
+        return {'__tipo__': 'date', 'v': obj.isoformat()}
+    if isinstance(obj, decimal.Decimal):
+        return {'__tipo__': 'decimal', 'v': str(obj)}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Tipo não serializável no cache: {type(obj).__name__}')
+
+
+def _json_object_hook(obj):
+    tipo = obj.get('__tipo__')
+    if tipo is None:
+        return obj
+    if tipo == 'datetime':
+        return datetime.datetime.fromisoformat(obj['v'])
+    if tipo == 'date':
+        return datetime.date.fromisoformat(obj['v'])
+    if tipo == 'decimal':
+        return decimal.Decimal(obj['v'])
+    return obj
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Tipo não serializável no cache: {type(obj).__name__}')
+
+
+def _msgpack_ext_hook(code, data):
+    if code == _EXT_DATETIME:
+        return datetime.datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if code == _EXT_DECIMAL:
+        return decimal.Decimal(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _dumps(codec, value):
+    if codec == 'json':
+        return json.dumps(value, default=_json_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if codec == 'msgpack':
+        return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(codec, data):
+    if codec == 'json':
+        return json.loads(data, object_hook=_json_object_hook)
+    if codec == 'msgpack':
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    return pickle.loads(data)
+
+
+def _comprimir(compressao, data):
+    if compressao == 'zlib':
+        return zlib.compress(data, 1)
+    if compressao == 'lz4':
+        return lz4_frame.compress(data)
+    return data
+
+
+def _descomprimir(compressao, data):
+    if compressao == 'zlib':
+        return zlib.decompress(data)
+    if compressao == 'lz4':
+        return lz4_frame.decompress(data)
+    return data
+
+
+class CacheCodec:
+    """Serializa valores do cache com cabeçalho que identifica codec e compressão.
+
+    O formato JSON (padrão) e o msgpack preservam ``date``, ``datetime`` e
+    ``Decimal``; tuplas voltam como listas e chaves de dicionário devem ser
+    strings. ``pickle`` só é lido quando configurado explicitamente, pois
+    desserializar pickle de um Redis compartilhado permite execução de código.
+    """
+
+    def __init__(self, codec='json', compressao='zlib', tamanho_minimo_compressao=1024):
+        if codec not in CODEC_IDS:
+            raise ValueError(f'Codec de cache desconhecido: {codec}')
+        if codec == 'msgpack' and msgpack is None:
+            logger.warning('msgpack não instalado; usando codec json no cache')
+            codec = 'json'
+        if compressao not in COMPRESSAO_IDS:
+            raise ValueError(f'Compressão de cache desconhecida: {compressao}')
+        if compressao == 'lz4' and lz4_frame is None:
+            logger.warning('lz4 não instalado; usando zlib no cache')
+            compressao = 'zlib'
+        self.codec = codec
+        self.compressao = compressao
+        self.tamanho_minimo_compressao = tamanho_minimo_compressao
+        self._codecs_por_id = {v: k for k, v in CODEC_IDS.items()}
+        self._compressoes_por_id = {v: k for k, v in COMPRESSAO_IDS.items()}
+
+    def dumps(self, value):
+        data = _dumps(self.codec, value)
+        compressao = None
+        if self.compressao and len(data) >= self.tamanho_minimo_compressao:
+            compressao = self.compressao
+            data = _comprimir(compressao, data)
+        return CODEC_IDS[self.codec] + COMPRESSAO_IDS[compressao] + data
+
+    def loads(self, raw):
+        codec = self._codecs_por_id.get(raw[:1])
+        compressao = self._compressoes_por_id.get(raw[1:2], _AUSENTE)
+        if codec is None or compressao is _AUSENTE:
+            raise CodecError('Cabeçalho de valor do cache desconhecido')
+        if codec == 'pickle' and self.codec != 'pickle':
+            raise CodecError('Valor em pickle recusado: codec configurado é ' + self.codec)
+        if codec == 'msgpack' and msgpack is None:
+            raise CodecError('Valor em msgpack, mas msgpack não está instalado')
+        if compressao == 'lz4' and lz4_frame is None:
+            raise CodecError('Valor comprimido com lz4, mas lz4 não está instalado')
+        return _loads(codec, _descomprimir(compressao, raw[2:]))
+
@@ -0,0 +1,89 @@
+# Estratégias de carregamento dos relacionamentos por tipo de tela
+#
+# Os relacionamentos de Pessoa, Fazenda e Documento são lazy='select' no modelo:
+# nada é carregado além das colunas da própria entidade. Cada consulta escolhe
+# aqui o que precisa, e os perfis de listagem usam raiseload('*') para
+# que um acesso não previsto a um relacionamento falhe nos testes em vez de
+# virar N+1 em produção. Os <select> dos formulários usam src/utils/opcoes.py.
+from functools import cache
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+from src.models.db import db
+from src.models.pessoa import Pessoa, pessoa_fazenda
+from src.models.fazenda import Fazenda
+from src.models.documento import Documento
+
+
+@cache
+def perfis():
+    """Perfis de carregamento por modelo
+
+    Montados no primeiro uso: criar as loader options configura os mappers, o que
+    exige todos os modelos (Usuario, Auditoria...) já importados.
+    """
+    # prazos e e-mails dos documentos: esta_vencido/precisa_notificar e os serializadores
+    notificacao = (selectinload(Documento.prazos), selectinload(Documento.emails))
+    return {
+        Pessoa: {
+            # só as colunas da pessoa (contagens vêm de fazendas_por_pessoa)
+            'lista': (raiseload('*'),),
+            # listagem com o id e o nome das fazendas vinculadas
+            'com_fazendas': (
+                selectinload(Pessoa.fazendas).options(load_only(Fazenda.id, Fazenda.nome), raiseload('*')),
+                raiseload('*'),
+            ),
+            # tela de fazendas da pessoa (colunas completas das fazendas)
+            'com_fazendas_detalhe': (selectinload(Pessoa.fazendas).raiseload('*'), raiseload('*')),
+            'com_documentos': (selectinload(Pessoa.documentos).options(*notificacao), raiseload('*')),
+            'detalhe': (selectinload(Pessoa.fazendas), selectinload(Pessoa.documentos).options(*notificacao)),
+        },
+        Fazenda: {
+            'lista': (raiseload('*'),),
+            'com_pessoas': (
+                selectinload(Fazenda.pessoas).options(load_only(Pessoa.id, Pessoa.nome), raiseload('*')),
+                raiseload('*'),
+            ),
+            'com_documentos': (selectinload(Fazenda.documentos).options(*notificacao), raiseload('*')),
+            'detalhe': (selectinload(Fazenda.pessoas), selectinload(Fazenda.documentos).options(*notificacao)),
+        },
+        Documento: {
+            # nome da entidade no mesmo SELECT, prazos e e-mails em um SELECT cada
+            'lista': (
+                joinedload(Documento.fazenda).options(load_only(Fazenda.id, Fazenda.nome), raiseload('*')),
+                joinedload(Documento.pessoa).options(load_only(Pessoa.id, Pessoa.nome), raiseload('*')),
+                *notificacao,
+            ),
+            # só prazos e e-mails (API com ``fields`` sem o nome da entidade)
+            'notificacao': notificacao,
+        },
+    }
+
+
+def opcoes(modelo, perfil):
+    """Loader options do ``perfil`` de ``modelo`` (para compor com outra consulta)"""
+    return perfis()[modelo][perfil]
+
+
+def consulta(modelo, perfil):
+    """``modelo.query`` com as estratégias de carregamento do ``perfil``"""
+    return modelo.query.options(*perfis()[modelo][perfil])
+
+
+def _contar(coluna_grupo, coluna_contada, ids=None):
+    """{id: total} com um único GROUP BY, sem carregar as coleções"""
+    contagem = db.session.query(coluna_grupo, func.count(coluna_contada)).filter(coluna_grupo.isnot(None)).group_by(coluna_grupo)
+    if ids is not None:
+        contagem = contagem.filter(coluna_grupo.in_(ids))
+    return dict(contagem.all())
+
+
+def fazendas_por_pessoa(ids=None):
+    return _contar(pessoa_fazenda.c.pessoa_id, pessoa_fazenda.c.fazenda_id, ids)
+
+
+def pessoas_por_fazenda(ids=None):
+    return _contar(pessoa_fazenda.c.fazenda_id, pessoa_fazenda.c.pessoa_id, ids)
+
+
+def documentos_por_fazenda(ids=None):
+    return _contar(Documento.fazenda_id, Documento.id, ids)
@@ -0,0 +1,186 @@
+# Resumo do dashboard: contadores mantidos por eventos do ORM e reconciliados periodicamente
+#
+# Concorrência: cada gravação em Pessoa, Fazenda, Documento, Endividamento ou
+# Parcela faz ``UPDATE dashboard_summary SET valor = valor + delta`` na própria
+# transação. No InnoDB isso trava a linha do contador até o commit, então
+# gravações concorrentes que mexem no mesmo contador são serializadas entre si.
+# É aceitável com o volume de escrita deste sistema (formulários de cadastro);
+# se virar gargalo, a alternativa é levar os contadores para um HINCRBY no Redis
+# aplicado no after_commit, trocando a atomicidade com a transação por
+# consistência eventual (a reconciliação continua corrigindo desvios). As
+# chaves são atualizadas sempre na mesma ordem para não haver deadlock entre
+# duas transações que tocam os mesmos contadores.
+import logging
+from collections import Counter
+from datetime import date, timedelta
+from sqlalchemy import event, func, case, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.models.db import db
+from src.models.dashboard_summary import DashboardSummary
+from src.models.pessoa import Pessoa
+from src.models.fazenda import Fazenda
+from src.models.documento import Documento
+from src.models.endividamento import Endividamento, Parcela
+
+logger = logging.getLogger(__name__)
+
+# Janela dos contadores de "próximos" (endividamentos e parcelas)
+JANELA_PROXIMOS = timedelta(days=30)
+
+CHAVES = (
+    'total_pessoas', 'total_fazendas', 'total_documentos', 'total_endividamentos',
+    'documentos_vencidos', 'documentos_a_vencer', 'endividamentos_proximos', 'parcelas_proximas'
+)
+
+# Colunas de cada modelo que influenciam os contadores
+CAMPOS = {
+    Pessoa: (),
+    Fazenda: (),
+    Documento: ('data_vencimento',),
+    Endividamento: ('data_vencimento_final',),
+    Parcela: ('data_vencimento', 'pago'),
+}
+
+
+def _contribuicao(classe, valores, hoje):
+    """Contadores aos quais uma linha com ``valores`` soma 1"""
+    limite = hoje + JANELA_PROXIMOS
+    if classe is Pessoa:
+        return {'total_pessoas': 1}
+    if classe is Fazenda:
+        return {'total_fazendas': 1}
+    if classe is Documento:
+        contadores = {'total_documentos': 1}
+        vencimento = valores['data_vencimento']
+        if vencimento:
+            contadores['documentos_vencidos' if vencimento < hoje else 'documentos_a_vencer'] = 1
+        return contadores
+    if classe is Endividamento:
+        contadores = {'total_endividamentos': 1}
+        vencimento = valores['data_vencimento_final']
+        if vencimento and hoje <= vencimento <= limite:
+            contadores['endividamentos_proximos'] = 1
+        return contadores
+    vencimento = valores['data_vencimento']
+    if not valores['pago'] and vencimento and hoje <= vencimento <= limite:
+        return {'parcelas_proximas': 1}
+    return {}
+
+
+def _valores(objeto, campos, anteriores=False):
+    estado = inspect(objeto)
+    valores = {}
+    for campo in campos:
+        historico = estado.attrs[campo].history
+        if anteriores and historico.deleted:
+            valores[campo] = historico.deleted[0]
+        else:
+            valores[campo] = getattr(objeto, campo)
+    return valores
+
+
+@event.listens_for(Session, 'after_flush')
+def _atualizar_resumo(session, flush_context):
+    """Aplica ao resumo, na mesma transação, o efeito das linhas inseridas, alteradas e removidas
+
+    Só vê o que passa por ``session.add``/``session.delete``: ``query.delete()``
+    em massa e remoções por delete-orphan não aparecem aqui e só são corrigidas
+    na reconciliação. Remova as linhas dos modelos em ``CAMPOS`` com
+    ``session.delete``.
+    """
+    hoje = date.today()
+    deltas = Counter()
+    for objeto in session.new:
+        campos = CAMPOS.get(type(objeto))
+        if campos is not None:
+            deltas.update(_contribuicao(type(objeto), _valores(objeto, campos), hoje))
+    for objeto in session.deleted:
+        campos = CAMPOS.get(type(objeto))
+        if campos is not None:
+            deltas.subtract(_contribuicao(type(objeto), _valores(objeto, campos, anteriores=True), hoje))
+    for objeto in session.dirty:
+        campos = CAMPOS.get(type(objeto))
+        if campos and session.is_modified(objeto):
+            deltas.update(_contribuicao(type(objeto), _valores(objeto, campos), hoje))
+            deltas.subtract(_contribuicao(type(objeto), _valores(objeto, campos, anteriores=True), hoje))
+
+    tabela = DashboardSummary.__table__
+    for chave, delta in sorted(deltas.items()):
+        if delta:
+            # Resumo ainda não criado: nada a atualizar, a reconciliação o cria
+            session.connection().execute(
+                update(tabela).where(tabela.c.chave == chave).values(valor=tabela.c.valor + delta)
+            )
+
+
+def calcular_agregados(hoje=None):
+    """Contadores calculados diretamente nas tabelas"""
+    hoje = hoje or date.today()
+    limite = hoje + JANELA_PROXIMOS
+    documentos = db.session.query(
+        func.count(Documento.id),
+        func.sum(case((Documento.data_vencimento < hoje, 1), else_=0)),
+        func.sum(case((Documento.data_vencimento >= hoje, 1), else_=0))
+    ).one()
+    endividamentos = db.session.query(
+        func.count(Endividamento.id),
+        func.sum(case((Endividamento.data_vencimento_final.between(hoje, limite), 1), else_=0))
+    ).one()
+    return {
+        'total_pessoas': db.session.query(func.count(Pessoa.id)).scalar(),
+        'total_fazendas': db.session.query(func.count(Fazenda.id)).scalar(),
+        'total_documentos': documentos[0],
+        'documentos_vencidos': documentos[1] or 0,
+        'documentos_a_vencer': documentos[2] or 0,
+        'total_endividamentos': endividamentos[0],
+        'endividamentos_proximos': endividamentos[1] or 0,
+        'parcelas_proximas': db.session.query(func.count(Parcela.id)).filter(
+            db.or_(Parcela.pago == False, Parcela.pago.is_(None)),
+            Parcela.data_vencimento.between(hoje, limite)
+        ).scalar(),
+    }
+
+
+def consulta_resumo_travada():
+    """Linhas do resumo com ``FOR UPDATE``, sempre na mesma ordem"""
+    return DashboardSummary.query.order_by(DashboardSummary.chave).with_for_update()
+
+
+def reconciliar(hoje=None):
+    """Recalcula o resumo a partir das tabelas, corrigindo qualquer desvio; retorna os contadores
+
+    As linhas do resumo são travadas (``SELECT ... FOR UPDATE``) antes da
+    contagem: uma transação que já aplicou seu delta termina antes e entra na
+    contagem, e as que ainda não aplicaram esperam o commit da reconciliação e
+    somam sobre o valor novo. Sem a trava, um delta confirmado entre a
+    contagem e a gravação seria perdido.
+    """
+    hoje = hoje or date.today()
+    linhas = {linha.chave: linha for linha in consulta_resumo_travada().all()}
+    agregados = calcular_agregados(hoje)
+    for chave, valor in agregados.items():
+        linha = linhas.get(chave)
+        if linha is None:
+            db.session.add(DashboardSummary(chave=chave, valor=valor, referencia=hoje))
+            continue
+        if linha.referencia == hoje and linha.valor != valor:
+            logger.warning(f'Resumo do dashboard com desvio em {chave}: {linha.valor} -> {valor}')
+        linha.valor = valor
+        linha.referencia = hoje
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outra reconciliação criou as linhas ao mesmo tempo; os valores calculados continuam válidos
+        db.session.rollback()
+    return agregados
+
+
+def obter_resumo(hoje=None):
+    """Contadores do dashboard com uma única consulta (reconcilia se o resumo é de outro dia)"""
+    hoje = hoje or date.today()
+    linhas = DashboardSummary.query.all()
+    resumo = {linha.chave: linha.valor for linha in linhas}
+    if set(CHAVES) - set(resumo) or any(linha.referencia != hoje for linha in linhas):
+        return reconciliar(hoje)
+    return resumo
@@ -0,0 +1,96 @@
+# Pool de conexões do SQLAlchemy: opções a partir da configuração e métricas de uso
+import time
+import logging
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+db_pool_checkout_duration = registry.histogram(
+    'db_pool_checkout_seconds', 'Tempo para obter uma conexão do pool',
+    labels=('result',), buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+db_pool_waits = registry.counter(
+    'db_pool_waits_total', 'Pedidos de conexão feitos com o pool esgotado (tiveram de esperar)'
+)
+db_pool_checked_out = registry.gauge(
+    'db_pool_checked_out', 'Conexões em uso'
+)
+db_pool_capacity = registry.gauge(
+    'db_pool_capacity', 'Conexões máximas do pool (pool_size + max_overflow)'
+)
+
+
+class PoolMonitorado(QueuePool):
+    """QueuePool que registra latência de checkout, esperas e conexões em uso.
+
+    A saturação é ``db_pool_checked_out / db_pool_capacity``; com
+    ``METRICS_MULTIPROC_DIR`` ambos são somados entre os workers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        db_pool_capacity.set(self.capacidade())
+
+    def capacidade(self):
+        # max_overflow = -1: sem limite; a capacidade informada é só o pool_size
+        return self.size() + max(self._max_overflow, 0)
+
+    def _do_get(self):
+        esperou = self._max_overflow >= 0 and self.checkedout() >= self.capacidade()
+        if esperou:
+            db_pool_waits.inc()
+        inicio = time.perf_counter()
+        resultado = 'ok'
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            resultado = 'timeout'
+            logger.warning(f'Tempo esgotado aguardando conexão do pool ({self.status()})')
+            raise
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - inicio, result=resultado)
+            db_pool_checked_out.set(self.checkedout())
+            db_pool_capacity.set(self.capacidade())
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        db_pool_checked_out.set(self.checkedout())
+
+
+def estado_pool(engine):
+    """Uso atual do pool do ``engine`` (None se o pool não for monitorado)"""
+    pool = engine.pool
+    if not isinstance(pool, PoolMonitorado):
+        return None
+    capacidade = pool.capacidade()
+    em_uso = pool.checkedout()
+    return {
+        'tamanho': pool.size(),
+        'em_uso': em_uso,
+        'overflow': max(pool.overflow(), 0),
+        'capacidade': capacidade,
+        'saturacao': round(em_uso / capacidade, 3) if capacidade else 0.0,
+    }
+
+
+def opcoes_engine(config):
+    """
+    ``SQLALCHEMY_ENGINE_OPTIONS`` a partir de ``DB_POOL_*`` da configuração.
+
+    O SQLite em memória usa um pool próprio do SQLAlchemy (uma conexão por
+    thread) e fica sem opções de pool.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'poolclass': PoolMonitorado,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
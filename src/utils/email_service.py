@@ -1,67 +1,119 @@
 #src/utils/email_service.py
 
-import smtplib
-import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
 import datetime
 import logging
+import time
 from flask import render_template, current_app
 import datetime
+from src.utils.metrics import email_send_duration
+from src.utils.smtp_pool import obter_pool, submeter
 
 
 logger = logging.getLogger(__name__)
 
 class EmailService:
-    """Serviço para envio de e-mails"""
+    """Serviço para envio de e-mails.
+
+    As mensagens saem por um pool de conexões SMTP autenticadas
+    (``src.utils.smtp_pool``); ``send_many`` despacha lotes em paralelo,
+    limitado por ``MAIL_POOL_MAX_CONNECTIONS`` conexões simultâneas.
+    """
     
     def __init__(self):
         pass # As configurações são carregadas via current_app
 
-    def send_email(self, destinatarios, assunto, corpo, html=False):
-        """Envia e-mail para os destinatários."""
-        print("MAIL_USERNAME:", current_app.config.get("MAIL_USERNAME"))
-        print("MAIL_DEFAULT_SENDER:", current_app.config.get("MAIL_DEFAULT_SENDER"))
-        if not destinatarios:
-            logger.warning("Nenhum destinatário especificado para o e-mail.")
-            return False
-        
+    def _pool(self):
+        """Pool SMTP da configuração atual, ou None se a configuração estiver incompleta"""
+        config = current_app.config
+        smtp_server = config.get("MAIL_SERVER")
+        port = config.get("MAIL_PORT")
+        sender_email = config.get("MAIL_DEFAULT_SENDER")
+        password = config.get("MAIL_PASSWORD")
+
+        if not all([smtp_server, port, sender_email, password]):
+            logger.error("Configurações de e-mail incompletas. Verifique MAIL_SERVER, MAIL_PORT, MAIL_DEFAULT_SENDER e MAIL_PASSWORD.")
+            return None
+
+        return obter_pool(
+            smtp_server, port, config.get("MAIL_USERNAME"), password, config.get("MAIL_USE_TLS"),
+            max_conexoes=config.get("MAIL_POOL_MAX_CONNECTIONS", 4),
+            mensagens_por_conexao=config.get("MAIL_POOL_MESSAGES_PER_CONNECTION", 50),
+            timeout=config.get("MAIL_TIMEOUT", 30)
+        )
+
+    @staticmethod
+    def _montar_mensagem(remetente, destinatarios, assunto, corpo, html):
+        message = MIMEMultipart("alternative")
+        message["Subject"] = assunto
+        message["From"] = remetente
+        message["To"] = ", ".join(destinatarios)
+        message.attach(MIMEText(corpo, "html" if html else "plain"))
+        return message.as_string()
+
+    @staticmethod
+    def _enviar(pool, remetente, destinatarios, assunto, mensagem, tentativas):
+        inicio = time.perf_counter()
         try:
-            smtp_server = current_app.config.get("MAIL_SERVER")
-            port = current_app.config.get("MAIL_PORT")
-            sender_email = current_app.config.get("MAIL_DEFAULT_SENDER")
-            password = current_app.config.get("MAIL_PASSWORD")
-            use_tls = current_app.config.get("MAIL_USE_TLS")
-
-            if not all([smtp_server, port, sender_email, password]):
-                logger.error("Configurações de e-mail incompletas. Verifique MAIL_SERVER, MAIL_PORT, MAIL_DEFAULT_SENDER e MAIL_PASSWORD.")
-                return False
-            
-            message = MIMEMultipart("alternative")
-            message["Subject"] = assunto
-            message["From"] = sender_email
-            message["To"] = ", ".join(destinatarios)
-            
-            if html:
-                part = MIMEText(corpo, "html")
-            else:
-                part = MIMEText(corpo, "plain")
-            message.attach(part)
-            
-            context = ssl.create_default_context()
-            
-            with smtplib.SMTP(smtp_server, port) as server:
-                if use_tls:
-                    server.starttls(context=context)
-                server.login(current_app.config.get("MAIL_USERNAME"), password)
-                server.sendmail(sender_email, destinatarios, message.as_string())
-            
-            logger.info(f"E-mail \'{assunto}\' enviado com sucesso para {len(destinatarios)} destinatário(s).")
-            return True
+            pool.sendmail(remetente, destinatarios, mensagem, tentativas=tentativas)
         except Exception as e:
+            email_send_duration.observe(time.perf_counter() - inicio, status='falha')
             logger.error(f"Erro ao enviar e-mail \'{assunto}\': {str(e)}")
             return False
+        email_send_duration.observe(time.perf_counter() - inicio, status='sucesso')
+        logger.info(f"E-mail \'{assunto}\' enviado com sucesso para {len(destinatarios)} destinatário(s).")
+        return True
+
+    def send_email(self, destinatarios, assunto, corpo, html=False):
+        """Envia e-mail para os destinatários."""
+        return self.send_many([(destinatarios, assunto, corpo, html)])[0]
+
+    def send_many(self, mensagens):
+        """Envia vários e-mails em paralelo, reutilizando as conexões SMTP.
+
+        ``mensagens`` é uma lista de ``(destinatarios, assunto, corpo, html)``;
+        retorna a lista de resultados (True/False) na mesma ordem.
+        """
+        resultados = [False] * len(mensagens)
+        pendentes = []
+        for indice, (destinatarios, assunto, corpo, html) in enumerate(mensagens):
+            if not destinatarios:
+                logger.warning("Nenhum destinatário especificado para o e-mail.")
+                continue
+            pendentes.append(indice)
+        if not pendentes:
+            return resultados
+
+        try:
+            pool = self._pool()
+            if pool is None:
+                return resultados
+            remetente = current_app.config.get("MAIL_DEFAULT_SENDER")
+            tentativas = current_app.config.get("MAIL_SEND_RETRIES", 3)
+            tarefas = []
+            for indice in pendentes:
+                destinatarios, assunto, corpo, html = mensagens[indice]
+                mensagem = self._montar_mensagem(remetente, destinatarios, assunto, corpo, html)
+                tarefas.append((indice, (pool, remetente, destinatarios, assunto, mensagem, tentativas)))
+        except Exception as e:
+            logger.error(f"Erro ao preparar e-mails: {str(e)}")
+            return resultados
+
+        # Um único e-mail é enviado na própria thread
+        if len(tarefas) == 1:
+            indice, argumentos = tarefas[0]
+            resultados[indice] = self._enviar(*argumentos)
+            return resultados
+
+        max_workers = current_app.config.get("MAIL_DISPATCH_WORKERS", 4)
+        futuros = [(indice, submeter(self._enviar, *argumentos, max_workers=max_workers))
+                   for indice, argumentos in tarefas]
+        for indice, futuro in futuros:
+            resultados[indice] = futuro.result()
+        return resultados
+
     def enviar_email_teste(self, destinatarios):
         """Envia um e-mail de teste para verificar a configuração."""
         assunto = "Teste de Notificação - Sistema de Gestão Agrícola"
@@ -166,28 +218,10 @@ def verificar_documentos_vencendo():
     Returns:
         Dicionário com documentos agrupados por prazo de vencimento
     """
-    from src.models.documento import Documento
-    
-    hoje = datetime.date.today()
-    documentos_por_prazo = {}
-    
-    # Buscar todos os documentos com data de vencimento
-    documentos = Documento.query.filter(Documento.data_vencimento.isnot(None)).all()
-    
-    for documento in documentos:
-        if not documento.data_vencimento:
-            continue
-            
-        dias_restantes = (documento.data_vencimento - hoje).days
-        
-        # Verificar se o documento está dentro de algum prazo de notificação
-        for prazo in documento.prazos_notificacao:
-            if dias_restantes == prazo:
-                if prazo not in documentos_por_prazo:
-                    documentos_por_prazo[prazo] = []
-                documentos_por_prazo[prazo].append(documento)
+    from src.utils.vencimentos import documentos_por_prazo
     
-    return documentos_por_prazo
+    # A seleção por prazo é feita no banco; só os documentos que batem são carregados
+    return documentos_por_prazo()
 
 email_service = EmailService()
 
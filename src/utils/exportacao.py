@@ -0,0 +1,83 @@
+# Exportação em streaming (NDJSON/CSV) das entidades principais
+import csv
+import io
+import json
+from flask import Response, current_app, request, stream_with_context
+from src.utils.paginacao import ParametroInvalido, ler_campos
+
+FORMATOS_EXPORTACAO = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _valor_csv(valor):
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    if valor is None:
+        return ''
+    return valor
+
+
+def _linhas_ndjson(registros, serializar):
+    for registro in registros:
+        yield json.dumps(serializar(registro), ensure_ascii=False, default=str) + '\n'
+
+
+def _linhas_csv(registros, serializar, colunas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    yield buffer.getvalue()
+    for registro in registros:
+        buffer.seek(0)
+        buffer.truncate()
+        dados = serializar(registro)
+        escritor.writerow([_valor_csv(dados.get(coluna)) for coluna in colunas])
+        yield buffer.getvalue()
+
+
+def _em_blocos(linhas, tamanho):
+    """Agrupa as linhas para não enviar um chunk HTTP por registro"""
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def resposta_exportacao(query, serializar, campos_permitidos, nome_arquivo):
+    """Resposta em streaming com os registros de ``query``.
+
+    Os registros são lidos com ``yield_per`` (cursor no servidor quando o
+    driver suporta), de modo que a memória não cresce com o tamanho da
+    tabela. ``serializar(registro, campos)`` deve retornar um dicionário;
+    ``?fields=`` restringe e ordena as colunas do CSV.
+    """
+    formato = request.args.get('format', 'ndjson')
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ParametroInvalido(f"Formato inválido: {formato} (use {' ou '.join(FORMATOS_EXPORTACAO)})")
+    campos = ler_campos(request.args, campos_permitidos)
+    colunas = [campo for campo in campos_permitidos if campos is None or campo in campos]
+    campos = set(colunas)
+
+    lote = current_app.config.get('EXPORT_YIELD_PER', 1000)
+    registros = query.yield_per(lote)
+
+    def serializar_registro(registro):
+        return serializar(registro, campos)
+
+    if formato == 'csv':
+        linhas = _linhas_csv(registros, serializar_registro, colunas)
+    else:
+        linhas = _linhas_ndjson(registros, serializar_registro)
+
+    resposta = Response(
+        stream_with_context(_em_blocos(linhas, max(1, lote // 10))),
+        mimetype=FORMATOS_EXPORTACAO[formato]
+    )
+    resposta.headers['Content-Disposition'] = f'attachment; filename={nome_arquivo}.{formato}'
+    return resposta
@@ -0,0 +1,98 @@
+# Projeção do fluxo de pagamento das parcelas, agrupada por mês no banco de dados
+from datetime import date
+from sqlalchemy import select, func, or_, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from src.models.db import db
+from src.models.endividamento import Endividamento, Parcela, endividamento_pessoa
+from src.models.pessoa import Pessoa
+from src.utils.performance import cached
+
+# Horizonte padrão e máximo da projeção, em meses
+MESES_PADRAO = 24
+MESES_MAXIMO = 120
+
+
+class mes_ano(FunctionElement):
+    """Trunca uma data para o texto ``AAAA-MM`` conforme o dialeto do banco"""
+    type = String()
+    name = 'mes_ano'
+    inherit_cache = True
+
+
+@compiles(mes_ano)
+def _mes_ano_sqlite(elemento, compilador, **kw):
+    return "strftime(%s, %s)" % (compilador.post_process_text("'%Y-%m'"), compilador.process(elemento.clauses, **kw))
+
+
+@compiles(mes_ano, 'mysql')
+@compiles(mes_ano, 'mariadb')
+def _mes_ano_mysql(elemento, compilador, **kw):
+    # post_process_text duplica o '%' nos drivers com paramstyle 'format' (mysqlclient, PyMySQL)
+    return "DATE_FORMAT(%s, %s)" % (compilador.process(elemento.clauses, **kw), compilador.post_process_text("'%Y-%m'"))
+
+
+@compiles(mes_ano, 'postgresql')
+def _mes_ano_postgresql(elemento, compilador, **kw):
+    return "to_char(%s, 'YYYY-MM')" % compilador.process(elemento.clauses, **kw)
+
+
+def somar_meses(dia, meses):
+    """Primeiro dia do mês ``meses`` meses depois do mês de ``dia``"""
+    total = dia.year * 12 + dia.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _agrupar(colunas, inicio, fim, join_pessoa=False):
+    """SUM/COUNT das parcelas em aberto entre ``inicio`` e ``fim`` (exclusive) por mês e ``colunas``"""
+    mes = mes_ano(Parcela.data_vencimento).label('mes')
+    consulta = select(
+        mes, *colunas, func.sum(Parcela.valor).label('valor'), func.count(Parcela.id).label('parcelas')
+    ).join(Endividamento, Endividamento.id == Parcela.endividamento_id)
+    if join_pessoa:
+        consulta = consulta.join(
+            endividamento_pessoa, endividamento_pessoa.c.endividamento_id == Parcela.endividamento_id
+        ).join(Pessoa, Pessoa.id == endividamento_pessoa.c.pessoa_id)
+    consulta = consulta.where(
+        or_(Parcela.pago == False, Parcela.pago.is_(None)),
+        Parcela.data_vencimento >= inicio,
+        Parcela.data_vencimento < fim
+    ).group_by(mes, *colunas).order_by(mes, *colunas)
+    return db.session.execute(consulta).all()
+
+
+@cached(timeout=600, key_prefix='fluxo_endividamento', tags=('endividamentos',))
+def projetar_fluxo(hoje=None, meses=MESES_PADRAO):
+    """
+    Valor a pagar por mês nos próximos ``meses`` meses (a partir de hoje),
+    no total, por banco e por pessoa. Em endividamentos com várias pessoas
+    o valor integral conta para cada uma (obrigação solidária).
+
+    A agregação é feita inteiramente com ``GROUP BY`` no banco; o cache é
+    invalidado a cada escrita em endividamentos, parcelas ou pessoas.
+    """
+    hoje = date.fromisoformat(hoje) if isinstance(hoje, str) else (hoje or date.today())
+    fim = somar_meses(hoje, meses)
+    rotulos = [somar_meses(hoje, i).strftime('%Y-%m') for i in range(meses)]
+    totais = {mes: {'mes': mes, 'valor': 0.0, 'parcelas': 0} for mes in rotulos}
+
+    por_banco = []
+    for linha in _agrupar([Endividamento.banco], hoje, fim):
+        valor = round(float(linha.valor or 0), 2)
+        por_banco.append({'mes': linha.mes, 'banco': linha.banco, 'valor': valor, 'parcelas': linha.parcelas})
+        totais[linha.mes]['valor'] = round(totais[linha.mes]['valor'] + valor, 2)
+        totais[linha.mes]['parcelas'] += linha.parcelas
+
+    por_pessoa = [
+        {'mes': linha.mes, 'pessoa_id': linha.id, 'nome': linha.nome,
+         'valor': round(float(linha.valor or 0), 2), 'parcelas': linha.parcelas}
+        for linha in _agrupar([Pessoa.id, Pessoa.nome], hoje, fim, join_pessoa=True)
+    ]
+
+    return {
+        'inicio': hoje.isoformat(),
+        'fim': fim.isoformat(),
+        'meses': list(totais.values()),
+        'por_banco': por_banco,
+        'por_pessoa': por_pessoa,
+    }
@@ -0,0 +1,196 @@
+# Jobs em segundo plano com acompanhamento de progresso (Redis ou memória)
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from src.models.db import db
+from src.utils.cache import cache
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_JOB = 'job'
+
+# Campos numéricos do estado de um job
+CONTADORES = ('total', 'enviados', 'falhas')
+
+# Enquanto o job está na fila ou executando, o processo que o agendou renova
+# ``atualizado_em`` a cada BATIMENTO segundos; sem sinal por EXPIRACAO segundos
+# (processo encerrado) o job é dado como falho e o lock do tipo expira
+BATIMENTO = 15
+EXPIRACAO = 60
+
+
+class JobRegistry:
+    """Estado dos jobs: hash ``job:<id>`` no Redis ou dicionário em memória.
+
+    O fallback em memória só enxerga jobs do próprio processo; serve para
+    desenvolvimento e testes.
+    """
+
+    def __init__(self, ttl=86400, expiracao=EXPIRACAO):
+        self.ttl = ttl
+        self.expiracao = expiracao
+        self._memoria = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(job_id):
+        return f'{PREFIXO_JOB}:{job_id}'
+
+    def criar(self, tipo, job_id=None):
+        job_id = job_id or uuid.uuid4().hex
+        agora = time.time()
+        estado = {
+            'id': job_id, 'tipo': tipo, 'status': 'pendente',
+            'total': 0, 'enviados': 0, 'falhas': 0,
+            'criado_em': agora, 'atualizado_em': agora
+        }
+        if cache.redis_client:
+            try:
+                pipe = cache.redis_client.pipeline()
+                pipe.hset(self._chave(job_id), mapping=estado)
+                pipe.expire(self._chave(job_id), self.ttl)
+                pipe.execute()
+                return job_id
+            except Exception as e:
+                logger.warning(f'Redis indisponível para registrar o job {job_id}: {e}')
+        with self._lock:
+            self._memoria[job_id] = estado
+        return job_id
+
+    def atualizar(self, job_id, **campos):
+        campos['atualizado_em'] = time.time()
+        if 'resultado' in campos:
+            campos['resultado'] = json.dumps(campos['resultado'], ensure_ascii=False, default=str)
+        if cache.redis_client:
+            try:
+                cache.redis_client.hset(self._chave(job_id), mapping=campos)
+                return
+            except Exception as e:
+                logger.warning(f'Falha ao atualizar o job {job_id} no Redis: {e}')
+        with self._lock:
+            if job_id in self._memoria:
+                self._memoria[job_id].update(campos)
+
+    def incrementar(self, job_id, campo, valor=1):
+        if cache.redis_client:
+            try:
+                cache.redis_client.hincrby(self._chave(job_id), campo, valor)
+                return
+            except Exception as e:
+                logger.warning(f'Falha ao atualizar o job {job_id} no Redis: {e}')
+        with self._lock:
+            if job_id in self._memoria:
+                self._memoria[job_id][campo] += valor
+
+    def obter(self, job_id):
+        estado = None
+        if cache.redis_client:
+            try:
+                bruto = cache.redis_client.hgetall(self._chave(job_id))
+                if bruto:
+                    estado = {
+                        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                        for k, v in bruto.items()
+                    }
+            except Exception as e:
+                logger.warning(f'Falha ao ler o job {job_id} no Redis: {e}')
+        if estado is None:
+            with self._lock:
+                estado = dict(self._memoria[job_id]) if job_id in self._memoria else None
+        if estado is None:
+            return None
+
+        for campo in CONTADORES:
+            estado[campo] = int(estado.get(campo, 0))
+        for campo in ('criado_em', 'atualizado_em'):
+            estado[campo] = float(estado[campo])
+        if estado['status'] in ('pendente', 'executando') and time.time() - estado['atualizado_em'] > self.expiracao:
+            estado['status'] = 'erro'
+            estado['erro'] = 'Job interrompido: sem sinal do processo que o executava'
+            self.atualizar(job_id, status=estado['status'], erro=estado['erro'])
+        if isinstance(estado.get('resultado'), str):
+            estado['resultado'] = json.loads(estado['resultado'])
+        estado['processados'] = estado['enviados'] + estado['falhas']
+        return estado
+
+
+class Progresso:
+    """Interface entregue às funções de job para publicar o andamento"""
+
+    def __init__(self, registry, job_id):
+        self.registry = registry
+        self.job_id = job_id
+
+    def definir_total(self, total):
+        self.registry.atualizar(self.job_id, total=total)
+
+    def registrar(self, enviados=0, falhas=0):
+        if enviados:
+            self.registry.incrementar(self.job_id, 'enviados', enviados)
+        if falhas:
+            self.registry.incrementar(self.job_id, 'falhas', falhas)
+
+
+registry = JobRegistry()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _obter_executor(max_workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        return _executor
+
+
+def _lock(tipo):
+    return f'{PREFIXO_JOB}:{tipo}'
+
+
+def _bater(job_id, tipo, parar):
+    """Renova o job e o lock do tipo até ``parar`` ser sinalizado"""
+    while not parar.wait(BATIMENTO):
+        registry.atualizar(job_id)
+        cache.extend_lock(_lock(tipo), job_id, registry.expiracao)
+
+
+def _executar(app, job_id, tipo, parar, funcao, args, kwargs):
+    with app.app_context():
+        registry.atualizar(job_id, status='executando')
+        try:
+            resultado = funcao(Progresso(registry, job_id), *args, **kwargs)
+            registry.atualizar(job_id, status='concluido', resultado=resultado)
+        except Exception as e:
+            logger.error(f'Job {job_id} falhou: {e}')
+            registry.atualizar(job_id, status='erro', erro=str(e))
+        finally:
+            parar.set()
+            cache.release_lock(_lock(tipo), job_id)
+            db.session.remove()
+
+
+def iniciar_job(tipo, funcao, *args, **kwargs):
+    """Agenda ``funcao(progresso, *args, **kwargs)`` em segundo plano e retorna o id do job
+
+    Só um job de cada ``tipo`` roda por vez: enquanto houver um na fila ou em
+    execução, o id dele é retornado e nada novo é agendado.
+    """
+    app = current_app._get_current_object()
+    job_id = uuid.uuid4().hex
+    while not cache.acquire_lock(_lock(tipo), timeout=registry.expiracao, token=job_id):
+        ativo = cache.lock_owner(_lock(tipo))
+        if ativo:
+            logger.info(f'Job {tipo} já em andamento ({ativo})')
+            return ativo
+        # o lock expirou entre as duas chamadas: nova tentativa
+    registry.criar(tipo, job_id)
+    parar = threading.Event()
+    threading.Thread(target=_bater, args=(job_id, tipo, parar), name=f'job-batimento-{job_id[:8]}', daemon=True).start()
+    executor = _obter_executor(app.config.get('JOBS_MAX_WORKERS', 2))
+    executor.submit(_executar, app, job_id, tipo, parar, funcao, args, kwargs)
+    return job_id
@@ -0,0 +1,396 @@
+# Registro de métricas em memória, exposto no formato texto do Prometheus
+import os
+import hmac
+import json
+import glob
+import time
+import bisect
+import logging
+import tempfile
+import threading
+import ipaddress
+
+logger = logging.getLogger(__name__)
+
+# Buckets padrão de latência (segundos)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, registry, nome, descricao, labels=()):
+        self.registry = registry
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+
+    def _chave(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+
+class Counter(_Metrica):
+    """Contador monotônico com labels"""
+    tipo = 'counter'
+
+    def inc(self, valor=1, **labels):
+        chave = self._chave(labels)
+        with self.registry._lock:
+            serie = self.registry._valores.setdefault(self.nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+        self.registry._talvez_persistir()
+
+
+class Gauge(_Metrica):
+    """Valor instantâneo com labels (somado entre processos)"""
+    tipo = 'gauge'
+
+    def set(self, valor, **labels):
+        chave = self._chave(labels)
+        with self.registry._lock:
+            self.registry._valores.setdefault(self.nome, {})[chave] = valor
+        self.registry._talvez_persistir()
+
+
+class Histogram(_Metrica):
+    """Histograma com buckets cumulativos, soma e contagem"""
+    tipo = 'histogram'
+
+    def __init__(self, registry, nome, descricao, labels=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(registry, nome, descricao, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **labels):
+        chave = self._chave(labels)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self.registry._lock:
+            serie = self.registry._valores.setdefault(self.nome, {})
+            dados = serie.get(chave)
+            if dados is None:
+                # contagens por bucket (não cumulativas) + overflow, soma
+                dados = serie[chave] = {'buckets': [0] * (len(self.buckets) + 1), 'soma': 0.0}
+            dados['buckets'][indice] += 1
+            dados['soma'] += valor
+        self.registry._talvez_persistir()
+
+    def time(self, **labels):
+        return _Cronometro(self, labels)
+
+
+class _Cronometro:
+    def __init__(self, histograma, labels):
+        self.histograma = histograma
+        self.labels = labels
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and 'status' in self.histograma.labels:
+            self.labels.setdefault('status', 'erro')
+        self.histograma.observe(time.perf_counter() - self.inicio, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo.
+
+    Com um diretório multiprocessos configurado (``METRICS_MULTIPROC_DIR``),
+    cada worker do gunicorn grava periodicamente um snapshot em
+    ``<dir>/metrics_<pid>.json`` e a exposição soma os snapshots de todos.
+    Gauges são valores instantâneos: só entram na soma os de processos vivos.
+    """
+
+    def __init__(self, intervalo_persistencia=5.0):
+        self._metricas = {}
+        self._valores = {}
+        self._lock = threading.Lock()
+        self._gravacao_lock = threading.Lock()
+        self.multiproc_dir = None
+        self.intervalo_persistencia = intervalo_persistencia
+        self._ultima_persistencia = 0.0
+        self._persistencia_agendada = None
+
+    def configure(self, multiproc_dir=None):
+        self.multiproc_dir = multiproc_dir or None
+        if self.multiproc_dir:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+
+    def counter(self, nome, descricao, labels=()):
+        return self._registrar(Counter(self, nome, descricao, labels))
+
+    def gauge(self, nome, descricao, labels=()):
+        return self._registrar(Gauge(self, nome, descricao, labels))
+
+    def histogram(self, nome, descricao, labels=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histogram(self, nome, descricao, labels, buckets))
+
+    def _registrar(self, metrica):
+        existente = self._metricas.get(metrica.nome)
+        if existente is not None:
+            return existente
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def reset(self):
+        with self._lock:
+            self._valores = {}
+
+    # --- Persistência entre processos ---
+
+    def _arquivo_processo(self):
+        return os.path.join(self.multiproc_dir, f'metrics_{os.getpid()}.json')
+
+    def _talvez_persistir(self):
+        if not self.multiproc_dir:
+            return
+        # Decisão sob o lock: requisições simultâneas não gravam nem agendam em dobro
+        with self._lock:
+            agora = time.monotonic()
+            restante = self.intervalo_persistencia - (agora - self._ultima_persistencia)
+            if restante > 0:
+                if self._persistencia_agendada is None:
+                    # Sem isso a última alteração (ex.: o pool voltando a zero conexões
+                    # em uso) só chegaria ao arquivo na próxima atividade do processo
+                    self._persistencia_agendada = threading.Timer(restante, self.persist)
+                    self._persistencia_agendada.daemon = True
+                    self._persistencia_agendada.start()
+                return
+            self._ultima_persistencia = agora
+        self.persist()
+
+    def persist(self):
+        """Grava o snapshot deste processo de forma atômica"""
+        if not self.multiproc_dir:
+            return
+        # Um snapshot por vez: um mais antigo não pode sobrescrever um mais novo
+        with self._gravacao_lock:
+            with self._lock:
+                self._ultima_persistencia = time.monotonic()
+                agendada, self._persistencia_agendada = self._persistencia_agendada, None
+                snapshot = {
+                    nome: {
+                        'tipo': self._tipo(nome),
+                        'series': [[list(chave), valor] for chave, valor in serie.items()]
+                    }
+                    for nome, serie in self._valores.items()
+                }
+            if agendada is not None:
+                agendada.cancel()
+            try:
+                _gravar_snapshot(self._arquivo_processo(), snapshot)
+            except OSError as e:
+                logger.warning(f'Não foi possível gravar métricas em {self.multiproc_dir}: {e}')
+
+    def _coletar(self):
+        """Valores de todos os processos (ou apenas deste, sem diretório multiprocessos)"""
+        if not self.multiproc_dir:
+            with self._lock:
+                return {nome: {chave: _copiar(v) for chave, v in serie.items()} for nome, serie in self._valores.items()}
+
+        self.persist()
+        agregado = {}
+        for caminho in glob.glob(os.path.join(self.multiproc_dir, 'metrics_*.json')):
+            try:
+                with open(caminho) as arquivo:
+                    snapshot = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                logger.warning(f'Snapshot de métricas ignorado ({caminho}): {e}')
+                continue
+            # o valor de um gauge de processo encerrado não existe mais
+            vivo = _processo_vivo(_pid_do_arquivo(caminho))
+            for nome, dados in snapshot.items():
+                if dados['tipo'] == 'gauge' and not vivo:
+                    continue
+                destino = agregado.setdefault(nome, {})
+                for chave, valor in dados['series']:
+                    chave = tuple(chave)
+                    destino[chave] = _somar(destino.get(chave), valor)
+        return agregado
+
+    def _tipo(self, nome):
+        metrica = self._metricas.get(nome)
+        return metrica.tipo if metrica is not None else None
+
+    # --- Exposição ---
+
+    def render(self):
+        """Gera o texto no formato de exposição do Prometheus"""
+        valores = self._coletar()
+        linhas = []
+        for nome, metrica in sorted(self._metricas.items()):
+            linhas.append(f'# HELP {nome} {metrica.descricao}')
+            linhas.append(f'# TYPE {nome} {metrica.tipo}')
+            for chave, valor in sorted(valores.get(nome, {}).items()):
+                labels = list(zip(metrica.labels, chave))
+                if metrica.tipo != 'histogram':
+                    linhas.append(f'{nome}{_formatar_labels(labels)} {_formatar_numero(valor)}')
+                    continue
+                acumulado = 0
+                for limite, quantidade in zip(metrica.buckets + (float('inf'),), valor['buckets']):
+                    acumulado += quantidade
+                    le = '+Inf' if limite == float('inf') else _formatar_numero(limite)
+                    linhas.append(f'{nome}_bucket{_formatar_labels(labels + [("le", le)])} {acumulado}')
+                linhas.append(f'{nome}_sum{_formatar_labels(labels)} {_formatar_numero(valor["soma"])}')
+                linhas.append(f'{nome}_count{_formatar_labels(labels)} {acumulado}')
+        return '\n'.join(linhas) + '\n'
+
+
+# Contadores e histogramas de workers já encerrados (ver marcar_processo_encerrado)
+ARQUIVO_ENCERRADOS = 'metrics_encerrados.json'
+
+
+def _gravar_snapshot(caminho, snapshot):
+    """Grava ``snapshot`` em ``caminho`` de forma atômica"""
+    fd, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    with os.fdopen(fd, 'w') as arquivo:
+        json.dump(snapshot, arquivo)
+    os.replace(caminho_tmp, caminho)
+
+
+def marcar_processo_encerrado(multiproc_dir, pid):
+    """Remove o snapshot de um worker encerrado (hook ``child_exit`` do gunicorn).
+
+    Contadores e histogramas do worker são somados em ``metrics_encerrados.json``
+    para que os totais expostos não diminuam; gauges são descartados. Deve ser
+    chamada por um único processo (o master do gunicorn).
+    """
+    if not multiproc_dir:
+        return
+    caminho = os.path.join(multiproc_dir, f'metrics_{pid}.json')
+    try:
+        with open(caminho) as arquivo:
+            snapshot = json.load(arquivo)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f'Snapshot de métricas do worker {pid} ilegível, removido: {e}')
+        snapshot = {}
+
+    destino = os.path.join(multiproc_dir, ARQUIVO_ENCERRADOS)
+    try:
+        with open(destino) as arquivo:
+            acumulado = json.load(arquivo)
+    except (OSError, ValueError):
+        acumulado = {}
+    for nome, dados in snapshot.items():
+        if dados['tipo'] == 'gauge':
+            continue
+        series = {tuple(chave): valor for chave, valor in acumulado.get(nome, {}).get('series', [])}
+        for chave, valor in dados['series']:
+            series[tuple(chave)] = _somar(series.get(tuple(chave)), valor)
+        acumulado[nome] = {'tipo': dados['tipo'], 'series': [[list(chave), valor] for chave, valor in series.items()]}
+    _gravar_snapshot(destino, acumulado)
+    os.remove(caminho)
+
+
+def _pid_do_arquivo(caminho):
+    nome = os.path.basename(caminho)[len('metrics_'):-len('.json')]
+    return int(nome) if nome.isdigit() else None
+
+
+def _processo_vivo(pid):
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _copiar(valor):
+    if isinstance(valor, dict):
+        return {'buckets': list(valor['buckets']), 'soma': valor['soma']}
+    return valor
+
+
+def _somar(atual, novo):
+    if atual is None:
+        return _copiar(novo)
+    if isinstance(novo, dict):
+        return {
+            'buckets': [a + b for a, b in zip(atual['buckets'], novo['buckets'])],
+            'soma': atual['soma'] + novo['soma']
+        }
+    return atual + novo
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in labels) + '}'
+
+
+def _formatar_numero(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor)) if abs(valor) < 1e15 else repr(valor)
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+# Registro global e métricas da aplicação
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Duração das requisições HTTP',
+    labels=('method', 'blueprint', 'endpoint', 'status')
+)
+http_request_db_duration = registry.histogram(
+    'http_request_db_seconds', 'Tempo gasto no banco de dados por requisição',
+    labels=('blueprint', 'endpoint')
+)
+cache_requests = registry.counter(
+    'cache_requests_total', 'Consultas ao cache por prefixo de chave e resultado',
+    labels=('prefix', 'result')
+)
+email_send_duration = registry.histogram(
+    'email_send_duration_seconds', 'Duração do envio de e-mails via SMTP',
+    labels=('status',), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+def _redes(valor):
+    if isinstance(valor, str):
+        valor = [item.strip() for item in valor.split(',') if item.strip()]
+    return [ipaddress.ip_network(item, strict=False) for item in valor]
+
+
+def acesso_permitido(request, token, redes):
+    """/metrics: com o token (``Authorization: Bearer``) ou a partir de um IP permitido"""
+    if token:
+        cabecalho = request.headers.get('Authorization', '')
+        if cabecalho.startswith('Bearer ') and hmac.compare_digest(cabecalho[7:].encode(), token.encode()):
+            return True
+    try:
+        ip = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        return False
+    return any(ip in rede for rede in redes)
+
+
+def init_metrics(app):
+    """Configura o diretório multiprocessos e publica o endpoint /metrics
+
+    O acesso exige ``METRICS_TOKEN`` ou um endereço em ``METRICS_ALLOWED_IPS``
+    (por padrão só a própria máquina).
+    """
+    from flask import jsonify, request
+
+    registry.configure(app.config.get('METRICS_MULTIPROC_DIR'))
+    token = app.config.get('METRICS_TOKEN')
+    redes = _redes(app.config.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1'))
+
+    @app.route('/metrics')
+    def metrics():
+        if not acesso_permitido(request, token, redes):
+            return jsonify({'erro': 'Acesso negado'}), 403
+        return app.response_class(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,10 +1,14 @@
 # Serviço de Notificações para Endividamentos
 from datetime import datetime, date, timedelta
-from sqlalchemy import and_
+from sqlalchemy import literal
+from sqlalchemy.orm import contains_eager, selectinload
 from src.models.db import db
-from src.models.endividamento import Endividamento
+from src.models.endividamento import Endividamento, INTERVALOS_NOTIFICACAO
 from src.models.notificacao_endividamento import NotificacaoEndividamento, HistoricoNotificacao
+from src.models.email_outbox import EmailOutbox
+from src.models.proxima_notificacao import prazo_devido
 from src.utils.email_service import EmailService
+from src.utils.outbox import processar_outbox, contar_disponiveis
 import json
 import logging
 
@@ -14,127 +18,148 @@ class NotificacaoEndividamentoService:
     """Serviço para gerenciar notificações de endividamentos"""
     
     # Intervalos de notificação em dias
-    INTERVALOS_NOTIFICACAO = {
-        '6_meses': 180,
-        '3_meses': 90,
-        '30_dias': 30,
-        '15_dias': 15,
-        '7_dias': 7,
-        '3_dias': 3,
-        '1_dia': 1
-    }
+    INTERVALOS_NOTIFICACAO = INTERVALOS_NOTIFICACAO
+    TIPO_POR_DIAS = {dias: tipo for tipo, dias in INTERVALOS_NOTIFICACAO.items()}
     
     def __init__(self):
         self.email_service = EmailService()
     
-    def verificar_e_enviar_notificacoes(self):
-        """Verifica todos os endividamentos e envia notificações quando necessário"""
-        hoje = date.today()
-        notificacoes_enviadas = 0
-        
+    def planejar_notificacoes(self, hoje=None):
+        """Calcula as notificações devidas no dia.
+
+        Os candidatos vêm de uma varredura do índice de
+        ``Endividamento.proxima_notificacao`` (``<= hoje``, vencimento ainda
+        não atingido); o tipo é o menor intervalo que cobre a distância real
+        entre hoje e o vencimento final (``proxima_notificacao`` pode estar
+        atrasada e apontar para um lembrete já superado). Pares já enviados com sucesso ou já postos na outbox são
+        excluídos com uma única consulta, e os endividamentos cujo par já
+        tem resultado final são avançados para a data seguinte.
+        Retorna uma lista de ``(configuracao, tipo_notificacao)`` com o
+        endividamento, as parcelas e as pessoas já carregados.
+        """
+        hoje = hoje or date.today()
+        linhas = NotificacaoEndividamento.query.join(
+            NotificacaoEndividamento.endividamento
+        ).options(
+            contains_eager(NotificacaoEndividamento.endividamento).options(
+                selectinload(Endividamento.parcelas),
+                selectinload(Endividamento.pessoas).lazyload('*')
+            )
+        ).filter(
+            NotificacaoEndividamento.ativo == True,
+            Endividamento.proxima_notificacao <= hoje,
+            # no dia do vencimento não há mais lembrete a enviar
+            Endividamento.data_vencimento_final > hoje
+        ).order_by(NotificacaoEndividamento.endividamento_id, NotificacaoEndividamento.id).all()
+
+        # Uma configuração ativa por endividamento (a mais antiga, como antes)
+        candidatos = {}
+        for configuracao in linhas:
+            endividamento = configuracao.endividamento
+            dias = prazo_devido((endividamento.data_vencimento_final - hoje).days, self.TIPO_POR_DIAS)
+            tipo = self.TIPO_POR_DIAS.get(dias)
+            if tipo:
+                candidatos.setdefault(endividamento.id, (configuracao, tipo))
+        if not candidatos:
+            return []
+
+        ids = list(candidatos)
+        existentes = db.session.query(
+            EmailOutbox.endividamento_id, EmailOutbox.tipo_notificacao, EmailOutbox.status
+        ).filter(EmailOutbox.endividamento_id.in_(ids)).union_all(
+            db.session.query(
+                HistoricoNotificacao.endividamento_id, HistoricoNotificacao.tipo_notificacao,
+                literal(EmailOutbox.ENVIADO)
+            ).filter(HistoricoNotificacao.endividamento_id.in_(ids), HistoricoNotificacao.sucesso == True)
+        ).all()
+
+        plano = []
+        finalizados = {(endividamento_id, tipo) for endividamento_id, tipo, status in existentes
+                       if status in (EmailOutbox.ENVIADO, EmailOutbox.FALHA)}
+        ocupados = {(endividamento_id, tipo) for endividamento_id, tipo, _ in existentes}
+        for endividamento_id, (configuracao, tipo) in candidatos.items():
+            if (endividamento_id, tipo) in finalizados:
+                configuracao.endividamento.avancar_notificacao(hoje)
+            elif (endividamento_id, tipo) not in ocupados:
+                plano.append((configuracao, tipo))
+        return plano
+
+    def enfileirar_notificacoes(self, hoje=None):
+        """Grava na outbox, em uma única transação, as notificações devidas no dia.
+
+        O envio fica a cargo do worker da outbox (``src.utils.outbox``).
+        Retorna o número de mensagens enfileiradas.
+        """
+        hoje = hoje or date.today()
         try:
-            # Buscar todos os endividamentos ativos com notificações configuradas
-            endividamentos = db.session.query(Endividamento).join(
-                NotificacaoEndividamento
-            ).filter(
-                NotificacaoEndividamento.ativo == True,
-                Endividamento.data_vencimento_final > hoje
-            ).all()
+            mensagens = []
+            for configuracao, tipo_notificacao in self.planejar_notificacoes(hoje):
+                endividamento = configuracao.endividamento
+                try:
+                    emails = json.loads(configuracao.emails)
+                    if not emails:
+                        # Nada a enviar neste prazo: sem avançar, seria selecionado a cada execução
+                        endividamento.avancar_notificacao(hoje)
+                        continue
+                    dias_restantes = (endividamento.data_vencimento_final - hoje).days
+                    assunto, corpo = self._preparar_email(endividamento, tipo_notificacao, dias_restantes)
+                except Exception as e:
+                    logger.error(f"Erro ao preparar notificação para endividamento {endividamento.id}: {str(e)}")
+                    self._registrar_historico(endividamento.id, tipo_notificacao, [], False, str(e))
+                    continue
+                mensagens.append(EmailOutbox(
+                    destinatarios=json.dumps(emails),
+                    assunto=assunto,
+                    corpo=corpo,
+                    html=True,
+                    endividamento_id=endividamento.id,
+                    tipo_notificacao=tipo_notificacao
+                ))
             
-            for endividamento in endividamentos:
-                notificacoes_enviadas += self._processar_endividamento(endividamento, hoje)
-            
-            logger.info(f"Processamento de notificações concluído. {notificacoes_enviadas} notificações enviadas.")
-            return notificacoes_enviadas
+            db.session.add_all(mensagens)
+            db.session.commit()
+            logger.info(f"{len(mensagens)} notificações de endividamento enfileiradas.")
+            return len(mensagens)
             
         except Exception as e:
-            logger.error(f"Erro ao processar notificações: {str(e)}")
+            db.session.rollback()
+            logger.error(f"Erro ao enfileirar notificações: {str(e)}")
             return 0
-    
-    def _processar_endividamento(self, endividamento, hoje):
-        """Processa um endividamento específico para verificar se precisa enviar notificações"""
-        notificacoes_enviadas = 0
-        dias_para_vencimento = (endividamento.data_vencimento_final - hoje).days
-        
-        for tipo_notificacao, dias_antecedencia in self.INTERVALOS_NOTIFICACAO.items():
-            if dias_para_vencimento == dias_antecedencia:
-                if not self._ja_foi_enviada(endividamento.id, tipo_notificacao):
-                    if self._enviar_notificacao(endividamento, tipo_notificacao):
-                        notificacoes_enviadas += 1
-        
-        return notificacoes_enviadas
-    
-    def _ja_foi_enviada(self, endividamento_id, tipo_notificacao):
-        """Verifica se a notificação já foi enviada para este endividamento"""
-        return db.session.query(HistoricoNotificacao).filter(
-            and_(
-                HistoricoNotificacao.endividamento_id == endividamento_id,
-                HistoricoNotificacao.tipo_notificacao == tipo_notificacao,
-                HistoricoNotificacao.sucesso == True
-            )
-        ).first() is not None
-    
-    def _enviar_notificacao(self, endividamento, tipo_notificacao):
-        """Envia a notificação por e-mail"""
+
+    def job_enviar_notificacoes(self, progresso):
+        """Job em segundo plano: enfileira as notificações do dia e drena a outbox"""
+        enfileiradas = self.enfileirar_notificacoes()
+        progresso.definir_total(contar_disponiveis())
+        enviadas = processar_outbox(email_service=self.email_service, progresso=progresso)
+        return {'enfileiradas': enfileiradas, 'enviadas': enviadas}
+
+    def verificar_e_enviar_notificacoes(self):
+        """Enfileira as notificações devidas hoje e drena a outbox no próprio processo"""
         try:
-            # Buscar configuração de notificação
-            notificacao_config = NotificacaoEndividamento.query.filter_by(
-                endividamento_id=endividamento.id,
-                ativo=True
-            ).first()
-            
-            if not notificacao_config:
-                return False
+            self.enfileirar_notificacoes()
+            notificacoes_enviadas = processar_outbox(email_service=self.email_service)
             
-            emails = json.loads(notificacao_config.emails)
-            if not emails:
-                return False
-            
-            # Preparar dados do e-mail
-            assunto, corpo = self._preparar_email(endividamento, tipo_notificacao)
-            
-            # Enviar e-mail
-            sucesso = self.email_service.send_email(
-                destinatarios=emails,
-                assunto=assunto,
-                corpo=corpo,
-                html=True
-            )
-            
-            # Registrar no histórico
-            self._registrar_historico(
-                endividamento.id,
-                tipo_notificacao,
-                emails,
-                sucesso
-            )
-            
-            return sucesso
+            logger.info(f"Processamento de notificações concluído. {notificacoes_enviadas} notificações enviadas.")
+            return notificacoes_enviadas
             
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação para endividamento {endividamento.id}: {str(e)}")
-            self._registrar_historico(
-                endividamento.id,
-                tipo_notificacao,
-                [],
-                False,
-                str(e)
-            )
-            return False
+            logger.error(f"Erro ao processar notificações: {str(e)}")
+            return 0
     
-    def _preparar_email(self, endividamento, tipo_notificacao):
-        """Prepara o assunto e corpo do e-mail"""
-        dias = self.INTERVALOS_NOTIFICACAO[tipo_notificacao]
+    def _preparar_email(self, endividamento, tipo_notificacao, dias_restantes=None):
+        """Prepara o assunto e corpo do e-mail
+
+        O período do texto é ``dias_restantes`` (distância real até o
+        vencimento); sem ele, o intervalo do ``tipo_notificacao``.
+        """
+        dias = self.INTERVALOS_NOTIFICACAO[tipo_notificacao] if dias_restantes is None else dias_restantes
         
-        if dias >= 30:
-            if dias == 180:
-                periodo = "6 meses"
-            elif dias == 90:
-                periodo = "3 meses"
-            else:
-                periodo = f"{dias} dias"
+        if dias == 180:
+            periodo = "6 meses"
+        elif dias == 90:
+            periodo = "3 meses"
         else:
-            periodo = f"{dias} dia{'s' if dias > 1 else ''}"
+            periodo = f"{dias} dia{'s' if dias != 1 else ''}"
         
         assunto = f"Lembrete: Endividamento vence em {periodo} - {endividamento.banco}"
         
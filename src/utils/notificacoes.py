@@ -1,6 +1,6 @@
 import datetime
 from flask import current_app, flash
-from src.models.documento import Documento
+from src.utils.vencimentos import classificar_documentos
 
 def verificar_documentos_vencimento():
     """
@@ -11,21 +11,8 @@ def verificar_documentos_vencimento():
         tuple: (documentos_vencidos, documentos_proximos_vencimento)
     """
     try:
-        # Buscar documentos com data de vencimento
-        documentos = Documento.query.filter(Documento.data_vencimento.isnot(None)).all()
-        
-        # Separar documentos vencidos e próximos do vencimento
-        documentos_vencidos = []
-        documentos_proximos = []
-        
-        for documento in documentos:
-            if documento.esta_vencido:
-                documentos_vencidos.append(documento)
-            elif documento.precisa_notificar:
-                documentos_proximos.append(documento)
-        
-        return documentos_vencidos, documentos_proximos
-        
+        # Classificação feita no banco: só os documentos relevantes são carregados
+        return classificar_documentos()
     except Exception as e:
         current_app.logger.error(f"Erro ao verificar documentos vencidos: {str(e)}")
         return [], []
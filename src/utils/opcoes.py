@@ -0,0 +1,84 @@
+# Opções (id, nome) de pessoas e fazendas para os <select> dos formulários
+#
+# As listas ficam no cache sob as tags 'pessoas' e 'fazendas': qualquer commit
+# que grave uma pessoa ou fazenda incrementa a versão da tag (ver
+# clear_related_cache) e a próxima leitura monta a lista de novo. Acima de
+# OPCOES_LIMITE_SELECT itens os formulários deixam de renderizar a lista inteira
+# e passam a buscar por nome em /api/<entidade>/opcoes (typeahead).
+from collections import namedtuple
+from flask import current_app
+from src.models.pessoa import Pessoa
+from src.models.fazenda import Fazenda
+from src.utils.cache import cached
+
+Opcao = namedtuple('Opcao', 'id nome')
+
+LIMITE_SELECT_PADRAO = 200
+LIMITE_BUSCA = 20
+TERMO_MINIMO = 2
+
+MODELOS = {'pessoas': Pessoa, 'fazendas': Fazenda}
+
+
+def _consultar(modelo):
+    # só as duas colunas: nada de ORM nem relacionamentos
+    linhas = modelo.query.with_entities(modelo.id, modelo.nome).order_by(modelo.nome, modelo.id).all()
+    return [[linha.id, linha.nome] for linha in linhas]
+
+
+@cached(timeout=3600, key_prefix='opcoes', tags=('pessoas',))
+def _opcoes_pessoas():
+    return _consultar(Pessoa)
+
+
+@cached(timeout=3600, key_prefix='opcoes', tags=('fazendas',))
+def _opcoes_fazendas():
+    return _consultar(Fazenda)
+
+
+_CARREGADORES = {'pessoas': _opcoes_pessoas, 'fazendas': _opcoes_fazendas}
+
+
+def listar_opcoes(entidade):
+    """Todas as opções de ``entidade`` ('pessoas' ou 'fazendas'), ordenadas por nome"""
+    # o codec JSON do cache devolve listas: as tuplas são montadas na leitura
+    return [Opcao(*item) for item in _CARREGADORES[entidade]()]
+
+
+def limite_select():
+    return current_app.config.get('OPCOES_LIMITE_SELECT', LIMITE_SELECT_PADRAO)
+
+
+class ListaOpcoes(list):
+    """Lista de opções de um <select>; ``typeahead`` indica busca pela API"""
+
+    def __init__(self, opcoes, typeahead=False):
+        super().__init__(opcoes)
+        self.typeahead = typeahead
+
+
+def opcoes_select(entidade, selecionados=(), excluir=()):
+    """Opções para um <select> de ``entidade``
+
+    Até o limite a lista é completa. Acima dele só os ``selecionados`` são
+    renderizados, ``typeahead`` fica True e o campo busca o restante pela API
+    conforme o usuário digita. ``excluir`` remove ids da lista (ex.: fazendas
+    já associadas).
+    """
+    excluidos = set(excluir)
+    opcoes = [opcao for opcao in listar_opcoes(entidade) if opcao.id not in excluidos]
+    if len(opcoes) <= limite_select():
+        return ListaOpcoes(opcoes)
+    ids = {int(i) for i in selecionados if i and str(i).isdigit()}
+    return ListaOpcoes([opcao for opcao in opcoes if opcao.id in ids], typeahead=True)
+
+
+def buscar_opcoes(entidade, termo, limite=LIMITE_BUSCA):
+    """Opções cujo nome contém ``termo`` (sem cache: o termo varia a cada tecla)"""
+    if len(termo) < TERMO_MINIMO:
+        return []
+    modelo = MODELOS[entidade]
+    linhas = modelo.query.with_entities(modelo.id, modelo.nome).filter(
+        modelo.nome.icontains(termo, autoescape=True)
+    ).order_by(modelo.nome, modelo.id).limit(limite).all()
+    return [Opcao(linha.id, linha.nome) for linha in linhas]
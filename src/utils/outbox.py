@@ -0,0 +1,219 @@
+# Worker da outbox de e-mails: envia em lotes, registra o resultado e reagenda falhas
+import logging
+import math
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from src.models.db import db
+from sqlalchemy.orm import lazyload
+from src.models.email_outbox import EmailOutbox
+from src.models.endividamento import Endividamento
+from src.models.notificacao_endividamento import HistoricoNotificacao
+from src.utils.email_service import EmailService
+
+logger = logging.getLogger(__name__)
+
+# Mensagens enviadas por vez dentro de um lote reservado. A reserva cobre um
+# sublote e é renovada antes de cada um: se o worker morrer no meio do envio,
+# as linhas voltam a ficar disponíveis depois de um único prazo de sublote
+SUBLOTE_ENVIO = 20
+
+# Folga somada ao tempo estimado de envio de um sublote
+MARGEM_RESERVA = timedelta(minutes=2)
+
+# Espera base entre tentativas (dobra a cada falha)
+BACKOFF_BASE = timedelta(minutes=1)
+
+
+def dono_reserva():
+    """Identificação deste processo gravada nas mensagens que ele reserva"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _dono_vivo(dono):
+    """True se ``dono`` é um processo ainda em execução neste host.
+
+    Processos de outros hosts não podem ser verificados: para eles vale só o
+    prazo da reserva.
+    """
+    host, _, pid = (dono or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def prazo_reserva(quantidade):
+    """Tempo para enviar ``quantidade`` mensagens no pior caso.
+
+    As mensagens saem em rodadas de até ``MAIL_DISPATCH_WORKERS`` envios
+    simultâneos (limitados pelas conexões do pool) e cada envio pode esgotar o
+    ``MAIL_TIMEOUT`` em todas as ``MAIL_SEND_RETRIES`` tentativas.
+    """
+    config = current_app.config
+    paralelos = max(1, min(config.get('MAIL_DISPATCH_WORKERS', 4), config.get('MAIL_POOL_MAX_CONNECTIONS', 4)))
+    por_envio = config.get('MAIL_TIMEOUT', 30) * config.get('MAIL_SEND_RETRIES', 3)
+    return timedelta(seconds=math.ceil(quantidade / paralelos) * por_envio) + MARGEM_RESERVA
+
+
+def _reservar_lote(tamanho, agora):
+    """Marca até ``tamanho`` mensagens disponíveis como 'enviando' e devolve os ids
+
+    Mensagens 'enviando' com a reserva vencida só são retomadas se o dono não
+    está mais em execução; as de um dono vivo têm o prazo adiado e continuam
+    com ele.
+    """
+    dono = dono_reserva()
+    prazo = prazo_reserva(min(tamanho, SUBLOTE_ENVIO))
+    while True:
+        query = EmailOutbox.query.filter(
+            EmailOutbox.status.in_([EmailOutbox.PENDENTE, EmailOutbox.ENVIANDO]),
+            EmailOutbox.disponivel_em <= agora
+        ).order_by(EmailOutbox.disponivel_em, EmailOutbox.id).limit(tamanho)
+        # Vários workers podem drenar a fila ao mesmo tempo (ignorado no SQLite)
+        candidatas = query.with_for_update(skip_locked=True).all()
+        if not candidatas:
+            return []
+        mensagens = []
+        for mensagem in candidatas:
+            if mensagem.status == EmailOutbox.ENVIANDO and _dono_vivo(mensagem.reservado_por):
+                logger.warning(f'Reserva da mensagem {mensagem.id} vencida, mas {mensagem.reservado_por} '
+                               f'ainda está em execução; prazo adiado')
+            else:
+                mensagem.status = EmailOutbox.ENVIANDO
+                mensagem.reservado_por = dono
+                mensagens.append(mensagem)
+            mensagem.disponivel_em = agora + prazo
+        ids = [mensagem.id for mensagem in mensagens]
+        db.session.commit()
+        if ids:
+            return ids
+
+
+def _renovar_reserva(ids, agora):
+    """Estende a reserva das mensagens ``ids`` e carrega as que ainda são deste processo"""
+    dono = dono_reserva()
+    filtro = (
+        EmailOutbox.id.in_(ids),
+        EmailOutbox.status == EmailOutbox.ENVIANDO,
+        EmailOutbox.reservado_por == dono
+    )
+    EmailOutbox.query.filter(*filtro).update(
+        {EmailOutbox.disponivel_em: agora + prazo_reserva(min(len(ids), SUBLOTE_ENVIO))},
+        synchronize_session=False
+    )
+    db.session.commit()
+    minhas = EmailOutbox.query.filter(*filtro).order_by(EmailOutbox.id).all()
+    perdidas = len(ids) - len(minhas)
+    if perdidas:
+        logger.warning(f'Outbox de e-mails: {perdidas} mensagem(ns) reservada(s) por outro worker')
+    return minhas
+
+
+def _registrar_resultado(mensagem, sucesso, agora, erro=None):
+    """Grava o resultado do envio; retorna True se ele é final (sem nova tentativa)"""
+    mensagem.reservado_por = None
+    if sucesso:
+        mensagem.status = EmailOutbox.ENVIADO
+        mensagem.enviado_em = agora
+        mensagem.erro_mensagem = None
+    else:
+        mensagem.tentativas += 1
+        mensagem.erro_mensagem = erro
+        if mensagem.tentativas < mensagem.max_tentativas:
+            mensagem.status = EmailOutbox.PENDENTE
+            mensagem.disponivel_em = agora + BACKOFF_BASE * (2 ** (mensagem.tentativas - 1))
+            return False
+        mensagem.status = EmailOutbox.FALHA
+
+    # Histórico só com o resultado final de notificações de endividamento
+    if mensagem.endividamento_id is not None:
+        db.session.add(HistoricoNotificacao(
+            endividamento_id=mensagem.endividamento_id,
+            tipo_notificacao=mensagem.tipo_notificacao,
+            emails_enviados=mensagem.destinatarios,
+            sucesso=sucesso,
+            erro_mensagem=None if sucesso else erro
+        ))
+    return True
+
+
+def _avancar_endividamentos(ids):
+    """Move a próxima notificação dos endividamentos cujo envio terminou"""
+    if not ids:
+        return
+    for endividamento in Endividamento.query.options(lazyload('*')).filter(Endividamento.id.in_(ids)):
+        endividamento.avancar_notificacao()
+
+
+def contar_disponiveis():
+    """Mensagens que o próximo ciclo do worker tentaria enviar"""
+    return EmailOutbox.query.filter(
+        EmailOutbox.status.in_([EmailOutbox.PENDENTE, EmailOutbox.ENVIANDO]),
+        EmailOutbox.disponivel_em <= datetime.utcnow()
+    ).count()
+
+
+def processar_outbox(tamanho_lote=100, max_lotes=None, email_service=None, progresso=None):
+    """Drena a outbox em lotes; retorna o número de mensagens enviadas.
+
+    Cada lote é reservado em uma transação e enviado em sublotes de
+    ``SUBLOTE_ENVIO`` pelo ``EmailService.send_many``; antes de cada sublote a
+    reserva das mensagens restantes é renovada e, depois dele, o resultado é
+    gravado em outra transação. ``progresso`` (``src.utils.jobs.Progresso``)
+    recebe as contagens de cada sublote.
+    """
+    email_service = email_service or EmailService()
+    enviadas = 0
+    lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        restantes = _reservar_lote(tamanho_lote, datetime.utcnow())
+        if not restantes:
+            break
+        lotes += 1
+
+        while restantes:
+            mensagens = _renovar_reserva(restantes, datetime.utcnow())
+            if not mensagens:
+                break
+            sublote = mensagens[:SUBLOTE_ENVIO]
+            restantes = [mensagem.id for mensagem in mensagens[SUBLOTE_ENVIO:]]
+            resultados = email_service.send_many([
+                (m.lista_destinatarios, m.assunto, m.corpo, m.html) for m in sublote
+            ])
+            agora = datetime.utcnow()
+            finalizados = set()
+            for mensagem, sucesso in zip(sublote, resultados):
+                if _registrar_resultado(mensagem, sucesso, agora, None if sucesso else 'Falha no envio SMTP'):
+                    if mensagem.endividamento_id is not None:
+                        finalizados.add(mensagem.endividamento_id)
+            _avancar_endividamentos(finalizados)
+            db.session.commit()
+            sucessos = sum(1 for sucesso in resultados if sucesso)
+            enviadas += sucessos
+            if progresso is not None:
+                progresso.registrar(enviados=sucessos, falhas=len(resultados) - sucessos)
+
+    if lotes:
+        logger.info(f'Outbox de e-mails: {enviadas} mensagens enviadas em {lotes} lote(s)')
+    return enviadas
+
+
+def executar_worker(intervalo=5, tamanho_lote=100):
+    """Laço do worker local: drena a outbox e aguarda ``intervalo`` segundos quando vazia"""
+    logger.info('Worker da outbox de e-mails iniciado')
+    while True:
+        try:
+            if not processar_outbox(tamanho_lote=tamanho_lote):
+                time.sleep(intervalo)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f'Erro no worker da outbox de e-mails: {e}')
+            time.sleep(intervalo)
@@ -0,0 +1,113 @@
+# Paginação por chave (keyset) para as APIs de listagem
+import base64
+import datetime
+import json
+from sqlalchemy import tuple_
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro de paginação ou seleção de campos inválido"""
+
+
+def _json_default(obj):
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    raise TypeError(f'Tipo não suportado no cursor: {type(obj).__name__}')
+
+
+def codificar_cursor(valores):
+    """Cursor opaco (base64 url-safe) com os valores da chave do último item"""
+    bruto = json.dumps(list(valores), default=_json_default, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(bruto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(bruto)
+    except (ValueError, TypeError):
+        raise ParametroInvalido('Cursor inválido')
+    if not isinstance(valores, list) or len(valores) != 2 or not isinstance(valores[1], int):
+        raise ParametroInvalido('Cursor inválido')
+    return valores
+
+
+def ler_limite(args):
+    try:
+        limite = int(args.get('limit', LIMITE_PADRAO))
+    except ValueError:
+        raise ParametroInvalido('limit deve ser um número inteiro')
+    if limite < 1:
+        raise ParametroInvalido('limit deve ser maior que zero')
+    return min(limite, LIMITE_MAXIMO)
+
+
+def ler_campos(args, permitidos):
+    """Campos pedidos em ``?fields=id,nome`` (None quando todos)"""
+    valor = args.get('fields')
+    if not valor:
+        return None
+    campos = {campo.strip() for campo in valor.split(',') if campo.strip()}
+    desconhecidos = campos - set(permitidos)
+    if desconhecidos:
+        raise ParametroInvalido(f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    return campos
+
+
+def selecionar_campos(dados, campos):
+    if campos is None:
+        return dados
+    return {chave: valor for chave, valor in dados.items() if chave in campos}
+
+
+def pedido_paginado(args):
+    """A resposta paginada é opcional: listagens sem ``limit``/``cursor`` mantêm o formato antigo"""
+    return 'limit' in args or 'cursor' in args
+
+
+def _ler_cursor(cursor, converter):
+    valor, ultimo_id = decodificar_cursor(cursor)
+    if valor is not None and converter is not None:
+        try:
+            valor = converter(valor)
+        except (ValueError, TypeError):
+            raise ParametroInvalido('Cursor inválido')
+    return valor, ultimo_id
+
+
+def paginar_keyset(query, coluna, coluna_id, args, converter=None, nulos=False):
+    """Retorna uma página ordenada por ``(coluna, id)`` e o cursor da seguinte.
+
+    ``converter`` transforma o valor guardado no cursor de volta no tipo da
+    coluna (ex.: data ISO). Com ``nulos=True`` os registros com ``coluna``
+    nula vêm ao final, ordenados por id: eles são lidos em uma consulta
+    separada, para que a parte não nula use só ``(coluna, id) > (:v, :id)``
+    sobre o índice composto.
+    """
+    limite = ler_limite(args)
+    cursor = args.get('cursor')
+    valor, ultimo_id = _ler_cursor(cursor, converter) if cursor else (None, None)
+
+    itens = []
+    if not (nulos and cursor and valor is None):
+        pagina = query.filter(coluna.isnot(None)) if nulos else query
+        if cursor:
+            pagina = pagina.filter(tuple_(coluna, coluna_id) > tuple_(valor, ultimo_id))
+        itens = pagina.order_by(coluna, coluna_id).limit(limite + 1).all()
+
+    if nulos and len(itens) <= limite:
+        # Cauda sem valor: continua do último id quando o cursor já está nela
+        cauda = query.filter(coluna.is_(None))
+        if cursor and valor is None:
+            cauda = cauda.filter(coluna_id > ultimo_id)
+        itens += cauda.order_by(coluna_id).limit(limite + 1 - len(itens)).all()
+
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor((getattr(ultimo, coluna.key), getattr(ultimo, coluna_id.key)))
+    return itens, proximo_cursor, limite
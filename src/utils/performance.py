@@ -4,14 +4,37 @@ from functools import wraps
 import time
 import logging
 import re
+import json
+import random
+import threading
 
-from flask import request, jsonify, current_app
-from sqlalchemy import text
+from flask import request, jsonify, current_app, g, has_request_context
+from sqlalchemy import text, event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 from src.models.db import db
 from src.utils.cache import cache, cached
+from src.utils.metrics import http_request_duration, http_request_db_duration
 
 logger = logging.getLogger(__name__)
 
+# Índices de performance (nome, tabela, colunas); criados por `flask ensure-indexes`
+# ou pela migração correspondente, nunca na inicialização da aplicação
+INDICES_PERFORMANCE = (
+    ('idx_endividamento_data_vencimento', 'endividamento', ('data_vencimento_final',)),
+    ('idx_endividamento_banco', 'endividamento', ('banco',)),
+    ('idx_endividamento_created_at', 'endividamento', ('created_at',)),
+    ('idx_parcela_data_vencimento', 'parcela', ('data_vencimento',)),
+    ('idx_parcela_pago', 'parcela', ('pago',)),
+    ('idx_parcela_endividamento_id', 'parcela', ('endividamento_id',)),
+    ('idx_pessoa_nome', 'pessoa', ('nome',)),
+    ('idx_pessoa_cpf_cnpj', 'pessoa', ('cpf_cnpj',)),
+    ('idx_documento_data_vencimento', 'documento', ('data_vencimento',)),
+    ('idx_documento_tipo', 'documento', ('tipo',)),
+    ('idx_notificacao_endividamento_ativo', 'notificacao_endividamento', ('ativo',)),
+    ('idx_historico_notificacao_data', 'historico_notificacao', ('data_envio',)),
+)
+
 class PerformanceOptimizer:
     """Classe para otimizações de performance"""
 
@@ -57,60 +80,175 @@ class PerformanceOptimizer:
 
     @staticmethod
     def create_indexes():
-        """Cria índices para melhorar performance das consultas"""
+        """
+        Cria os índices de ``INDICES_PERFORMANCE`` que ainda não existem.
+
+        Os índices existentes são lidos com ``inspect()``; um índice com as
+        mesmas colunas (por exemplo, criado por ``index=True`` no modelo)
+        conta como existente. Retorna os nomes dos índices criados.
+        """
+        criados = []
         try:
-            indexes = [
-                # Índices para tabela de endividamentos
-                "CREATE INDEX idx_endividamento_data_vencimento ON endividamento(data_vencimento_final)",
-                "CREATE INDEX idx_endividamento_banco ON endividamento(banco)",
-                "CREATE INDEX idx_endividamento_created_at ON endividamento(created_at)",
-                # Índices para tabela de parcelas
-                "CREATE INDEX idx_parcela_data_vencimento ON parcela(data_vencimento)",
-                "CREATE INDEX idx_parcela_pago ON parcela(pago)",
-                "CREATE INDEX idx_parcela_endividamento_id ON parcela(endividamento_id)",
-                # Índices para tabela de pessoas
-                "CREATE INDEX idx_pessoa_nome ON pessoa(nome)",
-                "CREATE INDEX idx_pessoa_cpf_cnpj ON pessoa(cpf_cnpj)",
-                # Índices para tabela de documentos
-                "CREATE INDEX idx_documento_data_vencimento ON documento(data_vencimento)",
-                "CREATE INDEX idx_documento_tipo ON documento(tipo)",
-                # Índices para notificações
-                "CREATE INDEX idx_notificacao_endividamento_ativo ON notificacao_endividamento(ativo)",
-                "CREATE INDEX idx_historico_notificacao_data ON historico_notificacao(data_envio)",
-            ]
-            for index_query in indexes:
-                try:
-                    db.session.execute(text(index_query))
-                    logger.info(f"Índice criado: {index_query}")
-                except Exception as e:
-                    if "Duplicate key name" in str(e):
-                        logger.info(f"Índice já existe: {index_query}")
-                    else:
-                        logger.warning(f"Índice não criado: {index_query} - {e}")
+            inspetor = inspect(db.engine)
+            tabelas = set(inspetor.get_table_names())
+            for nome, tabela, colunas in INDICES_PERFORMANCE:
+                if tabela not in tabelas:
+                    logger.info(f"Índice {nome} ignorado: tabela {tabela} não existe")
+                    continue
+                existentes = inspetor.get_indexes(tabela)
+                if any(indice['name'] == nome or tuple(indice['column_names']) == colunas for indice in existentes):
+                    continue
+                db.session.execute(text(f"CREATE INDEX {nome} ON {tabela}({', '.join(colunas)})"))
+                criados.append(nome)
+                logger.info(f"Índice criado: {nome} em {tabela}({', '.join(colunas)})")
             db.session.commit()
-            logger.info("Índices de performance criados com sucesso")
         except Exception as e:
             logger.error(f"Erro ao criar índices: {e}")
             db.session.rollback()
+            raise
+        return criados
+
+# Janela deslizante aproximada: contador da janela atual + fração da anterior.
+# Leitura, decisão e incremento acontecem atomicamente no Redis.
+_SCRIPT_RATE_LIMIT = """
+local anterior = tonumber(redis.call('get', KEYS[2]) or '0')
+local atual = tonumber(redis.call('get', KEYS[1]) or '0')
+local estimado = anterior * tonumber(ARGV[3]) + atual
+if estimado >= tonumber(ARGV[1]) then
+    return {0, math.floor(estimado)}
+end
+atual = redis.call('incr', KEYS[1])
+if atual == 1 then
+    redis.call('expire', KEYS[1], tonumber(ARGV[2]) * 2)
+end
+return {1, math.floor(estimado + 1)}
+"""
+
+class SlidingWindowRateLimiter:
+    """Rate limiter de janela deslizante (Redis + Lua, com fallback em memória)
+
+    No fallback em memória cada identificador guarda o instante em que suas
+    janelas deixam de contar; a cada ``intervalo_limpeza`` segundos os
+    identificadores expirados são removidos (IPs que não voltam não acumulam).
+    """
+
+    def __init__(self, intervalo_limpeza=60):
+        self._script = None
+        self._script_client = None
+        self._contadores = {}
+        self._lock = threading.Lock()
+        self.intervalo_limpeza = intervalo_limpeza
+        self._proxima_limpeza = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._contadores.clear()
+
+    def _janela(self, window, agora):
+        indice = int(agora // window)
+        peso_anterior = 1 - (agora % window) / window
+        return indice, peso_anterior
+
+    def hit(self, identificador, max_requests, window):
+        """Registra uma requisição; retorna (permitida, contagem estimada na janela)"""
+        agora = time.time()
+        indice, peso_anterior = self._janela(window, agora)
+        redis_client = cache.redis_client
+        if redis_client is not None:
+            try:
+                if self._script is None or self._script_client is not redis_client:
+                    self._script = redis_client.register_script(_SCRIPT_RATE_LIMIT)
+                    self._script_client = redis_client
+                permitido, contagem = self._script(
+                    keys=[f"rate_limit:{identificador}:{indice}", f"rate_limit:{identificador}:{indice - 1}"],
+                    args=[max_requests, window, peso_anterior]
+                )
+                return bool(permitido), int(contagem)
+            except Exception as e:
+                logger.warning(f"Rate limit via Redis indisponível, usando contagem local: {e}")
+        return self._hit_local(identificador, max_requests, window, agora)
+
+    def _hit_local(self, identificador, max_requests, window, agora):
+        indice, peso_anterior = self._janela(window, agora)
+        with self._lock:
+            if agora >= self._proxima_limpeza:
+                self._limpar_expirados(agora)
+            _, janelas = self._contadores.get(identificador, (None, {}))
+            for antigo in [i for i in janelas if i < indice - 1]:
+                del janelas[antigo]
+            estimado = janelas.get(indice - 1, 0) * peso_anterior + janelas.get(indice, 0)
+            if estimado >= max_requests:
+                return False, int(estimado)
+            janelas[indice] = janelas.get(indice, 0) + 1
+            # a janela atual ainda pesa durante toda a seguinte
+            self._contadores[identificador] = ((indice + 2) * window, janelas)
+            return True, int(estimado + 1)
+
+    def _limpar_expirados(self, agora):
+        expirados = [chave for chave, (expira_em, _) in self._contadores.items() if expira_em <= agora]
+        for chave in expirados:
+            del self._contadores[chave]
+        self._proxima_limpeza = agora + self.intervalo_limpeza
+
+rate_limiter = SlidingWindowRateLimiter()
+
+def _client_ip():
+    # Atrás de proxy o remote_addr já vem corrigido pelo ProxyFix (PROXY_FIX_X_FOR
+    # saltos confiáveis); X-Forwarded-For enviado pelo cliente é ignorado
+    return request.remote_addr or 'desconhecido'
+
+def _verificar_rate_limit(escopo, max_requests, window):
+    """Aplica o limite ao escopo; retorna a resposta 429 ou None"""
+    if not current_app.config.get('RATELIMIT_ENABLED', True):
+        return None
+    override = current_app.config.get('RATELIMIT_OVERRIDES', {}).get(escopo)
+    if override:
+        max_requests, window = override
+    permitido, contagem = rate_limiter.hit(f"{_client_ip()}:{escopo}", max_requests, window)
+    if permitido:
+        return None
+    logger.warning(f"Rate limit excedido: {_client_ip()} em {escopo} ({contagem}/{max_requests})")
+    response = jsonify({
+        'error': 'Rate limit exceeded',
+        'message': f'Máximo de {max_requests} requisições a cada {window} segundos'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(window)
+    response.headers['X-RateLimit-Limit'] = str(max_requests)
+    return response
 
 def rate_limit(max_requests=100, window=3600):
-    """Decorator para rate limiting"""
+    """Decorator para rate limiting por IP e endpoint (janela deslizante)"""
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-            cache_key = f"rate_limit:{client_ip}:{f.__name__}"
-            current_requests = cache.get(cache_key) or 0
-            if current_requests >= max_requests:
-                return jsonify({
-                    'error': 'Rate limit exceeded',
-                    'message': f'Máximo de {max_requests} requisições por hora'
-                }), 429
-            cache.set(cache_key, current_requests + 1, window)
+            resposta = _verificar_rate_limit(request.endpoint or f.__name__, max_requests, window)
+            if resposta is not None:
+                return resposta
             return f(*args, **kwargs)
         return wrapper
     return decorator
 
+# Limites padrão por blueprint (requisições, janela em segundos), contados por endpoint
+RATELIMIT_BLUEPRINTS_PADRAO = {
+    'pessoa': (300, 60),
+    'fazenda': (300, 60),
+    'documento': (300, 60),
+}
+
+def init_rate_limits(app):
+    """Aplica rate limiting a todos os endpoints dos blueprints da API"""
+    limites = dict(RATELIMIT_BLUEPRINTS_PADRAO)
+    limites.update(app.config.get('RATELIMIT_BLUEPRINTS', {}))
+    rate_limiter.reset()
+
+    @app.before_request
+    def aplicar_rate_limit_api():
+        limite = limites.get(request.blueprint)
+        if limite is None or request.endpoint is None:
+            return None
+        return _verificar_rate_limit(request.endpoint, *limite)
+
 def measure_performance(f):
     """Decorator para medir performance de funções"""
     @wraps(f)
@@ -124,72 +262,65 @@ def measure_performance(f):
         return result
     return wrapper
 
-@cached(timeout=1800, key_prefix='dashboard')
+@cached(timeout=1800, key_prefix='dashboard', lock=True, stale_ttl=300)
 def get_dashboard_stats():
     """Obtém estatísticas do dashboard com cache"""
     try:
-        from src.models.pessoa import Pessoa
-        from src.models.fazenda import Fazenda
-        from src.models.documento import Documento
-        from src.models.endividamento import Endividamento
-        from datetime import date, timedelta
-        hoje = date.today()
+        from src.utils.dashboard import obter_resumo
+        resumo = obter_resumo()
         stats = {
-            'total_pessoas': Pessoa.query.count(),
-            'total_fazendas': Fazenda.query.count(),
-            'total_documentos': Documento.query.count(),
-            'total_endividamentos': Endividamento.query.count(),
-            'documentos_vencidos': Documento.query.filter(Documento.data_vencimento < hoje).count(),
-            'endividamentos_proximos': Endividamento.query.filter(
-                Endividamento.data_vencimento_final.between(hoje, hoje + timedelta(days=30))
-            ).count()
+            'total_pessoas': resumo['total_pessoas'],
+            'total_fazendas': resumo['total_fazendas'],
+            'total_documentos': resumo['total_documentos'],
+            'total_endividamentos': resumo['total_endividamentos'],
+            'documentos_vencidos': resumo['documentos_vencidos'],
+            'endividamentos_proximos': resumo['endividamentos_proximos'],
+            'parcelas_proximas': resumo['parcelas_proximas']
         }
         return stats
     except Exception as e:
         logger.error(f"Erro ao obter estatísticas do dashboard: {e}")
         return {}
 
-@cached(timeout=3600, key_prefix='pessoas')
-def get_pessoas_for_select():
-    """Obtém lista de pessoas para selects com cache"""
-    try:
-        from src.models.pessoa import Pessoa
-        pessoas = Pessoa.query.with_entities(
-            Pessoa.id, 
-            Pessoa.nome, 
-            Pessoa.cpf_cnpj
-        ).order_by(Pessoa.nome).all()
-        return [{'id': p.id, 'nome': p.nome, 'cpf_cnpj': p.cpf_cnpj} for p in pessoas]
-    except Exception as e:
-        logger.error(f"Erro ao obter pessoas para select: {e}")
-        return []
-
-@cached(timeout=3600, key_prefix='fazendas')
-def get_fazendas_for_select():
-    """Obtém lista de fazendas para selects com cache"""
-    try:
-        from src.models.fazenda import Fazenda
-        fazendas = Fazenda.query.with_entities(
-            Fazenda.id, 
-            Fazenda.nome, 
-            Fazenda.tamanho_total
-        ).order_by(Fazenda.nome).all()
-        return [{'id': f.id, 'nome': f.nome, 'tamanho_total': float(f.tamanho_total)} for f in fazendas]
-    except Exception as e:
-        logger.error(f"Erro ao obter fazendas para select: {e}")
-        return []
-
 def clear_related_cache(entity_type):
     """Limpa cache relacionado a uma entidade"""
-    patterns = {
-        'pessoa': ['pessoas:*', 'dashboard:*'],
-        'fazenda': ['fazendas:*', 'dashboard:*'],
-        'documento': ['dashboard:*'],
-        'endividamento': ['dashboard:*']
+    tags = {
+        'pessoa': ['pessoas', 'dashboard', 'endividamentos'],
+        'fazenda': ['fazendas', 'dashboard'],
+        'documento': ['dashboard'],
+        'endividamento': ['dashboard', 'endividamentos']
     }
-    if entity_type in patterns:
-        for pattern in patterns[entity_type]:
-            cache.clear_pattern(pattern)
+    if entity_type in tags:
+        cache.invalidate_tags(*tags[entity_type])
+
+# Gatilho de escrita da invalidação por tags: todo commit pelo ORM que grave uma
+# destas tabelas chama clear_related_cache da entidade, sem depender das rotas.
+# Entidade de cada tabela para a invalidação automática do cache
+ENTIDADES_CACHE = {
+    'pessoa': 'pessoa',
+    'fazenda': 'fazenda',
+    'documento': 'documento',
+    'endividamento': 'endividamento',
+    'parcela': 'endividamento',
+}
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_entidades_alteradas(session, flush_context):
+    alteradas = session.info.setdefault('entidades_alteradas', set())
+    for objeto in list(session.new) + list(session.dirty) + list(session.deleted):
+        entidade = ENTIDADES_CACHE.get(getattr(objeto, '__tablename__', None))
+        if entidade:
+            alteradas.add(entidade)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_cache_apos_commit(session):
+    """Invalida as tags das entidades gravadas, só depois que a transação é confirmada"""
+    for entidade in session.info.pop('entidades_alteradas', ()):
+        clear_related_cache(entidade)
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_entidades_alteradas(session):
+    session.info.pop('entidades_alteradas', None)
 
 class DatabaseOptimizer:
     """Otimizador de consultas ao banco de dados"""
@@ -259,29 +390,135 @@ def compress_response(f):
     return wrapper
 
 def init_performance_optimizations(app):
-    """Inicializa todas as otimizações de performance"""
+    """Inicializa o cache e registra os comandos de ajuste do banco (sem acessar o banco)"""
     try:
         from src.utils.cache import cache
         cache.init_app(app)
-        with app.app_context():
-            optimizer = PerformanceOptimizer()
-            optimizer.create_indexes()
-            optimizer.optimize_database_queries()
+        init_db_commands(app)
         app.logger.info("Otimizações de performance inicializadas com sucesso")
     except Exception as e:
         app.logger.error(f"Erro ao inicializar otimizações: {e}")
 
+def init_db_commands(app):
+    """Comandos `flask ensure-indexes` e `flask db-tune`"""
+    import click
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Cria apenas os índices de performance que ainda não existem"""
+        criados = PerformanceOptimizer.create_indexes()
+        click.echo(f"Índices criados: {', '.join(criados)}" if criados else "Todos os índices já existem")
+
+    @app.cli.command('db-tune')
+    def db_tune_command():
+        """Cria os índices que faltam e aplica as otimizações do backend em uso"""
+        criados = PerformanceOptimizer.create_indexes()
+        PerformanceOptimizer.optimize_database_queries()
+        click.echo(f"Ajuste concluído; {len(criados)} índice(s) criado(s)")
+
+# Padrões para normalizar SQL e agrupar comandos de mesmo formato (suspeitas de N+1)
+_RE_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_SQL_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_SQL_LISTA = re.compile(r"\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)")
+_RE_SQL_ESPACOS = re.compile(r"\s+")
+
+def normalizar_sql(statement):
+    """Reduz um comando SQL ao seu formato (sem literais e com listas IN colapsadas)"""
+    sql = _RE_SQL_STRING.sub('?', statement)
+    sql = _RE_SQL_NUMERO.sub('?', sql)
+    sql = _RE_SQL_LISTA.sub('(?)', sql)
+    return _RE_SQL_ESPACOS.sub(' ', sql).strip()
+
+class PerfilSQL:
+    """Consultas executadas durante uma requisição"""
+
+    def __init__(self):
+        self.consultas = []
+        self.tempo_total = 0.0
+
+    def registrar(self, statement, duracao):
+        self.consultas.append((statement, duracao))
+        self.tempo_total += duracao
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    def mais_lentas(self, n=5):
+        lentas = sorted(self.consultas, key=lambda c: c[1], reverse=True)[:n]
+        return [{'sql': normalizar_sql(sql)[:500], 'ms': round(d * 1000, 2)} for sql, d in lentas]
+
+    def suspeitas_n_mais_1(self, limiar=5):
+        """Formatos de comando repetidos ``limiar`` vezes ou mais na mesma requisição"""
+        contagem = {}
+        for sql, duracao in self.consultas:
+            formato = normalizar_sql(sql)
+            total, tempo = contagem.get(formato, (0, 0.0))
+            contagem[formato] = (total + 1, tempo + duracao)
+        return [
+            {'sql': formato[:500], 'vezes': total, 'ms': round(tempo * 1000, 2)}
+            for formato, (total, tempo) in sorted(contagem.items(), key=lambda i: -i[1][0])
+            if total >= limiar
+        ]
+
+def _antes_do_cursor(conn, cursor, statement, parameters, context, executemany):
+    # O início fica no contexto de execução da própria instrução: se ela falhar,
+    # o after_cursor_execute não dispara e o valor é descartado com o contexto
+    # (uma pilha em conn.info cresceria a cada erro e deslocaria as medições)
+    if context is not None:
+        context._inicio_consulta = time.perf_counter()
+
+def _depois_do_cursor(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_consulta', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    if not has_request_context():
+        return
+    g.tempo_db = g.get('tempo_db', 0.0) + duracao
+    perfil = g.get('perfil_sql')
+    if perfil is not None:
+        perfil.registrar(statement, duracao)
+
+_eventos_sql_registrados = False
+
+def _registrar_eventos_sql():
+    """Escuta a execução de cursores de todos os engines (uma única vez por processo)"""
+    global _eventos_sql_registrados
+    if _eventos_sql_registrados:
+        return
+    event.listen(Engine, 'before_cursor_execute', _antes_do_cursor)
+    event.listen(Engine, 'after_cursor_execute', _depois_do_cursor)
+    _eventos_sql_registrados = True
+
 class PerformanceMiddleware:
+    """Mede a duração das requisições e, por amostragem, perfila as consultas SQL.
+
+    Toda requisição alimenta os histogramas de latência e de tempo de banco
+    publicados em ``/metrics``.
+
+    Requisições amostradas (``SQL_PROFILER_SAMPLE_RATE``) recebem o cabeçalho
+    ``Server-Timing`` e geram uma linha de log JSON com número de consultas,
+    tempo de banco, as mais lentas e possíveis N+1.
+    """
+
     def __init__(self, app):
         self.app = app
         self.init_app(app)
 
     def init_app(self, app):
+        app.config.setdefault('SQL_PROFILER_SAMPLE_RATE', 0.0)
+        app.config.setdefault('SQL_PROFILER_TOP_N', 5)
+        app.config.setdefault('SQL_PROFILER_NPLUS1_THRESHOLD', 5)
+        _registrar_eventos_sql()
         app.before_request(self.before_request)
         app.after_request(self.after_request)
 
     def before_request(self):
         request.start_time = time.time()
+        taxa = current_app.config.get('SQL_PROFILER_SAMPLE_RATE', 0.0)
+        if taxa > 0 and random.random() < taxa:
+            g.perfil_sql = PerfilSQL()
 
     def after_request(self, response):
         if hasattr(request, 'start_time'):
@@ -290,5 +527,43 @@ class PerformanceMiddleware:
                 current_app.logger.warning(
                     f"Requisição lenta: {request.method} {request.path} - {duration:.2f}s"
                 )
+            self._registrar_metricas(response, duration)
+            perfil = g.pop('perfil_sql', None)
+            if perfil is not None:
+                self._publicar_perfil(response, perfil, duration)
         return response
-    
\ No newline at end of file
+
+    def _registrar_metricas(self, response, duration):
+        # endpoint em vez do path, para não explodir a cardinalidade com ids
+        endpoint = request.endpoint or 'nao_encontrado'
+        blueprint = request.blueprint or ''
+        http_request_duration.observe(
+            duration, method=request.method, blueprint=blueprint,
+            endpoint=endpoint, status=response.status_code
+        )
+        http_request_db_duration.observe(g.get('tempo_db', 0.0), blueprint=blueprint, endpoint=endpoint)
+
+    def _publicar_perfil(self, response, perfil, duration):
+        config = current_app.config
+        suspeitas = perfil.suspeitas_n_mais_1(config['SQL_PROFILER_NPLUS1_THRESHOLD'])
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={perfil.tempo_total * 1000:.2f};desc="{perfil.total} queries", '
+            f'app;dur={duration * 1000:.2f}'
+        )
+        registro = {
+            'evento': 'perfil_sql',
+            'metodo': request.method,
+            'rota': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duracao_ms': round(duration * 1000, 2),
+            'consultas': perfil.total,
+            'db_ms': round(perfil.tempo_total * 1000, 2),
+            'mais_lentas': perfil.mais_lentas(config['SQL_PROFILER_TOP_N']),
+            'suspeitas_n_mais_1': suspeitas,
+        }
+        if suspeitas:
+            current_app.logger.warning(json.dumps(registro, ensure_ascii=False))
+        else:
+            current_app.logger.info(json.dumps(registro, ensure_ascii=False))
@@ -0,0 +1,183 @@
+# Pool de conexões SMTP autenticadas e envio concorrente de e-mails
+import logging
+import random
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Falhas transitórias: a mensagem é reenviada com backoff
+ERROS_TRANSITORIOS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+def _erro_transitorio(erro):
+    if isinstance(erro, ERROS_TRANSITORIOS):
+        return True
+    # respostas 4xx do servidor (ex.: 421 muitas conexões, 451 erro local)
+    codigo = getattr(erro, 'smtp_code', None)
+    return codigo is not None and 400 <= codigo < 500
+
+
+class SMTPConnectionPool:
+    """Conexões SMTP reutilizáveis para um servidor.
+
+    Cada conexão faz STARTTLS e login uma única vez e envia até
+    ``mensagens_por_conexao`` mensagens; ``max_conexoes`` limita as sessões
+    simultâneas com o servidor (limite de concorrência por host).
+    """
+
+    def __init__(self, host, port, usuario=None, senha=None, use_tls=True, max_conexoes=4,
+                 mensagens_por_conexao=50, timeout=30, ocioso_max=60):
+        self.host = host
+        self.port = port
+        self.usuario = usuario
+        self.senha = senha
+        self.use_tls = use_tls
+        self.mensagens_por_conexao = mensagens_por_conexao
+        self.timeout = timeout
+        self.ocioso_max = ocioso_max
+        self.max_conexoes = max_conexoes
+        self._limite = threading.BoundedSemaphore(max_conexoes)
+        self._fechado = False
+        self._ociosas = []  # (conexao, mensagens_enviadas, ultimo_uso)
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        conexao = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            conexao.starttls(context=ssl.create_default_context())
+        if self.usuario and self.senha:
+            conexao.login(self.usuario, self.senha)
+        return conexao
+
+    @staticmethod
+    def _fechar(conexao):
+        try:
+            conexao.quit()
+        except Exception:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+
+    def _obter_ociosa(self):
+        while True:
+            with self._lock:
+                if not self._ociosas:
+                    return None, 0
+                conexao, enviadas, ultimo_uso = self._ociosas.pop()
+            if time.monotonic() - ultimo_uso > self.ocioso_max:
+                # o servidor provavelmente já encerrou a sessão
+                self._fechar(conexao)
+                continue
+            return conexao, enviadas
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão autenticada; em caso de erro ela é descartada"""
+        with self._limite:
+            conexao, enviadas = self._obter_ociosa()
+            if conexao is None:
+                conexao = self._conectar()
+            try:
+                yield conexao
+            except BaseException:
+                self._fechar(conexao)
+                raise
+            enviadas += 1
+            if enviadas >= self.mensagens_por_conexao or self._fechado:
+                self._fechar(conexao)
+            else:
+                with self._lock:
+                    self._ociosas.append((conexao, enviadas, time.monotonic()))
+
+    def sendmail(self, remetente, destinatarios, mensagem, tentativas=3, backoff=0.5):
+        """Envia uma mensagem, repetindo falhas transitórias com backoff exponencial"""
+        for tentativa in range(tentativas):
+            try:
+                with self.conexao() as conexao:
+                    return conexao.sendmail(remetente, destinatarios, mensagem)
+            except Exception as e:
+                if tentativa == tentativas - 1 or not _erro_transitorio(e):
+                    raise
+                espera = backoff * (2 ** tentativa) * (1 + random.random() / 2)
+                logger.warning(f'Falha transitória no SMTP {self.host} ({e}); nova tentativa em {espera:.1f}s')
+                time.sleep(espera)
+
+    def close(self):
+        """Encerra as sessões ociosas; as emprestadas são encerradas ao voltar"""
+        with self._lock:
+            self._fechado = True
+            ociosas, self._ociosas = self._ociosas, []
+        for conexao, _, _ in ociosas:
+            self._fechar(conexao)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def obter_pool(host, port, usuario, senha, use_tls, max_conexoes=4, mensagens_por_conexao=50, timeout=30):
+    """Pool compartilhado pelo processo para o servidor/conta informados
+
+    Uma mudança de senha ou de tamanho na configuração cria um pool novo e
+    encerra as sessões do anterior.
+    """
+    chave = (host, port, usuario, use_tls)
+    configuracao = (senha, max_conexoes, mensagens_por_conexao, timeout)
+    with _pools_lock:
+        pool = _pools.get(chave)
+        if pool is not None and (pool.senha, pool.max_conexoes, pool.mensagens_por_conexao, pool.timeout) == configuracao:
+            return pool
+        substituido = pool
+        pool = _pools[chave] = SMTPConnectionPool(
+            host, port, usuario, senha, use_tls,
+            max_conexoes=max_conexoes, mensagens_por_conexao=mensagens_por_conexao, timeout=timeout
+        )
+    if substituido is not None:
+        substituido.close()
+    return pool
+
+
+def obter_executor(max_workers=4):
+    """Executor limitado usado para despachar lotes de e-mails
+
+    Recriado quando ``max_workers`` muda; o anterior só é encerrado depois que
+    o novo está publicado, e as tarefas já enviadas a ele terminam normalmente.
+    """
+    global _executor
+    with _executor_lock:
+        executor = _executor
+        if executor is not None and executor._max_workers == max_workers:
+            return executor
+        substituido = executor
+        executor = _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='smtp')
+    if substituido is not None:
+        substituido.shutdown(wait=False)
+    return executor
+
+
+def submeter(funcao, *args, max_workers=4):
+    """``submit`` no executor compartilhado
+
+    Outra thread pode ter trocado (e encerrado) o executor entre obtê-lo e
+    submeter: nesse caso a tarefa vai para o executor atual.
+    """
+    try:
+        return obter_executor(max_workers).submit(funcao, *args)
+    except RuntimeError:
+        return obter_executor(max_workers).submit(funcao, *args)
+
+
+def fechar_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
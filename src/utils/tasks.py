@@ -68,3 +68,17 @@ def process_document_upload(document_id, file_path):
         current_app.logger.error(f'Erro ao processar documento {document_id}: {e}')
         return False
 
+def drenar_outbox_emails(tamanho_lote=100):
+    """Envia os e-mails pendentes da outbox em segundo plano"""
+    from src.utils.outbox import processar_outbox
+    return processar_outbox(tamanho_lote=tamanho_lote)
+
+def registrar_tarefas_outbox(celery, intervalo=30):
+    """Registra a drenagem da outbox como tarefa periódica do Celery beat (ver src/celery_worker.py)"""
+    tarefa = celery.task(name='outbox.drenar_emails')(drenar_outbox_emails)
+    celery.conf.beat_schedule = dict(celery.conf.beat_schedule or {})
+    celery.conf.beat_schedule['drenar-outbox-emails'] = {
+        'task': 'outbox.drenar_emails',
+        'schedule': intervalo
+    }
+    return tarefa
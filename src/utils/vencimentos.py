@@ -0,0 +1,49 @@
+# Classificação de vencimento de documentos feita no banco de dados
+import datetime
+from src.models.documento import Documento
+from src.utils.carregamento import consulta
+
+
+def consulta_vencidos(hoje=None):
+    """Query dos documentos já vencidos, do vencimento mais antigo para o mais recente"""
+    hoje = hoje or datetime.date.today()
+    return consulta(Documento, 'lista').filter(
+        Documento.data_vencimento < hoje
+    ).order_by(Documento.data_vencimento, Documento.id)
+
+
+def consulta_a_notificar(hoje=None):
+    """Query dos documentos com notificação devida, pelo índice de ``proxima_notificacao``.
+
+    Notificações não enviadas em dias anteriores continuam devidas até o
+    vencimento; depois do envio, ``avancar_notificacao`` as tira da lista.
+    """
+    hoje = hoje or datetime.date.today()
+    # nome da entidade, prazos e e-mails sem um SELECT por documento (envio e serializadores)
+    return consulta(Documento, 'lista').filter(
+        Documento.proxima_notificacao <= hoje,
+        Documento.data_vencimento >= hoje
+    ).order_by(Documento.data_vencimento, Documento.id)
+
+
+def documentos_por_prazo(hoje=None):
+    """Documentos a notificar agrupados pelos dias que faltam até o vencimento, em ordem crescente
+
+    A chave é a distância real (``vencimento - hoje``), não a de
+    ``proxima_notificacao``, que fica para trás quando um envio atrasa.
+    """
+    hoje = hoje or datetime.date.today()
+    agrupados = {}
+    for documento in consulta_a_notificar(hoje):
+        dias_restantes = (documento.data_vencimento - hoje).days
+        agrupados.setdefault(dias_restantes, []).append(documento)
+    return dict(sorted(agrupados.items()))
+
+
+def classificar_documentos(hoje=None):
+    """
+    Retorna:
+        tuple: (documentos_vencidos, documentos_a_notificar)
+    """
+    hoje = hoje or datetime.date.today()
+    return consulta_vencidos(hoje).all(), consulta_a_notificar(hoje).all()
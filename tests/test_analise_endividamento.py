@@ -0,0 +1,103 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.endividamento import Endividamento, Parcela
+
+np = pytest.importorskip("numpy")
+from src.utils.analise_endividamento import Carteira, calcular_resumo
+
+HOJE = date(2026, 1, 15)
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def inicio_do_mes(meses):
+    """Primeiro dia do mês daqui a ``meses`` meses"""
+    hoje = date.today()
+    total = hoje.year * 12 + hoje.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+def endividamento(banco, taxa, tipo, pessoas, parcelas):
+    registro = Endividamento(banco=banco, numero_proposta=f"P-{banco}-{taxa}", data_emissao=date(2025, 1, 1),
+                             data_vencimento_final=date(2027, 1, 1), taxa_juros=Decimal(taxa), tipo_taxa_juros=tipo)
+    registro.pessoas.extend(pessoas)
+    for vencimento, valor, pago in parcelas:
+        registro.parcelas.append(Parcela(data_vencimento=vencimento, valor=Decimal(valor), pago=pago))
+    db.session.add(registro)
+    return registro
+
+def test_resumo_por_banco_pessoa_e_mes(app):
+    ana = Pessoa(nome="Ana", cpf_cnpj="1")
+    bruno = Pessoa(nome="Bruno", cpf_cnpj="2")
+    endividamento("Banco A", "12", "ano", [ana], [
+        (date.today() - timedelta(days=5), "100", False),   # vencida
+        (inicio_do_mes(1), "200", False),
+        (inicio_do_mes(1) + timedelta(days=3), "50", True),   # paga: fora do saldo
+    ])
+    endividamento("Banco B", "1", "mes", [ana, bruno], [(inicio_do_mes(2), "300", False)])
+    db.session.commit()
+
+    client = app.test_client()
+    dados = client.get("/endividamentos/api/analise?taxa_desconto=0&detalhar=1").get_json()
+    assert dados["total"]["saldo_devedor"] == 600
+    assert dados["total"]["vencido"] == 100
+    assert dados["total"]["vpl"] == 600            # sem desconto
+    assert dados["total"]["parcelas_em_aberto"] == 3
+    assert [(b["banco"], b["saldo_devedor"]) for b in dados["por_banco"]] == [("Banco A", 300), ("Banco B", 300)]
+    # 1% a.m. equivale a 12,68% a.a.
+    assert dados["por_banco"][1]["taxa_media_ponderada"] == pytest.approx(12.68, abs=0.01)
+    assert dados["total"]["taxa_media_ponderada"] == pytest.approx((12 * 300 + 12.6825 * 300) / 600, abs=0.01)
+    # obrigação solidária: o valor integral conta para cada pessoa
+    assert {p["nome"]: p["saldo_devedor"] for p in dados["por_pessoa"]} == {"Ana": 600, "Bruno": 300}
+    assert dados["fluxo_mensal"] == [
+        {"mes": inicio_do_mes(1).strftime("%Y-%m"), "valor": 200.0},
+        {"mes": inicio_do_mes(2).strftime("%Y-%m"), "valor": 300.0},
+    ]
+    assert len(dados["por_endividamento"]) == 2
+
+def test_vpl_desconta_pelo_prazo(app):
+    endividamento("Banco A", "10", "ano", [], [(date.today() + timedelta(days=365), "110", False)])
+    db.session.commit()
+    dados = app.test_client().get("/endividamentos/api/analise?taxa_desconto=0.1").get_json()
+    assert dados["total"]["vpl"] == pytest.approx(100, abs=0.01)
+
+def test_cache_invalidado_quando_parcela_e_paga(app):
+    registro = endividamento("Banco A", "10", "ano", [], [(date.today() + timedelta(days=30), "100", False)])
+    db.session.commit()
+    client = app.test_client()
+    assert client.get("/endividamentos/api/analise").get_json()["total"]["saldo_devedor"] == 100
+    registro.parcelas[0].pago = True
+    db.session.commit()
+    assert client.get("/endividamentos/api/analise").get_json()["total"]["saldo_devedor"] == 0
+
+def test_taxa_invalida(app):
+    assert app.test_client().get("/endividamentos/api/analise?taxa_desconto=abc").status_code == 400
+
+def test_cem_mil_parcelas_em_menos_de_um_segundo():
+    gerador = np.random.default_rng(1)
+    endividamentos = [(i, f"Banco {i % 12}", Decimal("1.2") if i % 3 else Decimal("14"), "mes" if i % 3 else "ano")
+                      for i in range(1, 2001)]
+    base = HOJE.toordinal()
+    parcelas = [(int(e), date.fromordinal(base + int(d)), Decimal("1500.00"))
+                for e, d in zip(gerador.integers(1, 2001, 100_000), gerador.integers(-90, 3650, 100_000))]
+    vinculos = [(i, 1 + i % 500, f"Pessoa {1 + i % 500}") for i in range(1, 2001)]
+
+    inicio = time.perf_counter()
+    resumo = calcular_resumo(Carteira(endividamentos, parcelas, vinculos), HOJE, 0.1, detalhar=True)
+    assert time.perf_counter() - inicio < 1.0
+    assert resumo["total"]["parcelas_em_aberto"] == 100_000
+    assert resumo["total"]["saldo_devedor"] == pytest.approx(150_000_000)
@@ -0,0 +1,259 @@
+import time
+import json
+import pytest
+from flask import Flask
+from src.utils.cache import LocalCache, CacheManager
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        # Porta sem Redis: força o modo apenas local
+        "REDIS_URL": "redis://localhost:1/0",
+        "CACHE_LOCAL_PREFIXOS": {"dashboard": {"max_size": 2, "ttl": 60}}
+    })
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def cache_manager(app):
+    return CacheManager(app)
+
+def test_local_cache_lru_descarta_mais_antigo():
+    local = LocalCache(max_size=2, ttl=60)
+    local.set("a", 1)
+    local.set("b", 2)
+    assert local.get("a") == 1  # "a" passa a ser o mais recente
+    local.set("c", 3)
+    assert local.get("b") is None
+    assert local.get("a") == 1
+    assert local.get("c") == 3
+
+def test_local_cache_expira_por_ttl():
+    local = LocalCache(max_size=10, ttl=60)
+    local.set("a", 1, timeout=0.05)
+    assert local.get("a") == 1
+    time.sleep(0.06)
+    assert local.get("a") is None
+    assert len(local) == 0
+
+def test_local_cache_clear_pattern():
+    local = LocalCache()
+    local.set("pessoas:get_pessoas_for_select:1", [1])
+    local.set("pessoas:get_pessoas_for_select:2", [2])
+    local.set("dashboard:get_dashboard_stats:1", {})
+    assert local.clear_pattern("pessoas:*") == 2
+    assert local.get("dashboard:get_dashboard_stats:1") == {}
+
+def test_cache_manager_sem_redis_usa_cache_local(cache_manager):
+    assert cache_manager.redis_client is None
+    assert cache_manager.set("dashboard:stats", {"total": 1}, 300)
+    assert cache_manager.get("dashboard:stats") == {"total": 1}
+    cache_manager.delete("dashboard:stats")
+    assert cache_manager.get("dashboard:stats") is None
+
+def test_cache_manager_limite_por_prefixo(cache_manager):
+    for i in range(3):
+        cache_manager.set(f"dashboard:k{i}", i, 300)
+    assert cache_manager.get("dashboard:k0") is None
+    assert cache_manager.get("dashboard:k2") == 2
+
+def test_invalidacao_de_outro_worker_remove_chave_local(cache_manager):
+    cache_manager.set("pessoas:lista", [1, 2], 300)
+    cache_manager._on_invalidacao({"data": json.dumps({
+        "op": "delete", "key": "pessoas:lista", "origem": "outro-worker"
+    })})
+    assert cache_manager.get("pessoas:lista") is None
+
+def test_invalidacao_propria_e_ignorada(cache_manager):
+    cache_manager.set("pessoas:lista", [1, 2], 300)
+    cache_manager._on_invalidacao({"data": json.dumps({
+        "op": "pattern", "key": "pessoas:*", "origem": cache_manager._instancia_id
+    })})
+    assert cache_manager.get("pessoas:lista") == [1, 2]
+
+def test_make_cache_key_deterministica_entre_processos():
+    import datetime
+    import os
+    import subprocess
+    import sys
+    from decimal import Decimal
+    from src.utils.cache import make_cache_key
+    args = ("João", datetime.date(2024, 1, 31), Decimal("10.50"))
+    kwargs = {"b": {3, 1, 2}, "a": None}
+    chave = make_cache_key("pessoas", "get_pessoas_for_select", args, kwargs)
+    assert chave == make_cache_key("pessoas", "get_pessoas_for_select", args, dict(reversed(kwargs.items())))
+    script = (
+        "import datetime; from decimal import Decimal; from src.utils.cache import make_cache_key; "
+        "print(make_cache_key('pessoas', 'get_pessoas_for_select', "
+        "('João', datetime.date(2024, 1, 31), Decimal('10.50')), {'b': {3, 1, 2}, 'a': None}))"
+    )
+    saida = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True,
+        env={"PYTHONHASHSEED": "123", "PYTHONPATH": "."}, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    assert saida.stdout.strip() == chave
+
+def test_invalidate_tags_descarta_resultados_do_decorator(cache_manager, monkeypatch):
+    from src.utils import cache as cache_module
+    monkeypatch.setattr(cache_module, "cache", cache_manager)
+    chamadas = []
+
+    @cache_module.cached(timeout=300, key_prefix="pessoas")
+    def listar(filtro=None):
+        chamadas.append(filtro)
+        return [filtro]
+
+    assert listar("a") == ["a"]
+    assert listar("a") == ["a"]
+    assert chamadas == ["a"]
+    cache_manager.invalidate_tags("pessoas")
+    assert listar("a") == ["a"]
+    assert chamadas == ["a", "a"]
+
+class RedisFalso:
+    """Cliente mínimo com SCAN/UNLINK para exercitar a limpeza em lotes"""
+
+    def __init__(self, chaves):
+        self.dados = {k: b"1" for k in chaves}
+        self.scans = 0
+        self.lotes = []
+
+    def scan(self, cursor=0, match=None, count=10):
+        import fnmatch
+        self.scans += 1
+        if cursor == 0:
+            self.snapshot = sorted(self.dados)
+        todas = self.snapshot
+        fatia = todas[cursor:cursor + count]
+        proximo = cursor + count if cursor + count < len(todas) else 0
+        return proximo, [k for k in fatia if fnmatch.fnmatchcase(k, match)]
+
+    def pipeline(self, transaction=True):
+        redis_falso = self
+
+        class Pipeline:
+            def __init__(self):
+                self.comandos = []
+
+            def unlink(self, *keys):
+                self.comandos.append(keys)
+
+            def execute(self):
+                resultados = []
+                for keys in self.comandos:
+                    redis_falso.lotes.append(len(keys))
+                    resultados.append(sum(1 for k in keys if redis_falso.dados.pop(k, None) is not None))
+                return resultados
+
+        return Pipeline()
+
+    def publish(self, canal, mensagem):
+        return 0
+
+def test_clear_pattern_usa_scan_e_unlink_em_lotes(cache_manager):
+    chaves = [f"dashboard:k{i:03d}" for i in range(25)] + ["pessoas:lista"]
+    cache_manager.redis_client = RedisFalso(chaves)
+    removidas = cache_manager.clear_pattern("dashboard:*", batch_size=10)
+    assert removidas == 25
+    assert list(cache_manager.redis_client.dados) == ["pessoas:lista"]
+    assert cache_manager.redis_client.scans > 1
+    assert max(cache_manager.redis_client.lotes) <= 10
+
+def test_clear_pattern_respeita_orcamento_de_tempo(cache_manager):
+    cache_manager.redis_client = RedisFalso([f"dashboard:k{i:03d}" for i in range(50)])
+    removidas = cache_manager.clear_pattern("dashboard:*", batch_size=10, time_budget=1e-9)
+    assert removidas == 10
+    assert len(cache_manager.redis_client.dados) == 40
+
+def test_single_flight_executa_funcao_uma_vez(app, cache_manager, monkeypatch):
+    import threading
+    from src.utils import cache as cache_module
+    monkeypatch.setattr(cache_module, "cache", cache_manager)
+    chamadas = []
+
+    @cache_module.cached(timeout=300, key_prefix="dashboard", lock=True)
+    def estatisticas():
+        chamadas.append(1)
+        time.sleep(0.2)
+        return {"total": 1}
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(estatisticas())) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resultados == [{"total": 1}] * 5
+    assert len(chamadas) == 1
+
+def test_stale_while_revalidate_serve_valor_antigo(app, cache_manager, monkeypatch):
+    from src.utils import cache as cache_module
+    monkeypatch.setattr(cache_module, "cache", cache_manager)
+    valores = iter([1, 2])
+    atualizado = []
+
+    @cache_module.cached(timeout=0.1, key_prefix="dashboard", stale_ttl=60)
+    def contador():
+        valor = next(valores)
+        atualizado.append(valor)
+        return valor
+
+    assert contador() == 1
+    time.sleep(0.15)
+    assert contador() == 1  # vencido: devolve o antigo e atualiza em segundo plano
+    for _ in range(50):
+        if len(atualizado) == 2:
+            break
+        time.sleep(0.02)
+    time.sleep(0.02)
+    assert contador() == 2
+
+def test_nivel_local_devolve_copia_do_mesmo_tipo_do_redis(cache_manager):
+    cache_manager.set("dashboard:stats", {"ids": (1, 2)}, 300)
+    primeiro = cache_manager.get("dashboard:stats")
+    assert primeiro == {"ids": [1, 2]}  # tupla volta como lista, como no Redis
+    primeiro["ids"].append(3)
+    assert cache_manager.get("dashboard:stats") == {"ids": [1, 2]}
+
+def test_clear_pattern_publica_invalidacao_depois_do_unlink(cache_manager):
+    eventos = []
+
+    class RedisRegistrado(RedisFalso):
+        def publish(self, canal, mensagem):
+            eventos.append(("publish", sorted(self.dados)))
+            return 0
+
+    cache_manager.redis_client = RedisRegistrado(["dashboard:a", "dashboard:b", "pessoas:lista"])
+    cache_manager.clear_pattern("dashboard:*")
+    assert eventos == [("publish", ["pessoas:lista"])]
+
+def test_commit_pelo_orm_incrementa_a_versao_das_tags():
+    from src.main import create_app
+    from src.models.db import db
+    from src.models.pessoa import Pessoa
+    from src.utils.cache import cache as cache_global
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "SECRET_KEY": "test"})
+    with app.app_context():
+        db.create_all()
+        try:
+            antes = {tag: cache_global.get_tag_version(tag) for tag in ("pessoas", "dashboard", "fazendas")}
+            db.session.add(Pessoa(nome="Ana", cpf_cnpj="1"))
+            db.session.flush()
+            # só depois do commit: antes disso outra requisição ainda lê o valor antigo
+            assert cache_global.get_tag_version("pessoas") == antes["pessoas"]
+            db.session.commit()
+            assert cache_global.get_tag_version("pessoas") == antes["pessoas"] + 1
+            assert cache_global.get_tag_version("dashboard") == antes["dashboard"] + 1
+            assert cache_global.get_tag_version("fazendas") == antes["fazendas"]
+
+            db.session.add(Pessoa(nome="Bruno", cpf_cnpj="2"))
+            db.session.flush()
+            db.session.rollback()
+            db.session.commit()
+            assert cache_global.get_tag_version("pessoas") == antes["pessoas"] + 1
+        finally:
+            db.session.remove()
+            db.drop_all()
@@ -0,0 +1,38 @@
+import datetime
+import pickle
+from decimal import Decimal
+import pytest
+from src.utils.cache_codec import CacheCodec, CodecError
+
+VALOR = {
+    'valor': [
+        {'id': 1, 'nome': 'João', 'data_vencimento': datetime.date(2025, 1, 31),
+         'valor': Decimal('1500.25'), 'atualizado_em': datetime.datetime(2025, 1, 1, 12, 30)},
+    ],
+    'fresco_ate': 1700000000.5,
+}
+
+@pytest.mark.parametrize('compressao', [None, 'zlib'])
+def test_json_preserva_datas_e_decimal(compressao):
+    codec = CacheCodec('json', compressao, tamanho_minimo_compressao=0)
+    assert codec.loads(codec.dumps(VALOR)) == VALOR
+
+def test_compressao_apenas_acima_do_limite():
+    codec = CacheCodec('json', 'zlib', tamanho_minimo_compressao=1024)
+    assert codec.dumps({'a': 1})[1:2] == b'-'
+    grande = [{'id': i, 'nome': f'Pessoa {i}'} for i in range(200)]
+    serializado = codec.dumps(grande)
+    assert serializado[1:2] == b'Z'
+    assert codec.loads(serializado) == grande
+
+def test_pickle_recusado_quando_codec_nao_e_pickle():
+    codec = CacheCodec('json')
+    with pytest.raises(CodecError):
+        codec.loads(CacheCodec('pickle').dumps(VALOR))
+    # valores gravados antes do cabeçalho (pickle puro) também são ignorados
+    with pytest.raises(CodecError):
+        codec.loads(pickle.dumps(VALOR))
+
+def test_codec_desconhecido():
+    with pytest.raises(ValueError):
+        CacheCodec('xml')
@@ -0,0 +1,128 @@
+import datetime
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.fazenda import Fazenda, TipoPosse
+from src.models.documento import Documento, TipoDocumento, TipoEntidade
+from src.utils.carregamento import consulta, fazendas_por_pessoa, pessoas_por_fazenda, documentos_por_fazenda
+from src.utils.vencimentos import documentos_por_prazo
+
+HOJE = datetime.date.today()
+
+ROTAS = (
+    "/admin/pessoas",
+    "/admin/fazendas",
+    "/admin/documentos",
+    "/admin/documentos/novo",
+    "/admin/documentos/vencidos",
+    "/admin/pessoas/1/fazendas",
+    "/admin/pessoas/1/associar-fazenda",
+    "/admin/fazendas/1/documentos",
+    "/api/pessoas/",
+    "/api/fazendas/",
+    "/api/documentos/",
+    "/api/documentos/vencidos",
+    "/api/fazendas/1/documentos",
+    "/api/pessoas/1/documentos",
+    "/admin/documentos/notificacoes",
+)
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "LOGIN_DISABLED": True
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def documento(nome, vencimento, **entidade):
+    doc = Documento(nome=nome, tipo=TipoDocumento.CERTIDOES, data_emissao=HOJE, data_vencimento=vencimento, **entidade)
+    doc.prazos_notificacao = [30, 10]
+    doc.emails_notificacao = f"{nome.replace(' ', '')}@exemplo.com"
+    return doc
+
+def popular(quantidade, inicio=0):
+    """``quantidade`` pessoas, cada uma com duas fazendas e documentos nas duas entidades
+
+    Um documento de fazenda já venceu e o outro vence em 10 dias (notificação devida).
+    """
+    for i in range(inicio, inicio + quantidade):
+        pessoa = Pessoa(nome=f"Pessoa {i}", cpf_cnpj=f"{i:011d}")
+        for j in range(2):
+            fazenda = Fazenda(nome=f"Fazenda {i}-{j}", matricula=f"M-{i}-{j}", tamanho_total=100, area_consolidada=50,
+                              tamanho_disponivel=50, tipo_posse=TipoPosse.PROPRIA, municipio="Cuiabá", estado="MT")
+            pessoa.fazendas.append(fazenda)
+            db.session.add(documento(f"Doc F {i}-{j}", HOJE + datetime.timedelta(days=10 if j else -1),
+                                     tipo_entidade=TipoEntidade.FAZENDA, fazenda=fazenda))
+        db.session.add(documento(f"Doc P {i}", HOJE - datetime.timedelta(days=3),
+                                 tipo_entidade=TipoEntidade.PESSOA, pessoa=pessoa))
+        db.session.add(pessoa)
+    db.session.commit()
+
+def contar_consultas(app, rota):
+    executadas = []
+    registrar = lambda *args: executadas.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        resposta = app.test_client().get(rota)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    assert resposta.status_code == 200, rota
+    return len(executadas)
+
+def test_numero_de_consultas_por_rota_nao_depende_da_quantidade_de_registros(app):
+    popular(2)
+    poucos = {rota: contar_consultas(app, rota) for rota in ROTAS}
+    popular(8, inicio=2)
+    muitos = {rota: contar_consultas(app, rota) for rota in ROTAS}
+    assert muitos == poucos
+    # listagens: entidade + um SELECT por relacionamento/contagem exibido
+    assert poucos["/admin/pessoas"] <= 2
+    assert poucos["/admin/fazendas"] <= 3
+    assert poucos["/api/pessoas/"] <= 2
+    assert poucos["/api/fazendas/"] <= 2
+
+def test_api_sem_relacionamentos_nos_campos_nao_carrega_colecoes(app):
+    popular(3)
+    assert contar_consultas(app, "/api/pessoas/?fields=id,nome") == 1
+    assert contar_consultas(app, "/api/fazendas/?fields=id,nome") == 1
+    assert contar_consultas(app, "/api/documentos/?fields=id,nome") == 1
+    # documentos + prazos + e-mails, sem a entidade
+    assert contar_consultas(app, "/api/documentos/?fields=id,prazos_notificacao") == 3
+
+def test_perfil_lista_impede_carregamento_implicito(app):
+    popular(1)
+    pessoa = consulta(Pessoa, "lista").first()
+    with pytest.raises(InvalidRequestError):
+        pessoa.fazendas
+
+def test_contagens_agrupadas(app):
+    popular(2)
+    assert set(fazendas_por_pessoa().values()) == {2}
+    assert set(pessoas_por_fazenda().values()) == {1}
+    assert set(documentos_por_fazenda().values()) == {1}
+    assert list(fazendas_por_pessoa(ids=[1])) == [1]
+
+def test_prazos_e_emails_so_com_selectinload(app):
+    popular(2)
+    assert Documento.prazos.property.lazy == Documento.emails.property.lazy == "select"
+    executadas = []
+    registrar = lambda *args: executadas.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        poucos = documentos_por_prazo()
+        assert [d.emails_notificacao for d in poucos[10]] == [["DocF0-1@exemplo.com"], ["DocF1-1@exemplo.com"]]
+        assert all(d.precisa_notificar for d in poucos[10])
+        # documentos (com a entidade), prazos e e-mails
+        assert len(executadas) == 3
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
@@ -0,0 +1,128 @@
+import json
+import datetime
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.documento import Documento, TipoDocumento, TipoEntidade
+from src.models.endividamento import Endividamento, Parcela
+from src.models.dashboard_summary import DashboardSummary
+from src.utils.dashboard import calcular_agregados, consulta_resumo_travada, obter_resumo, reconciliar
+
+HOJE = datetime.date.today()
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "LOGIN_DISABLED": True
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def dia(n):
+    return HOJE + datetime.timedelta(days=n)
+
+def documento(nome, vencimento, pessoa):
+    return Documento(nome=nome, tipo=TipoDocumento.CERTIDOES, data_emissao=dia(-400), data_vencimento=vencimento,
+                     tipo_entidade=TipoEntidade.PESSOA, pessoa=pessoa)
+
+def popular():
+    pessoa = Pessoa(nome="Ana", cpf_cnpj="12345678901")
+    db.session.add_all([
+        documento("vencido", dia(-5), pessoa), documento("a vencer", dia(10), pessoa),
+        documento("sem vencimento", None, pessoa)
+    ])
+    endividamento = Endividamento(banco="Banco", numero_proposta="P-1", data_emissao=dia(-100),
+                                  data_vencimento_final=dia(20), taxa_juros=Decimal("8"), tipo_taxa_juros="ano")
+    endividamento.parcelas.extend([
+        Parcela(data_vencimento=dia(5), valor=Decimal("10")),
+        Parcela(data_vencimento=dia(60), valor=Decimal("10")),
+    ])
+    db.session.add(endividamento)
+    db.session.commit()
+    return pessoa, endividamento
+
+def test_eventos_mantem_o_resumo_igual_as_tabelas(app):
+    reconciliar()
+    pessoa, endividamento = popular()
+    assert obter_resumo() == calcular_agregados()
+    assert obter_resumo()["documentos_vencidos"] == 1
+    assert obter_resumo()["parcelas_proximas"] == 1
+
+    endividamento.parcelas[0].pago = True
+    doc = Documento.query.filter_by(nome="a vencer").one()
+    doc.data_vencimento = dia(-1)
+    db.session.commit()
+    db.session.delete(Documento.query.filter_by(nome="vencido").one())
+    db.session.commit()
+
+    resumo = obter_resumo()
+    assert resumo == calcular_agregados()
+    assert (resumo["documentos_vencidos"], resumo["documentos_a_vencer"], resumo["parcelas_proximas"]) == (1, 0, 0)
+
+    db.session.delete(endividamento)
+    db.session.commit()
+    assert obter_resumo() == calcular_agregados()
+
+def test_reconciliacao_corrige_desvio_e_virada_do_dia(app):
+    popular()
+    reconciliar()
+    # exclusão em massa não passa pelos eventos do ORM
+    Parcela.query.delete()
+    db.session.commit()
+    assert obter_resumo()["parcelas_proximas"] == 1
+    assert reconciliar()["parcelas_proximas"] == 0
+
+    DashboardSummary.query.update({"referencia": dia(-1)})
+    db.session.commit()
+    assert obter_resumo() == calcular_agregados()
+    assert {linha.referencia for linha in DashboardSummary.query} == {HOJE}
+
+def test_dashboard_sem_count(app):
+    popular()
+    client = app.test_client()
+    client.get("/admin/dashboard")
+    consultas = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    resposta = client.get("/admin/dashboard")
+    assert resposta.status_code == 200
+    assert not [sql for sql in consultas if "count(" in sql.lower()]
+
+def test_edicao_pela_rota_nao_desvia_parcelas_proximas(app):
+    _, endividamento = popular()
+    reconciliar()
+    app.config["WTF_CSRF_ENABLED"] = False
+    dados = {
+        "banco": "Banco", "numero_proposta": "P-1", "data_emissao": dia(-100).isoformat(),
+        "data_vencimento_final": dia(20).isoformat(), "taxa_juros": "8", "tipo_taxa_juros": "ano",
+        "parcelas": json.dumps([{"data_vencimento": dia(5).isoformat(), "valor": "10"}])
+    }
+    cliente = app.test_client()
+    for _ in range(3):
+        resposta = cliente.post(f"/endividamentos/{endividamento.id}/editar", data=dados)
+        assert resposta.status_code == 302
+    db.session.expire_all()
+    assert Parcela.query.count() == 1
+    assert obter_resumo()["parcelas_proximas"] == calcular_agregados()["parcelas_proximas"] == 1
+
+def test_reconciliacao_trava_o_resumo_antes_de_contar(app):
+    popular()
+    reconciliar()
+    # o SQLite ignora FOR UPDATE: a cláusula é verificada no dialeto do MySQL
+    assert "FOR UPDATE" in str(consulta_resumo_travada().statement.compile(dialect=mysql.dialect()))
+    consultas = []
+    registrar = lambda *args: consultas.append(args[2].lower())
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    reconciliar()
+    event.remove(db.engine, "before_cursor_execute", registrar)
+    primeira_contagem = next(i for i, sql in enumerate(consultas) if "count(" in sql)
+    assert any("from dashboard_summary" in sql for sql in consultas[:primeira_contagem])
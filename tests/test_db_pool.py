@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from src.main import create_app
+from src.models.db import db
+from src.utils.db_pool import PoolMonitorado, opcoes_engine
+from src.utils.metrics import MetricsRegistry, registry
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'pool.db'}",
+        "SECRET_KEY": "test",
+        "DB_POOL_SIZE": 1,
+        "DB_MAX_OVERFLOW": 0,
+        "DB_POOL_TIMEOUT": 0.1,
+    })
+    with app.app_context():
+        registry.reset()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def test_opcoes_engine_por_configuracao():
+    config = {"SQLALCHEMY_DATABASE_URI": "mysql+pymysql://u:s@db/gestao", "DB_POOL_SIZE": 5,
+              "DB_MAX_OVERFLOW": 2, "DB_POOL_RECYCLE": 280, "DB_POOL_PRE_PING": True, "DB_POOL_TIMEOUT": 10}
+    assert opcoes_engine(config) == {
+        "poolclass": PoolMonitorado, "pool_size": 5, "max_overflow": 2,
+        "pool_recycle": 280, "pool_pre_ping": True, "pool_timeout": 10
+    }
+    assert opcoes_engine(dict(config, SQLALCHEMY_DATABASE_URI="sqlite:///:memory:")) == {}
+
+def test_pool_esgotado_registra_espera_e_timeout(app):
+    engine = db.engine
+    assert isinstance(engine.pool, PoolMonitorado) and engine.pool._pre_ping
+    conexao = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    texto = app.test_client().get("/metrics").get_data(as_text=True)
+    assert "db_pool_waits_total 1" in texto
+    assert 'db_pool_checkout_seconds_count{result="timeout"} 1' in texto
+    assert "db_pool_checked_out 1" in texto
+    assert "db_pool_capacity 1" in texto
+    conexao.close()
+    assert "db_pool_checked_out 0" in registry.render()
+
+def test_health_informa_saturacao(app):
+    dados = app.test_client().get("/health").get_json()
+    assert dados["pool"]["capacidade"] == 1
+    assert 0 <= dados["pool"]["saturacao"] <= 1
+
+def test_gauge_soma_workers(tmp_path, monkeypatch):
+    import os
+    worker_a, worker_b = MetricsRegistry(), MetricsRegistry()
+    for reg in (worker_a, worker_b):
+        reg.configure(str(tmp_path))
+    worker_a.gauge("em_uso", "Em uso").set(2)
+    worker_a.persist()
+    monkeypatch.setattr(os, "getpid", lambda: 999999)
+    worker_b.gauge("em_uso", "Em uso").set(3)
+    texto = worker_b.render()
+    assert "# TYPE em_uso gauge" in texto
+    assert "em_uso 5" in texto
+
+def test_gauge_de_worker_encerrado_nao_entra_na_soma(tmp_path, monkeypatch):
+    import os, subprocess, sys
+    encerrado = subprocess.Popen([sys.executable, "-c", "pass"])
+    encerrado.wait()
+    reg = MetricsRegistry()
+    reg.configure(str(tmp_path))
+    reg.counter("eventos_total", "Eventos").inc(1)
+    reg.gauge("em_uso", "Em uso").set(4)
+    reg.persist()
+    os.replace(tmp_path / f"metrics_{os.getpid()}.json", tmp_path / f"metrics_{encerrado.pid}.json")
+    reg.reset()
+    reg.gauge("em_uso", "Em uso").set(1)
+    texto = reg.render()
+    assert "em_uso 1" in texto
+    # contadores continuam acumulados
+    assert "eventos_total 1" in texto
+
+def test_ultima_alteracao_do_gauge_e_persistida_sem_nova_atividade(tmp_path):
+    import json, os, time
+    reg = MetricsRegistry(intervalo_persistencia=0.05)
+    reg.configure(str(tmp_path))
+    em_uso = reg.gauge("em_uso", "Em uso")
+    em_uso.set(3)
+    em_uso.set(0)  # dentro do intervalo: gravação adiada, não descartada
+    time.sleep(0.2)
+    with open(tmp_path / f"metrics_{os.getpid()}.json") as arquivo:
+        assert json.load(arquivo)["em_uso"]["series"] == [[[], 0]]
+
+def test_requisicoes_simultaneas_agendam_uma_unica_gravacao(tmp_path, monkeypatch):
+    import threading
+    from src.utils import metrics
+    criados = []
+    class TimerContado(threading.Timer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            criados.append(self)
+    monkeypatch.setattr(metrics.threading, "Timer", TimerContado)
+    gravacoes = []
+    monkeypatch.setattr(metrics, "_gravar_snapshot", lambda caminho, snapshot: gravacoes.append(snapshot))
+
+    reg = MetricsRegistry(intervalo_persistencia=60)
+    reg.configure(str(tmp_path))
+    contador = reg.counter("eventos_total", "Eventos")
+    barreira = threading.Barrier(16)
+    def incrementar():
+        barreira.wait()
+        for _ in range(50):
+            contador.inc()
+    threads = [threading.Thread(target=incrementar) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # a primeira alteração grava na hora; as demais caem no mesmo agendamento
+    assert len(gravacoes) == 1 and len(criados) == 1
+    reg.persist()
+    assert criados[0].finished.is_set()  # agendamento cancelado pela gravação
+    assert gravacoes[-1]["eventos_total"]["series"] == [[[], 800]]
@@ -0,0 +1,102 @@
+import datetime
+import json
+import logging.config
+import os
+import pytest
+from sqlalchemy import text
+from flask_migrate import upgrade
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.documento import Documento, DocumentoPrazo, DocumentoEmail, TipoDocumento, TipoEntidade
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'teste.db'}",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+def novo_documento(nome="Licença"):
+    return Documento(
+        nome=nome, tipo=TipoDocumento.CERTIDOES, data_emissao=datetime.date(2025, 1, 1),
+        data_vencimento=datetime.date(2026, 1, 1), tipo_entidade=TipoEntidade.PESSOA,
+        pessoa=Pessoa(nome=f"Dono {nome}", cpf_cnpj=nome)
+    )
+
+def test_propriedades_gravam_nas_tabelas_filhas(app):
+    documento = novo_documento()
+    documento.prazos_notificacao = [30, 7, 30, 1]
+    documento.emails_notificacao = "a@fazenda.com, b@fazenda.com"
+    db.session.add(documento)
+    db.session.commit()
+
+    assert documento.prazos_notificacao == [30, 7, 1]
+    assert [p.dias for p in DocumentoPrazo.query.order_by(DocumentoPrazo.dias)] == [1, 7, 30]
+    assert {e.email for e in DocumentoEmail.query} == {"a@fazenda.com", "b@fazenda.com"}
+    assert json.loads(documento._prazos_notificacao) == [30, 7, 1]
+
+    # reatribuir mantendo um valor não viola a chave primária
+    documento.prazos_notificacao = [7, 15]
+    db.session.commit()
+    db.session.expire_all()
+    assert Documento.query.one().prazos_notificacao == [7, 15]
+
+    db.session.delete(Documento.query.one())
+    db.session.commit()
+    assert DocumentoPrazo.query.count() == 0
+    assert DocumentoEmail.query.count() == 0
+
+def test_sem_tabelas_filhas_usa_o_json(app):
+    # banco criado por create_all: colunas JSON antigas, tabelas filhas vazias
+    documento = novo_documento()
+    db.session.add(documento)
+    db.session.commit()
+    db.session.execute(text("UPDATE documento SET prazos_notificacao = '[30, 7]', emails_notificacao = '[\"a@fazenda.com\"]'"))
+    db.session.commit()
+    db.session.expire_all()
+    documento = Documento.query.one()
+    assert documento.prazos_notificacao == [30, 7]
+    assert documento.emails_notificacao == ["a@fazenda.com"]
+
+    # a próxima gravação passa a usar as tabelas filhas
+    documento.prazos_notificacao = [15]
+    documento.emails_notificacao = []
+    db.session.commit()
+    db.session.expire_all()
+    documento = Documento.query.one()
+    assert documento.prazos_notificacao == [15]
+    assert documento.emails_notificacao == []
+    assert DocumentoPrazo.query.count() == 1
+
+def test_migracao_preenche_tabelas_a_partir_do_json(app, monkeypatch):
+    # o env.py do Alembic reconfiguraria (e desligaria) os loggers da aplicação
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    db.session.add_all([novo_documento("a"), novo_documento("b"), novo_documento("c")])
+    db.session.commit()
+    # Linhas como estavam antes da migração: só as colunas JSON
+    db.session.execute(text(
+        "UPDATE documento SET prazos_notificacao = :prazos, emails_notificacao = :emails WHERE nome = 'a'"
+    ), {"prazos": "[30, 15, 15, \"7\"]", "emails": "[\"x@fazenda.com\"]"})
+    db.session.execute(text(
+        "UPDATE documento SET prazos_notificacao = 'invalido', emails_notificacao = NULL WHERE nome = 'b'"
+    ))
+    db.session.commit()
+
+    upgrade(directory=MIGRACOES)
+    upgrade(directory=MIGRACOES)  # já aplicada: não duplica
+    db.session.expire_all()
+
+    documentos = {d.nome: d for d in Documento.query}
+    assert documentos["a"].prazos_notificacao == [30, 15, 7]
+    assert documentos["a"].emails_notificacao == ["x@fazenda.com"]
+    assert documentos["b"].prazos_notificacao == []
+    assert documentos["c"].emails_notificacao == []
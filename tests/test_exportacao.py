@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import datetime
+from decimal import Decimal
+import pytest
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.endividamento import Endividamento, Parcela
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "RATELIMIT_ENABLED": False,
+        "EXPORT_YIELD_PER": 2
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def test_exportar_pessoas_ndjson_em_streaming(client):
+    for i in range(5):
+        db.session.add(Pessoa(nome=f"Pessoa {i}", cpf_cnpj=f"{i:011d}"))
+    db.session.commit()
+    resposta = client.get("/api/pessoas/export?fields=id,nome")
+    assert resposta.status_code == 200
+    assert resposta.is_streamed
+    assert resposta.mimetype == "application/x-ndjson"
+    linhas = [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+    assert linhas == [{"id": i + 1, "nome": f"Pessoa {i}"} for i in range(5)]
+
+def test_exportar_parcelas_csv_com_filtros(client):
+    endividamento = Endividamento(
+        banco="Banco do Brasil", numero_proposta="P-1", data_emissao=datetime.date(2024, 1, 1),
+        data_vencimento_final=datetime.date(2026, 1, 1), taxa_juros=Decimal("8.5"), tipo_taxa_juros="ano"
+    )
+    endividamento.parcelas = [
+        Parcela(data_vencimento=datetime.date(2025, 1, 1), valor=Decimal("1000.00"), pago=True),
+        Parcela(data_vencimento=datetime.date(2025, 7, 1), valor=Decimal("1000.00"), pago=False),
+    ]
+    db.session.add(endividamento)
+    db.session.commit()
+
+    resposta = client.get("/endividamentos/api/parcelas/export?format=csv&pago=false&fields=data_vencimento,valor")
+    assert resposta.status_code == 200
+    linhas = list(csv.reader(io.StringIO(resposta.get_data(as_text=True))))
+    assert linhas == [["data_vencimento", "valor"], ["2025-07-01", "1000.0"]]
+
+    resposta = client.get("/endividamentos/api/export?banco=brasil")
+    assert [json.loads(l)["numero_proposta"] for l in resposta.get_data(as_text=True).splitlines()] == ["P-1"]
+
+def test_exportar_formato_invalido(client):
+    resposta = client.get("/api/documentos/export?format=xml")
+    assert resposta.status_code == 400
@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import mysql, sqlite
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.endividamento import Endividamento, Parcela
+from src.utils.fluxo_endividamento import mes_ano, somar_meses
+
+HOJE = date.today()
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def endividamento(banco, pessoas, parcelas):
+    registro = Endividamento(banco=banco, numero_proposta=f"P-{banco}", data_emissao=date(2025, 1, 1),
+                             data_vencimento_final=HOJE + timedelta(days=900), taxa_juros=Decimal("10"),
+                             tipo_taxa_juros="ano")
+    registro.pessoas.extend(pessoas)
+    for vencimento, valor, pago in parcelas:
+        registro.parcelas.append(Parcela(data_vencimento=vencimento, valor=Decimal(valor), pago=pago))
+    db.session.add(registro)
+    return registro
+
+def test_truncamento_por_dialeto():
+    expressao = select(mes_ano(Parcela.data_vencimento))
+    # paramstyle 'format': o '%' chega duplicado ao driver
+    assert "DATE_FORMAT(parcela.data_vencimento, '%%Y-%%m')" in str(expressao.compile(dialect=mysql.dialect()))
+    assert "strftime('%Y-%m', parcela.data_vencimento)" in str(expressao.compile(dialect=sqlite.dialect()))
+
+def test_fluxo_por_mes_banco_e_pessoa(app):
+    ana = Pessoa(nome="Ana", cpf_cnpj="1")
+    bruno = Pessoa(nome="Bruno", cpf_cnpj="2")
+    proximo = somar_meses(HOJE, 1)
+    endividamento("Banco A", [ana], [
+        (HOJE - timedelta(days=1), "999", False),        # vencida: fora da projeção
+        (proximo, "100", False),
+        (proximo + timedelta(days=10), "50", False),
+        (proximo + timedelta(days=5), "70", True),        # paga
+        (somar_meses(HOJE, 24), "999", False),            # além do horizonte
+    ])
+    endividamento("Banco B", [ana, bruno], [(proximo, "300", False)])
+    db.session.commit()
+
+    consultas = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    dados = app.test_client().get("/endividamentos/api/fluxo").get_json()
+    assert len(consultas) == 2 and all("GROUP BY" in sql for sql in consultas)
+
+    assert len(dados["meses"]) == 24
+    assert dados["meses"][1] == {"mes": proximo.strftime("%Y-%m"), "valor": 450.0, "parcelas": 3}
+    assert sum(mes["valor"] for mes in dados["meses"]) == 450.0
+    assert [(b["banco"], b["valor"], b["parcelas"]) for b in dados["por_banco"]] == [
+        ("Banco A", 150.0, 2), ("Banco B", 300.0, 1)
+    ]
+    assert {p["nome"]: p["valor"] for p in dados["por_pessoa"]} == {"Ana": 450.0, "Bruno": 300.0}
+
+def test_cache_invalidado_quando_parcela_e_paga(app):
+    registro = endividamento("Banco A", [], [(somar_meses(HOJE, 1), "100", False)])
+    db.session.commit()
+    client = app.test_client()
+    assert client.get("/endividamentos/api/fluxo?meses=3").get_json()["meses"][1]["valor"] == 100.0
+    registro.parcelas[0].pago = True
+    db.session.commit()
+    assert client.get("/endividamentos/api/fluxo?meses=3").get_json()["meses"][1]["valor"] == 0.0
+    registro.parcelas.append(Parcela(data_vencimento=somar_meses(HOJE, 2), valor=Decimal("40")))
+    db.session.commit()
+    assert client.get("/endividamentos/api/fluxo?meses=3").get_json()["meses"][2]["valor"] == 40.0
+
+def test_meses_invalido(app):
+    client = app.test_client()
+    assert client.get("/endividamentos/api/fluxo?meses=0").status_code == 400
+    assert client.get("/endividamentos/api/fluxo?meses=x").status_code == 400
@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+from src.main import create_app
+from src.models.db import db
+from src.utils.jobs import iniciar_job, registry
+from src.utils.notificacao_endividamento_service import NotificacaoEndividamentoService
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "LOGIN_DISABLED": True
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def aguardar(client, job_id, tempo_max=5):
+    limite = time.time() + tempo_max
+    while time.time() < limite:
+        estado = client.get(f"/jobs/{job_id}").get_json()
+        if estado["status"] in ("concluido", "erro"):
+            return estado
+        time.sleep(0.02)
+    raise AssertionError("job não terminou")
+
+def test_job_publica_progresso_e_resultado(app, client):
+    def tarefa(progresso, quantidade):
+        progresso.definir_total(quantidade)
+        for i in range(quantidade):
+            progresso.registrar(enviados=1 if i % 2 == 0 else 0, falhas=1 if i % 2 else 0)
+        return {"ok": True}
+
+    job_id = iniciar_job("teste", tarefa, 4)
+    estado = aguardar(client, job_id)
+    assert estado["status"] == "concluido"
+    assert (estado["total"], estado["enviados"], estado["falhas"], estado["processados"]) == (4, 2, 2, 4)
+    assert estado["resultado"] == {"ok": True}
+
+def test_job_com_erro_registra_mensagem(app, client):
+    def tarefa(progresso):
+        raise RuntimeError("SMTP fora do ar")
+
+    estado = aguardar(client, iniciar_job("teste", tarefa))
+    assert estado["status"] == "erro"
+    assert estado["erro"] == "SMTP fora do ar"
+
+def test_job_inexistente_retorna_404(client):
+    assert client.get("/jobs/naoexiste").status_code == 404
+
+def test_status_exige_login(app):
+    app.config["LOGIN_DISABLED"] = False
+    resposta = app.test_client().get("/jobs/naoexiste")
+    assert resposta.status_code in (302, 401)
+
+def test_job_do_mesmo_tipo_em_andamento_nao_e_duplicado(app, client):
+    liberar = threading.Event()
+
+    def tarefa(progresso):
+        liberar.wait(5)
+        return {"ok": True}
+
+    primeiro = iniciar_job("exclusivo", tarefa)
+    assert iniciar_job("exclusivo", tarefa) == primeiro
+    liberar.set()
+    assert aguardar(client, primeiro)["status"] == "concluido"
+    assert aguardar(client, iniciar_job("exclusivo", tarefa))["status"] == "concluido"
+
+def test_job_sem_sinal_de_vida_e_marcado_como_falho(app, client, monkeypatch):
+    job_id = registry.criar("orfao")
+    registry.atualizar(job_id, status="executando")
+    assert client.get(f"/jobs/{job_id}").get_json()["status"] == "executando"
+    depois = registry.obter(job_id)["atualizado_em"] + registry.expiracao + 1
+    monkeypatch.setattr(time, "time", lambda: depois)
+    estado = client.get(f"/jobs/{job_id}").get_json()
+    assert estado["status"] == "erro" and "sem sinal" in estado["erro"]
+
+def test_processar_notificacoes_retorna_job_imediatamente(app, client, monkeypatch):
+    monkeypatch.setattr(NotificacaoEndividamentoService, "job_enviar_notificacoes",
+                        lambda self, progresso: progresso.definir_total(0) or {"enviadas": 0})
+    resposta = client.post("/endividamentos/api/processar-notificacoes")
+    assert resposta.status_code == 202
+    dados = resposta.get_json()
+    assert dados["status_url"] == f"/jobs/{dados['job_id']}"
+    assert aguardar(client, dados["job_id"])["resultado"] == {"enviadas": 0}
+
+def test_lock_do_tipo_guarda_o_id_e_pode_ser_renovado(app):
+    from src.utils.cache import cache
+    assert cache.acquire_lock("job:renovavel", timeout=0.05, token="abc") == "abc"
+    assert cache.lock_owner("job:renovavel") == "abc"
+    assert cache.extend_lock("job:renovavel", "abc", 5)
+    assert not cache.extend_lock("job:renovavel", "outro", 5)
+    time.sleep(0.1)
+    assert cache.lock_owner("job:renovavel") == "abc"
+    assert cache.release_lock("job:renovavel", "abc")
+    assert cache.lock_owner("job:renovavel") is None
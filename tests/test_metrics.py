@@ -0,0 +1,98 @@
+import pytest
+from src.main import create_app
+from src.models.db import db
+from src.utils.metrics import MetricsRegistry, registry
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        registry.reset()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def test_histograma_acumula_buckets():
+    reg = MetricsRegistry()
+    hist = reg.histogram("latencia_seconds", "Latência", labels=("rota",), buckets=(0.1, 1.0))
+    hist.observe(0.05, rota="a")
+    hist.observe(0.5, rota="a")
+    hist.observe(3, rota="a")
+    texto = reg.render()
+    assert '# TYPE latencia_seconds histogram' in texto
+    assert 'latencia_seconds_bucket{rota="a",le="0.1"} 1' in texto
+    assert 'latencia_seconds_bucket{rota="a",le="1"} 2' in texto
+    assert 'latencia_seconds_bucket{rota="a",le="+Inf"} 3' in texto
+    assert 'latencia_seconds_count{rota="a"} 3' in texto
+    assert 'latencia_seconds_sum{rota="a"} 3.55' in texto
+
+def test_diretorio_multiprocessos_soma_workers(tmp_path, monkeypatch):
+    import os
+    worker_a, worker_b = MetricsRegistry(), MetricsRegistry()
+    for reg in (worker_a, worker_b):
+        reg.configure(str(tmp_path))
+        reg.counter("eventos_total", "Eventos", labels=("tipo",))
+    worker_a.counter("eventos_total", "").inc(2, tipo="x")
+    worker_a.persist()
+    # o segundo registro simula outro worker gravando no mesmo diretório
+    monkeypatch.setattr(os, "getpid", lambda: 999999)
+    worker_b.counter("eventos_total", "").inc(3, tipo="x")
+    assert 'eventos_total{tipo="x"} 5' in worker_b.render()
+    assert len(list(tmp_path.glob("metrics_*.json"))) == 2
+
+def test_endpoint_metrics_expoe_latencia_e_cache(app, client):
+    from src.utils.cache import cache
+    cache.get("pessoas:inexistente")
+    assert client.get("/health").status_code == 200
+    resposta = client.get("/metrics")
+    assert resposta.status_code == 200
+    assert resposta.mimetype == "text/plain"
+    texto = resposta.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",blueprint="",endpoint="health_check",status="200"} 1' in texto
+    assert 'http_request_db_seconds_count{blueprint="",endpoint="health_check"} 1' in texto
+    assert 'cache_requests_total{prefix="pessoas",result="miss"} 1' in texto
+
+def test_worker_encerrado_tem_snapshot_consolidado(tmp_path, monkeypatch):
+    import os
+    from src.utils.metrics import marcar_processo_encerrado
+    monkeypatch.setattr(os, "getpid", lambda: 999998)
+    worker = MetricsRegistry()
+    worker.configure(str(tmp_path))
+    worker.counter("eventos_total", "Eventos", labels=("tipo",)).inc(2, tipo="x")
+    worker.gauge("em_uso", "Em uso").set(3)
+    worker.persist()
+    marcar_processo_encerrado(str(tmp_path), 999998)
+    marcar_processo_encerrado(str(tmp_path), 999997)  # sem snapshot: nada a fazer
+    assert [arquivo.name for arquivo in tmp_path.glob("metrics_*.json")] == ["metrics_encerrados.json"]
+
+    monkeypatch.setattr(os, "getpid", lambda: 999999)
+    worker.reset()
+    worker.counter("eventos_total", "").inc(1, tipo="x")
+    texto = worker.render()
+    assert 'eventos_total{tipo="x"} 3' in texto
+    assert "em_uso 3" not in texto
+
+def test_metrics_exige_token_ou_ip_permitido(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "METRICS_TOKEN": "segredo",
+        "METRICS_ALLOWED_IPS": "10.0.0.0/8"
+    })
+    client = app.test_client()
+    externo = {"REMOTE_ADDR": "203.0.113.5"}
+    assert client.get("/metrics", environ_base=externo).status_code == 403
+    assert client.get("/metrics", environ_base=externo, headers={"Authorization": "Bearer errado"}).status_code == 403
+    assert client.get("/metrics", environ_base=externo, headers={"Authorization": "Bearer segredo"}).status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"}).status_code == 200
+    assert client.get("/metrics").status_code == 403  # 127.0.0.1 fora da lista configurada
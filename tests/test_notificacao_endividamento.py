@@ -0,0 +1,94 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.endividamento import Endividamento, Parcela
+from src.models.notificacao_endividamento import NotificacaoEndividamento, HistoricoNotificacao
+from src.utils.notificacao_endividamento_service import NotificacaoEndividamentoService
+
+HOJE = date.today()
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def criar_endividamento(dias_para_vencimento, ativo=True):
+    endividamento = Endividamento(
+        banco=f"Banco {dias_para_vencimento}", numero_proposta=f"P-{dias_para_vencimento}",
+        data_emissao=date(2024, 1, 1), data_vencimento_final=HOJE + timedelta(days=dias_para_vencimento),
+        taxa_juros=Decimal("8.5"), tipo_taxa_juros="ano"
+    )
+    endividamento.pessoas.append(Pessoa(nome="Ana", cpf_cnpj=f"{dias_para_vencimento:011d}"))
+    endividamento.parcelas.append(Parcela(data_vencimento=endividamento.data_vencimento_final, valor=Decimal("100")))
+    db.session.add(endividamento)
+    db.session.add(NotificacaoEndividamento(
+        endividamento=endividamento, emails=json.dumps(["financeiro@fazenda.com"]), ativo=ativo
+    ))
+    return endividamento
+
+def test_planejador_seleciona_apenas_notificacoes_devidas(app):
+    criar_endividamento(30)
+    criar_endividamento(7)
+    criar_endividamento(45)  # fora dos intervalos
+    criar_endividamento(3, ativo=False)
+    ja_enviado = criar_endividamento(90)
+    db.session.flush()
+    db.session.add(HistoricoNotificacao(
+        endividamento_id=ja_enviado.id, tipo_notificacao="3_meses", emails_enviados="[]", sucesso=True
+    ))
+    db.session.commit()
+    db.session.expunge_all()
+
+    consultas = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    plano = NotificacaoEndividamentoService().planejar_notificacoes(HOJE)
+    tipos = sorted((config.endividamento.banco, tipo) for config, tipo in plano)
+    # dados do e-mail já carregados: nenhuma consulta extra por endividamento
+    for config, tipo in plano:
+        assert config.endividamento.parcelas and config.endividamento.pessoas
+    assert tipos == [("Banco 30", "30_dias"), ("Banco 7", "7_dias")]
+    assert len(consultas) == 4
+
+def test_envio_registra_historico_e_nao_repete(app, monkeypatch):
+    criar_endividamento(1)
+    db.session.commit()
+    service = NotificacaoEndividamentoService()
+    enviados = []
+    monkeypatch.setattr(service.email_service, "send_many",
+                        lambda mensagens: [enviados.append(m[1]) or True for m in mensagens])
+    monkeypatch.setattr("src.utils.notificacao_endividamento_service.date",
+                        type("DataFixa", (date,), {"today": staticmethod(lambda: HOJE)}))
+
+    assert service.verificar_e_enviar_notificacoes() == 1
+    assert service.verificar_e_enviar_notificacoes() == 0
+    assert len(enviados) == 1
+    assert HistoricoNotificacao.query.filter_by(tipo_notificacao="1_dia", sucesso=True).count() == 1
+
+def test_nao_notifica_no_dia_do_vencimento_e_avanca_sem_emails(app):
+    no_dia = criar_endividamento(0)
+    sem_emails = criar_endividamento(7)
+    db.session.flush()
+    no_dia.proxima_notificacao = HOJE
+    sem_emails.proxima_notificacao = HOJE
+    NotificacaoEndividamento.query.filter_by(endividamento_id=sem_emails.id).one().emails = "[]"
+    db.session.commit()
+
+    service = NotificacaoEndividamentoService()
+    assert [config.endividamento.banco for config, _ in service.planejar_notificacoes(HOJE)] == ["Banco 7"]
+    assert service.enfileirar_notificacoes(HOJE) == 0
+    # sem destinatários o lembrete de 7 dias é dado como tratado
+    assert db.session.get(Endividamento, sem_emails.id).proxima_notificacao > HOJE
+    assert service.planejar_notificacoes(HOJE) == []
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import event
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.fazenda import Fazenda, TipoPosse
+from src.utils.opcoes import Opcao, listar_opcoes, opcoes_select, buscar_opcoes
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "LOGIN_DISABLED": True,
+        "OPCOES_LIMITE_SELECT": 3
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def fazenda(nome):
+    return Fazenda(nome=nome, matricula=f"M-{nome}", tamanho_total=10, area_consolidada=5, tamanho_disponivel=5,
+                   tipo_posse=TipoPosse.PROPRIA, municipio="Sinop", estado="MT")
+
+def popular(*nomes):
+    db.session.add_all([Pessoa(nome=nome, cpf_cnpj=f"CPF {nome}") for nome in nomes])
+    db.session.add_all([fazenda(f"Fazenda {nome}") for nome in nomes])
+    db.session.commit()
+
+@pytest.fixture
+def consultas(app):
+    executadas = []
+    registrar = lambda *args: executadas.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    yield executadas
+    event.remove(db.engine, "before_cursor_execute", registrar)
+
+def test_opcoes_ordenadas_e_em_cache(app, consultas):
+    popular("Bruno", "Ana")
+    consultas.clear()
+    assert listar_opcoes("pessoas") == [Opcao(2, "Ana"), Opcao(1, "Bruno")]
+    assert len(consultas) == 1
+    assert listar_opcoes("pessoas") == [(2, "Ana"), (1, "Bruno")]
+    assert len(consultas) == 1
+
+def test_gravacao_invalida_a_lista(app):
+    popular("Ana")
+    assert [o.nome for o in listar_opcoes("fazendas")] == ["Fazenda Ana"]
+    db.session.get(Fazenda, 1).nome = "Fazenda Nova"
+    db.session.commit()
+    assert [o.nome for o in listar_opcoes("fazendas")] == ["Fazenda Nova"]
+    db.session.add(Pessoa(nome="Carla", cpf_cnpj="99"))
+    db.session.commit()
+    assert [o.nome for o in listar_opcoes("pessoas")] == ["Ana", "Carla"]
+
+def test_acima_do_limite_renderiza_so_os_selecionados(app):
+    popular("Ana", "Bruno", "Carla")
+    completas = opcoes_select("pessoas")
+    assert len(completas) == 3 and not completas.typeahead
+    popular("Davi")
+    parciais = opcoes_select("pessoas", ["2", None, "x"])
+    assert parciais == [(2, "Bruno")] and parciais.typeahead
+    # fazendas já associadas não contam para o limite
+    assert not opcoes_select("fazendas", excluir=[1]).typeahead
+
+def test_busca_por_nome(app):
+    popular("Ana Paula", "Mariana", "Bruno")
+    assert [o.nome for o in buscar_opcoes("pessoas", "ana")] == ["Ana Paula", "Mariana"]
+    assert buscar_opcoes("pessoas", "a") == []
+    assert buscar_opcoes("pessoas", "%%") == []
+
+def test_endpoint_de_busca(app):
+    popular("Ana Paula", "Mariana", "Bruno")
+    cliente = app.test_client()
+    assert cliente.get("/api/pessoas/opcoes?q=ana&limit=1").get_json() == [{"id": 1, "nome": "Ana Paula"}]
+    assert cliente.get("/api/fazendas/opcoes?q=bru").get_json() == [{"id": 3, "nome": "Fazenda Bruno"}]
+    assert cliente.get("/api/pessoas/opcoes?q=ana&limit=x").status_code == 400
+
+def test_formularios_usam_busca_acima_do_limite(app):
+    popular("Ana", "Bruno")
+    cliente = app.test_client()
+    pagina = cliente.get("/admin/documentos/novo").get_data(as_text=True)
+    assert "data-opcoes-url" not in pagina and "Fazenda Bruno" in pagina
+    popular("Carla", "Davi")
+    for rota in ("/admin/documentos/novo", "/admin/documentos?pessoa_id=2", "/endividamentos/", "/endividamentos/novo",
+                 "/admin/pessoas/1/associar-fazenda"):
+        pagina = cliente.get(rota).get_data(as_text=True)
+        assert 'data-opcoes-url="/api/' in pagina, rota
+        assert "Fazenda Carla" not in pagina, rota
+    assert "Bruno" in cliente.get("/admin/documentos?pessoa_id=2").get_data(as_text=True)
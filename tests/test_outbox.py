@@ -0,0 +1,167 @@
+import json
+import logging.config
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import inspect, text
+from src.main import create_app
+from src.models.db import db
+from src.models.email_outbox import EmailOutbox
+from src.models.notificacao_endividamento import HistoricoNotificacao
+from src.utils import outbox
+from src.utils.outbox import processar_outbox
+from tests.test_notificacao_endividamento import HOJE, criar_endividamento
+from src.utils.notificacao_endividamento_service import NotificacaoEndividamentoService
+
+MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+class EmailServiceFalso:
+    def __init__(self, resultados=None):
+        self.resultados = list(resultados or [])
+        self.lotes = []
+
+    def send_many(self, mensagens):
+        self.lotes.append(len(mensagens))
+        return [self.resultados.pop(0) if self.resultados else True for _ in mensagens]
+
+def enfileirar(quantidade, **kwargs):
+    for i in range(quantidade):
+        db.session.add(EmailOutbox(
+            destinatarios=json.dumps([f"dest{i}@fazenda.com"]), assunto=f"Aviso {i}", corpo="corpo", **kwargs
+        ))
+    db.session.commit()
+
+def test_drena_em_lotes_e_marca_enviadas(app):
+    enfileirar(5)
+    servico = EmailServiceFalso()
+    assert processar_outbox(tamanho_lote=2, email_service=servico) == 5
+    assert servico.lotes == [2, 2, 1]
+    assert EmailOutbox.query.filter_by(status=EmailOutbox.ENVIADO).count() == 5
+
+def test_falha_e_reagendada_ate_o_limite(app):
+    enfileirar(1, max_tentativas=2)
+    assert processar_outbox(email_service=EmailServiceFalso([False])) == 0
+    mensagem = EmailOutbox.query.one()
+    assert mensagem.status == EmailOutbox.PENDENTE
+    assert mensagem.tentativas == 1
+    assert mensagem.disponivel_em > datetime.utcnow()
+
+    # ainda em backoff: não é reenviada
+    assert processar_outbox(email_service=EmailServiceFalso()) == 0
+    mensagem.disponivel_em = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert processar_outbox(email_service=EmailServiceFalso([False])) == 0
+    assert EmailOutbox.query.one().status == EmailOutbox.FALHA
+
+def test_reserva_expirada_volta_para_a_fila(app):
+    enfileirar(1, status=EmailOutbox.ENVIANDO, disponivel_em=datetime.utcnow() - timedelta(minutes=10))
+    assert processar_outbox(email_service=EmailServiceFalso()) == 1
+    assert EmailOutbox.query.one().reservado_por is None
+
+def test_reserva_de_dono_vivo_nao_e_retomada(app):
+    morto = subprocess.Popen([sys.executable, "-c", "pass"])
+    morto.wait()
+    vencida = datetime.utcnow() - timedelta(seconds=1)
+    enfileirar(1, status=EmailOutbox.ENVIANDO, disponivel_em=vencida, reservado_por=outbox.dono_reserva())
+    enfileirar(1, status=EmailOutbox.ENVIANDO, disponivel_em=vencida, reservado_por=f"{socket.gethostname()}:{morto.pid}")
+    enfileirar(1, status=EmailOutbox.ENVIANDO, disponivel_em=vencida, reservado_por="outro-host:1")
+    servico = EmailServiceFalso()
+    assert processar_outbox(email_service=servico) == 2
+    viva = db.session.get(EmailOutbox, 1)
+    assert viva.status == EmailOutbox.ENVIANDO and viva.disponivel_em > datetime.utcnow()
+    assert processar_outbox(email_service=servico) == 0
+
+def test_prazo_da_reserva_acompanha_o_tamanho_e_o_timeout(app):
+    app.config.update(MAIL_DISPATCH_WORKERS=4, MAIL_POOL_MAX_CONNECTIONS=2, MAIL_TIMEOUT=10, MAIL_SEND_RETRIES=3)
+    assert outbox.prazo_reserva(1) == timedelta(seconds=30) + outbox.MARGEM_RESERVA
+    assert outbox.prazo_reserva(20) == timedelta(seconds=300) + outbox.MARGEM_RESERVA
+
+def test_reserva_renovada_a_cada_sublote(app, monkeypatch):
+    monkeypatch.setattr(outbox, "SUBLOTE_ENVIO", 2)
+    enfileirar(5)
+    prazos = []
+
+    class EmailServiceLento(EmailServiceFalso):
+        def send_many(self, mensagens):
+            # prazo das mensagens ainda reservadas no início de cada sublote
+            prazos.append(db.session.query(db.func.min(EmailOutbox.disponivel_em)).filter(
+                EmailOutbox.status == EmailOutbox.ENVIANDO).scalar())
+            return super().send_many(mensagens)
+
+    servico = EmailServiceLento()
+    assert processar_outbox(tamanho_lote=5, email_service=servico) == 5
+    assert servico.lotes == [2, 2, 1]
+    assert prazos[0] < prazos[1] < prazos[2]
+    assert EmailOutbox.query.filter(EmailOutbox.reservado_por.isnot(None)).count() == 0
+
+def test_mensagem_retomada_por_outro_worker_nao_e_enviada_de_novo(app, monkeypatch):
+    monkeypatch.setattr(outbox, "SUBLOTE_ENVIO", 1)
+    enfileirar(2)
+
+    class EmailServiceConcorrente(EmailServiceFalso):
+        def send_many(self, mensagens):
+            if not self.lotes:
+                # enquanto envia a primeira, outro worker assume a segunda
+                EmailOutbox.query.filter_by(id=2).update({"reservado_por": "outro-host:1"})
+                db.session.commit()
+            return super().send_many(mensagens)
+
+    servico = EmailServiceConcorrente()
+    assert processar_outbox(email_service=servico) == 1
+    assert servico.lotes == [1]
+
+def test_planejador_enfileira_uma_vez_e_worker_grava_historico(app):
+    criar_endividamento(15)
+    db.session.commit()
+    service = NotificacaoEndividamentoService()
+    assert service.enfileirar_notificacoes(HOJE) == 1
+    assert service.enfileirar_notificacoes(HOJE) == 0
+    assert HistoricoNotificacao.query.count() == 0
+
+    assert processar_outbox(email_service=EmailServiceFalso()) == 1
+    historico = HistoricoNotificacao.query.one()
+    assert (historico.tipo_notificacao, historico.sucesso) == ("15_dias", True)
+
+def test_migracao_cria_a_outbox(app, monkeypatch):
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    db.session.execute(text("DROP TABLE email_outbox"))
+    db.session.commit()
+    upgrade(directory=MIGRACOES)
+    inspetor = inspect(db.engine)
+    assert "reservado_por" in {coluna["name"] for coluna in inspetor.get_columns("email_outbox")}
+    assert "idx_email_outbox_status_disponivel" in {indice["name"] for indice in inspetor.get_indexes("email_outbox")}
+    enfileirar(1)
+    assert processar_outbox(email_service=EmailServiceFalso()) == 1
+
+def test_tarefa_celery_drena_a_outbox_no_contexto_da_aplicacao(monkeypatch):
+    from flask import current_app
+    from src.celery_worker import create_celery_app
+    celery = create_celery_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "SECRET_KEY": "test",
+                                "OUTBOX_DRAIN_INTERVAL": 10})
+    celery.conf.task_always_eager = True
+    assert celery.conf.beat_schedule["drenar-outbox-emails"] == {"task": "outbox.drenar_emails", "schedule": 10}
+
+    chamadas = []
+    def processar_falso(tamanho_lote=100):
+        chamadas.append((tamanho_lote, current_app.config["OUTBOX_DRAIN_INTERVAL"]))
+        return 3
+    monkeypatch.setattr(outbox, "processar_outbox", processar_falso)
+    assert celery.tasks["outbox.drenar_emails"].delay(tamanho_lote=5).get() == 3
+    assert chamadas == [(5, 10)]
@@ -0,0 +1,96 @@
+import datetime
+import pytest
+from sqlalchemy import event
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.documento import Documento, TipoDocumento, TipoEntidade
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "RATELIMIT_ENABLED": False
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def percorrer(client, url):
+    itens, cursor = [], None
+    while True:
+        resposta = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert resposta.status_code == 200
+        dados = resposta.get_json()
+        itens.extend(dados["itens"])
+        cursor = dados["next_cursor"]
+        if not cursor:
+            return itens
+
+def test_pessoas_paginadas_por_nome_e_id(client):
+    # nomes repetidos obrigam o desempate pelo id
+    for i in range(7):
+        db.session.add(Pessoa(nome=["Ana", "Bruno", "Ana"][i % 3], cpf_cnpj=f"{i:011d}"))
+    db.session.commit()
+    itens = percorrer(client, "/api/pessoas/?limit=3&fields=id,nome")
+    assert [(p["nome"], p["id"]) for p in itens] == sorted((p.nome, p.id) for p in Pessoa.query.all())
+    assert set(itens[0]) == {"id", "nome"}
+
+def test_documentos_sem_vencimento_ficam_no_fim(client):
+    pessoa = Pessoa(nome="Maria", cpf_cnpj="12345678901")
+    vencimentos = [datetime.date(2025, 3, 1), None, datetime.date(2025, 1, 1), None, datetime.date(2025, 1, 1)]
+    for i, vencimento in enumerate(vencimentos):
+        db.session.add(Documento(
+            nome=f"Doc {i}", tipo=TipoDocumento.CERTIDOES, data_emissao=datetime.date(2024, 1, 1),
+            data_vencimento=vencimento, tipo_entidade=TipoEntidade.PESSOA, pessoa=pessoa
+        ))
+    db.session.commit()
+    itens = percorrer(client, "/api/documentos/?limit=2")
+    assert [d["data_vencimento"] for d in itens] == ["2025-01-01", "2025-01-01", "2025-03-01", None, None]
+    assert len({d["id"] for d in itens}) == 5
+    assert itens[0]["entidade_nome"] == "Maria"
+
+def test_documentos_paginados_sem_or_sobre_nulos(client):
+    pessoa = Pessoa(nome="Maria", cpf_cnpj="12345678901")
+    for i, vencimento in enumerate([datetime.date(2025, 1, i + 1) for i in range(3)] + [None, None]):
+        db.session.add(Documento(
+            nome=f"Doc {i}", tipo=TipoDocumento.CERTIDOES, data_emissao=datetime.date(2024, 1, 1),
+            data_vencimento=vencimento, tipo_entidade=TipoEntidade.PESSOA, pessoa=pessoa
+        ))
+    db.session.commit()
+    executadas = []
+    registrar = lambda *args: executadas.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        itens = percorrer(client, "/api/documentos/?limit=2&fields=id,data_vencimento")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    assert [d["id"] for d in itens] == [1, 2, 3, 4, 5]
+    assert not any(" OR " in sql for sql in executadas)
+    # a última página começa na cauda: só a consulta dos nulos, continuando pelo id
+    assert any("documento.data_vencimento IS NULL AND documento.id >" in sql for sql in executadas)
+
+def test_listagem_sem_limit_mantem_formato_lista(client):
+    db.session.add(Pessoa(nome="Ana", cpf_cnpj="12345678901"))
+    db.session.commit()
+    resposta = client.get("/api/pessoas/?fields=nome")
+    assert resposta.get_json() == [{"nome": "Ana"}]
+
+@pytest.mark.parametrize("url", [
+    "/api/fazendas/?limit=0",
+    "/api/fazendas/?limit=abc",
+    "/api/fazendas/?cursor=naoebase64",
+    "/api/fazendas/?fields=id,senha",
+])
+def test_parametros_invalidos_retornam_400(client, url):
+    resposta = client.get(url)
+    assert resposta.status_code == 400
+    assert "erro" in resposta.get_json()
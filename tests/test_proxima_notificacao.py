@@ -0,0 +1,144 @@
+import datetime
+import logging.config
+import os
+import pytest
+from sqlalchemy import text
+from flask_migrate import upgrade
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.documento import Documento, TipoDocumento, TipoEntidade
+from src.models.endividamento import Endividamento
+from src.models.email_outbox import EmailOutbox
+from src.utils.outbox import processar_outbox
+from src.utils.vencimentos import documentos_por_prazo
+from src.utils.notificacao_endividamento_service import NotificacaoEndividamentoService
+from tests.test_notificacao_endividamento import criar_endividamento
+from tests.test_outbox import EmailServiceFalso
+
+HOJE = datetime.date.today()
+MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'teste.db'}",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def dia(n):
+    return HOJE + datetime.timedelta(days=n)
+
+def criar_documento(dias, prazos):
+    documento = Documento(
+        nome=f"Doc {dias}", tipo=TipoDocumento.CERTIDOES, data_emissao=dia(-400), data_vencimento=dia(dias),
+        tipo_entidade=TipoEntidade.PESSOA, pessoa=Pessoa(nome="Ana", cpf_cnpj=f"{dias:011d}")
+    )
+    documento.prazos_notificacao = prazos
+    db.session.add(documento)
+    db.session.commit()
+    return documento
+
+def test_recalculada_no_flush_quando_vencimento_ou_prazos_mudam(app):
+    documento = criar_documento(20, [30, 15, 7])
+    assert documento.proxima_notificacao == dia(5)
+
+    documento.prazos_notificacao = [7]
+    db.session.commit()
+    assert documento.proxima_notificacao == dia(13)
+
+    documento.data_vencimento = dia(3)
+    db.session.commit()
+    assert documento.proxima_notificacao is None
+
+    # outra alteração não mexe na data
+    documento.data_vencimento = dia(40)
+    db.session.commit()
+    documento.nome = "Renomeado"
+    documento.proxima_notificacao = dia(1)
+    db.session.commit()
+    assert documento.proxima_notificacao == dia(1)
+
+def test_documento_devido_e_avancado_depois_do_envio(app):
+    documento = criar_documento(15, [30, 15, 7])
+    assert documento.proxima_notificacao == HOJE
+    assert {p: [d.id for d in docs] for p, docs in documentos_por_prazo().items()} == {15: [documento.id]}
+
+    documento.avancar_notificacao()
+    db.session.commit()
+    assert documento.proxima_notificacao == dia(8)
+    assert documentos_por_prazo() == {}
+
+    # notificação atrasada continua devida até o vencimento, com os dias reais no texto
+    documento.proxima_notificacao = dia(-2)
+    db.session.commit()
+    assert list(documentos_por_prazo()) == [15]
+
+def test_endividamento_avanca_apos_resultado_final_da_outbox(app):
+    endividamento = criar_endividamento(30)
+    db.session.commit()
+    assert endividamento.proxima_notificacao == HOJE
+
+    service = NotificacaoEndividamentoService()
+    assert service.enfileirar_notificacoes(HOJE) == 1
+    # ainda na fila: não é replanejada nem avançada
+    assert service.planejar_notificacoes(HOJE) == []
+    assert processar_outbox(email_service=EmailServiceFalso()) == 1
+    assert Endividamento.query.one().proxima_notificacao == dia(15)
+
+def test_planejador_avanca_par_ja_finalizado(app):
+    endividamento = criar_endividamento(7)
+    db.session.commit()
+    db.session.add(EmailOutbox(destinatarios="[]", assunto="a", corpo="c", status=EmailOutbox.FALHA,
+                               endividamento_id=endividamento.id, tipo_notificacao="7_dias"))
+    db.session.commit()
+    service = NotificacaoEndividamentoService()
+    assert service.enfileirar_notificacoes(HOJE) == 0
+    assert Endividamento.query.one().proxima_notificacao == dia(4)
+
+def test_endividamento_atrasado_usa_distancia_real_e_alcanca_lembrete_seguinte(app):
+    # criado com 100 dias para o vencimento; as notificações só são configuradas 20 dias depois
+    endividamento = criar_endividamento(80)
+    db.session.commit()
+    endividamento.proxima_notificacao = dia(-10)  # lembrete de 3 meses, calculado na criação
+    db.session.commit()
+
+    service = NotificacaoEndividamentoService()
+    assert service.enfileirar_notificacoes(HOJE) == 1
+    mensagem = EmailOutbox.query.one()
+    assert mensagem.tipo_notificacao == "3_meses"
+    assert "vence em 80 dias" in mensagem.assunto
+    assert processar_outbox(email_service=EmailServiceFalso()) == 1
+    assert Endividamento.query.one().proxima_notificacao == dia(50)
+
+    # parado até faltarem 25 dias: vai direto para o lembrete de 30 dias
+    db.session.delete(mensagem)
+    endividamento = Endividamento.query.one()
+    endividamento.data_vencimento_final = dia(25)
+    db.session.commit()
+    endividamento.proxima_notificacao = dia(-65)
+    db.session.commit()
+    plano = service.planejar_notificacoes(HOJE)
+    assert [tipo for _, tipo in plano] == ["30_dias"]
+    assert service.enfileirar_notificacoes(HOJE) == 1
+    assert "vence em 25 dias" in EmailOutbox.query.one().assunto
+
+def test_migracao_preenche_proxima_notificacao(app, monkeypatch):
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    criar_documento(10, [7, 3])
+    criar_endividamento(100)
+    db.session.commit()
+    db.session.execute(text("UPDATE documento SET proxima_notificacao = NULL"))
+    db.session.execute(text("UPDATE endividamento SET proxima_notificacao = NULL"))
+    db.session.commit()
+
+    upgrade(directory=MIGRACOES)
+    db.session.expire_all()
+    assert Documento.query.one().proxima_notificacao == dia(3)
+    assert Endividamento.query.one().proxima_notificacao == dia(10)
@@ -0,0 +1,99 @@
+import pytest
+from src.main import create_app
+from src.models.db import db
+from src.utils.performance import SlidingWindowRateLimiter
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "RATELIMIT_OVERRIDES": {"endividamento.buscar_pessoas": (2, 60), "endividamento.fluxo_pagamentos": (1, 60)},
+        "RATELIMIT_BLUEPRINTS": {"fazenda": (3, 60)}
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def test_limite_local_bloqueia_apos_maximo():
+    limiter = SlidingWindowRateLimiter()
+    resultados = [limiter.hit("127.0.0.1:rota", 3, 60)[0] for _ in range(5)]
+    assert resultados == [True, True, True, False, False]
+    # Outro escopo tem contador próprio
+    assert limiter.hit("127.0.0.1:outra", 3, 60)[0]
+
+def test_janela_anterior_pesa_proporcionalmente(monkeypatch):
+    import src.utils.performance as performance
+    limiter = SlidingWindowRateLimiter()
+    instante = [1000.0]  # início exato de uma janela de 100s
+    monkeypatch.setattr(performance.time, "time", lambda: instante[0])
+    for _ in range(4):
+        assert limiter.hit("ip:rota", 4, 100)[0]
+    assert not limiter.hit("ip:rota", 4, 100)[0]
+    # Metade da janela seguinte: a anterior ainda conta 50% (2 de 4)
+    instante[0] = 1150.0
+    assert limiter.hit("ip:rota", 4, 100)[0]
+    assert limiter.hit("ip:rota", 4, 100)[0]
+    assert not limiter.hit("ip:rota", 4, 100)[0]
+
+def test_buscar_pessoas_retorna_429(client):
+    respostas = [client.get("/endividamentos/buscar-pessoas?q=jo") for _ in range(3)]
+    assert [r.status_code for r in respostas] == [200, 200, 429]
+    assert respostas[-1].headers["Retry-After"] == "60"
+
+def test_blueprint_api_limitado_por_endpoint(client):
+    codigos = [client.get("/api/fazendas/").status_code for _ in range(4)]
+    assert codigos == [200, 200, 200, 429]
+    # Endpoint diferente do mesmo blueprint não é afetado
+    assert client.get("/api/fazendas/999").status_code == 404
+
+def test_x_forwarded_for_do_cliente_nao_contorna_o_limite(client):
+    codigos = [client.get("/api/fazendas/", headers={"X-Forwarded-For": f"10.0.0.{i}"}).status_code for i in range(4)]
+    assert codigos == [200, 200, 200, 429]
+
+def test_proxy_confiavel_define_o_ip_do_cliente():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "PROXY_FIX_X_FOR": 1,
+        "RATELIMIT_BLUEPRINTS": {"fazenda": (1, 60)}
+    })
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        # só o salto adicionado pelo proxy conta; o valor forjado à esquerda é ignorado
+        assert client.get("/api/fazendas/", headers={"X-Forwarded-For": "1.1.1.1, 10.0.0.1"}).status_code == 200
+        assert client.get("/api/fazendas/", headers={"X-Forwarded-For": "2.2.2.2, 10.0.0.1"}).status_code == 429
+        assert client.get("/api/fazendas/", headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 200
+        db.session.remove()
+        db.drop_all()
+
+def test_contadores_locais_expirados_sao_removidos(monkeypatch):
+    import src.utils.performance as performance
+    limiter = SlidingWindowRateLimiter(intervalo_limpeza=10)
+    instante = [1000.0]
+    monkeypatch.setattr(performance.time, "time", lambda: instante[0])
+    for i in range(50):
+        limiter.hit(f"10.0.0.{i}:rota", 5, 60)
+    assert len(limiter._contadores) == 50
+    # duas janelas depois nenhum desses contadores pesa mais
+    instante[0] = 1000.0 + 180
+    limiter.hit("10.0.1.1:rota", 5, 60)
+    assert list(limiter._contadores) == ["10.0.1.1:rota"]
+
+def test_exportacoes_e_analises_de_endividamento_limitadas(client, monkeypatch):
+    monkeypatch.setattr("src.routes.endividamento.iniciar_job", lambda tipo, funcao: "job")
+    for rota, limite in (("/endividamentos/api/export", 10), ("/endividamentos/api/parcelas/export", 10)):
+        codigos = [client.get(rota).status_code for _ in range(limite + 1)]
+        assert codigos == [200] * limite + [429], rota
+    assert [client.get("/endividamentos/api/fluxo").status_code for _ in range(2)] == [200, 429]
+    codigos = [client.post("/endividamentos/api/processar-notificacoes").status_code for _ in range(6)]
+    assert codigos == [202] * 5 + [429]
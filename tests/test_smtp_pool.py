@@ -0,0 +1,131 @@
+import smtplib
+import threading
+import time
+import pytest
+from flask import Flask
+from src.utils import smtp_pool
+from src.utils.email_service import EmailService
+from src.utils.smtp_pool import SMTPConnectionPool
+
+class SMTPFalso:
+    """Servidor SMTP em memória: registra conexões, logins e mensagens"""
+    conexoes = []
+    mensagens = []
+    falhas = []
+    ativas = 0
+    max_ativas = 0
+    lock = threading.Lock()
+
+    def __init__(self, host, port, timeout=None):
+        SMTPFalso.conexoes.append(self)
+        self.logins = 0
+        self.encerrada = False
+
+    def starttls(self, context=None):
+        pass
+
+    def login(self, usuario, senha):
+        self.logins += 1
+
+    def sendmail(self, remetente, destinatarios, mensagem):
+        with SMTPFalso.lock:
+            SMTPFalso.ativas += 1
+            SMTPFalso.max_ativas = max(SMTPFalso.max_ativas, SMTPFalso.ativas)
+        try:
+            time.sleep(0.01)
+            if SMTPFalso.falhas:
+                raise SMTPFalso.falhas.pop(0)
+            SMTPFalso.mensagens.append((destinatarios, mensagem))
+            return {}
+        finally:
+            with SMTPFalso.lock:
+                SMTPFalso.ativas -= 1
+
+    def quit(self):
+        self.encerrada = True
+
+    def close(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def smtp_falso(monkeypatch):
+    SMTPFalso.conexoes, SMTPFalso.mensagens, SMTPFalso.falhas = [], [], []
+    SMTPFalso.ativas = SMTPFalso.max_ativas = 0
+    monkeypatch.setattr(smtplib, "SMTP", SMTPFalso)
+    monkeypatch.setattr(smtp_pool.time, "sleep", lambda segundos: None)
+    yield SMTPFalso
+    smtp_pool.fechar_pools()
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "MAIL_SERVER": "smtp.local", "MAIL_PORT": 587, "MAIL_USE_TLS": True,
+        "MAIL_USERNAME": "usuario", "MAIL_PASSWORD": "senha",
+        "MAIL_DEFAULT_SENDER": "noreply@gestaofazendas.com.br",
+        "MAIL_POOL_MAX_CONNECTIONS": 2
+    })
+    with app.app_context():
+        yield app
+
+def test_send_many_reutiliza_conexoes_autenticadas(app, smtp_falso):
+    mensagens = [([f"dest{i}@fazenda.com"], f"Aviso {i}", "corpo", False) for i in range(12)]
+    assert EmailService().send_many(mensagens) == [True] * 12
+    assert len(smtp_falso.mensagens) == 12
+    assert len(smtp_falso.conexoes) <= 2
+    assert sum(c.logins for c in smtp_falso.conexoes) == len(smtp_falso.conexoes)
+    assert smtp_falso.max_ativas <= 2
+
+def test_falha_transitoria_e_repetida(smtp_falso):
+    pool = SMTPConnectionPool("smtp.local", 587, "usuario", "senha")
+    smtp_falso.falhas = [smtplib.SMTPServerDisconnected("caiu")]
+    pool.sendmail("a@b.com", ["c@d.com"], "mensagem")
+    assert len(smtp_falso.mensagens) == 1
+    assert len(smtp_falso.conexoes) == 2  # a conexão com erro foi descartada
+
+def test_falha_permanente_nao_e_repetida(smtp_falso):
+    pool = SMTPConnectionPool("smtp.local", 587, "usuario", "senha")
+    smtp_falso.falhas = [smtplib.SMTPDataError(554, b"rejeitada")]
+    with pytest.raises(smtplib.SMTPDataError):
+        pool.sendmail("a@b.com", ["c@d.com"], "mensagem")
+    assert smtp_falso.mensagens == []
+
+def test_send_email_sem_configuracao_retorna_false(app):
+    app.config["MAIL_PASSWORD"] = ""
+    assert EmailService().send_email(["a@b.com"], "Assunto", "corpo") is False
+
+def test_pool_substituido_quando_a_configuracao_muda(smtp_falso):
+    antigo = smtp_pool.obter_pool("smtp.local", 587, "usuario", "senha", True, max_conexoes=2)
+    assert smtp_pool.obter_pool("smtp.local", 587, "usuario", "senha", True, max_conexoes=2) is antigo
+    with antigo.conexao() as emprestada:
+        with antigo.conexao() as ociosa:
+            pass
+        novo = smtp_pool.obter_pool("smtp.local", 587, "usuario", "senha", True, max_conexoes=5)
+        # a ociosa é encerrada na troca; a emprestada, ao ser devolvida
+        assert ociosa.encerrada and not emprestada.encerrada
+    assert emprestada.encerrada and antigo._ociosas == []
+    assert novo is not antigo and novo.max_conexoes == 5
+    assert smtp_pool.obter_pool("smtp.local", 587, "usuario", "outra", True, max_conexoes=5) is not novo
+
+def test_executor_recriado_quando_max_workers_muda():
+    executor = smtp_pool.obter_executor(2)
+    assert smtp_pool.obter_executor(2) is executor
+    maior = smtp_pool.obter_executor(6)
+    assert maior is not executor and maior._max_workers == 6
+    assert maior.submit(lambda: 1).result() == 1
+
+def test_submeter_usa_o_executor_atual_se_o_obtido_foi_encerrado(monkeypatch):
+    antigo = smtp_pool.obter_executor(2)
+    obtidos = [antigo]
+    original = smtp_pool.obter_executor
+    # simula outra thread trocando o executor entre obter e submeter
+    def obter_e_trocar(max_workers=4):
+        if obtidos:
+            executor = obtidos.pop()
+            original(3)
+            return executor
+        return original(max_workers)
+    monkeypatch.setattr(smtp_pool, "obter_executor", obter_e_trocar)
+    assert smtp_pool.submeter(lambda x: x * 2, 21, max_workers=3).result() == 42
+    with pytest.raises(RuntimeError):
+        antigo.submit(lambda: 1)
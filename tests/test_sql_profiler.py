@@ -0,0 +1,69 @@
+import json
+import logging
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.utils import performance
+from src.utils.performance import PerfilSQL, normalizar_sql
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test",
+        "SQL_PROFILER_SAMPLE_RATE": 1.0
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def test_normalizar_sql_agrupa_mesmo_formato():
+    a = normalizar_sql("SELECT * FROM pessoa WHERE id = 1 AND nome = 'Ana'")
+    b = normalizar_sql("SELECT *  FROM pessoa\n WHERE id = 27 AND nome = 'José'")
+    assert a == b
+    assert normalizar_sql("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == "SELECT ? FROM t WHERE id IN (?)"
+
+def test_perfil_detecta_n_mais_1():
+    perfil = PerfilSQL()
+    perfil.registrar("SELECT * FROM pessoa", 0.010)
+    for i in range(6):
+        perfil.registrar(f"SELECT * FROM fazenda WHERE pessoa_id = {i}", 0.001)
+    assert perfil.total == 7
+    assert perfil.mais_lentas(1)[0]["sql"] == "SELECT * FROM pessoa"
+    suspeitas = perfil.suspeitas_n_mais_1(limiar=5)
+    assert len(suspeitas) == 1
+    assert suspeitas[0]["vezes"] == 6
+
+def test_server_timing_e_log_estruturado(app, client, caplog):
+    db.session.add(Pessoa(nome="Ana", cpf_cnpj="11144477735"))
+    db.session.commit()
+    with caplog.at_level(logging.INFO):
+        response = client.get("/api/pessoas/")
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers["Server-Timing"]
+    registros = [json.loads(r.getMessage()) for r in caplog.records if '"perfil_sql"' in r.getMessage()]
+    assert registros and registros[-1]["endpoint"] == "pessoa.listar_pessoas"
+    assert registros[-1]["consultas"] >= 1
+
+def test_consulta_com_erro_nao_desloca_a_medicao_seguinte(app, monkeypatch):
+    relogio = iter([100.0, 200.0, 200.5])
+    monkeypatch.setattr(performance.time, "perf_counter", lambda: next(relogio))
+    with app.test_request_context():
+        with db.engine.connect() as conexao:
+            with pytest.raises(OperationalError):
+                conexao.execute(text("SELECT * FROM tabela_inexistente"))
+            conexao.execute(text("SELECT 1"))
+            assert "_inicio_consultas" not in conexao.info
+        # a instrução que falhou não deixa início pendente; a seguinte é medida sozinha
+        assert performance.g.tempo_db == 0.5
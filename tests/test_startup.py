@@ -0,0 +1,115 @@
+import logging.config
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from flask_migrate import upgrade
+from src.main import create_app
+from src.models.db import db
+from src.utils.performance import PerformanceOptimizer
+
+MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+def configuracao(tmp_path, **extra):
+    return dict({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'startup.db'}",
+        "SECRET_KEY": "test"
+    }, **extra)
+
+def nomes_indices(tabela):
+    return {indice["name"] for indice in inspect(db.engine).get_indexes(tabela)}
+
+@pytest.fixture
+def consultas():
+    executadas = []
+    registrar = lambda *args: executadas.append(args[2])
+    event.listen(Engine, "before_cursor_execute", registrar)
+    yield executadas
+    event.remove(Engine, "before_cursor_execute", registrar)
+
+@pytest.fixture
+def conexoes():
+    abertas = []
+    registrar = lambda *args: abertas.append(args[0])
+    event.listen(Engine, "connect", registrar)
+    yield abertas
+    event.remove(Engine, "connect", registrar)
+
+@pytest.mark.parametrize("modo", ["off", "lazy"])
+def test_create_app_nao_abre_conexao_com_o_banco(tmp_path, consultas, conexoes, modo):
+    # o tempo de inicialização é medido em benchmarks/bench_startup.py
+    app = create_app(configuracao(tmp_path, DB_INIT=modo))
+    assert consultas == []
+    assert conexoes == []
+    with app.app_context():
+        db.engine.dispose()
+
+def test_rotas_so_sao_importadas_pelo_create_app():
+    codigo = (
+        "import sys, io, contextlib\n"
+        "import src.main\n"
+        "assert not [m for m in sys.modules if m.startswith('src.routes')]\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    src.main.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SECRET_KEY': 't', 'DB_INIT': 'off'})\n"
+        "assert 'src.routes.admin' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", codigo], cwd=os.path.dirname(MIGRACOES), check=True)
+
+def test_modo_lazy_cria_tabelas_na_primeira_requisicao(tmp_path, consultas):
+    app = create_app(configuracao(tmp_path, DB_INIT="lazy"))
+    assert consultas == []
+    with app.app_context():
+        assert "pessoa" not in inspect(db.engine).get_table_names()
+        assert app.test_client().get("/health").status_code == 200
+        assert "pessoa" in inspect(db.engine).get_table_names()
+        db.engine.dispose()
+
+def test_ensure_indexes_cria_apenas_os_que_faltam(tmp_path):
+    app = create_app(configuracao(tmp_path))
+    with app.app_context():
+        saida = app.test_cli_runner().invoke(args=["ensure-indexes"]).output
+        assert "idx_endividamento_banco" in saida
+        # documento.data_vencimento já é indexado pelo modelo (index=True)
+        assert "idx_documento_data_vencimento" not in saida
+        assert "idx_endividamento_banco" in nomes_indices("endividamento")
+        assert "Todos os índices já existem" in app.test_cli_runner().invoke(args=["ensure-indexes"]).output
+        db.engine.dispose()
+
+def test_migracao_cria_os_indices(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    app = create_app(configuracao(tmp_path))
+    with app.app_context():
+        upgrade(directory=MIGRACOES)
+        assert {"idx_parcela_pago", "idx_historico_notificacao_data"} <= nomes_indices("parcela") | nomes_indices("historico_notificacao")
+        assert PerformanceOptimizer.create_indexes() == []
+        db.engine.dispose()
+
+def test_migracoes_criam_o_esquema_do_zero(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    app = create_app(configuracao(tmp_path, DB_INIT="off"))
+    with app.app_context():
+        upgrade(directory=MIGRACOES)
+        inspetor = inspect(db.engine)
+        for tabela in db.metadata.sorted_tables:
+            colunas = {coluna["name"] for coluna in inspetor.get_columns(tabela.name)}
+            assert set(tabela.columns.keys()) <= colunas, tabela.name
+            # os índices declarados nos modelos também vêm das migrações
+            assert {indice.name for indice in tabela.indexes} <= nomes_indices(tabela.name), tabela.name
+        assert app.test_client().get("/health").status_code == 200
+        db.engine.dispose()
+
+def test_migracao_cria_indices_da_paginacao_em_banco_existente(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    app = create_app(configuracao(tmp_path))
+    with app.app_context():
+        for nome in ("idx_pessoa_nome_id", "idx_fazenda_nome_id", "idx_documento_vencimento_id"):
+            db.session.execute(text(f"DROP INDEX {nome}"))
+        db.session.commit()
+        upgrade(directory=MIGRACOES)
+        assert "idx_pessoa_nome_id" in nomes_indices("pessoa")
+        assert "idx_fazenda_nome_id" in nomes_indices("fazenda")
+        assert "idx_documento_vencimento_id" in nomes_indices("documento")
+        db.engine.dispose()
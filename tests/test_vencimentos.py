@@ -0,0 +1,96 @@
+import datetime
+import pytest
+from sqlalchemy import event
+from src.main import create_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.models.documento import Documento, TipoDocumento, TipoEntidade
+from src.utils.vencimentos import classificar_documentos, documentos_por_prazo
+
+HOJE = datetime.date.today()
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test"
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def criar_documento(nome, dias, prazos=None, pessoa=None):
+    documento = Documento(
+        nome=nome, tipo=TipoDocumento.CERTIDOES, data_emissao=HOJE - datetime.timedelta(days=400),
+        data_vencimento=None if dias is None else HOJE + datetime.timedelta(days=dias),
+        tipo_entidade=TipoEntidade.PESSOA, pessoa=pessoa or Pessoa(nome=f"Dono {nome}", cpf_cnpj=nome)
+    )
+    if prazos is not None:
+        documento.prazos_notificacao = prazos
+    db.session.add(documento)
+    return documento
+
+def test_agrupa_por_prazo_somente_documentos_que_batem(app):
+    criar_documento("a", 30, [30, 15, 7])
+    criar_documento("b", 15, [30, 15, 7])
+    criar_documento("c", 15, [30, 7])        # 15 dias, mas sem esse prazo
+    criar_documento("d", 7, [7, 0])
+    criar_documento("e", 0, [7, 0])
+    criar_documento("f", 10)                  # sem prazos
+    criar_documento("g", None, [30])          # sem vencimento
+    criar_documento("h", -3, [30])            # vencido
+    db.session.commit()
+
+    agrupados = documentos_por_prazo(HOJE)
+    assert list(agrupados) == [0, 7, 15, 30]
+    assert {p: [d.nome for d in docs] for p, docs in agrupados.items()} == {
+        0: ["e"], 7: ["d"], 15: ["b"], 30: ["a"]
+    }
+
+def test_classificacao_equivale_as_propriedades_do_modelo(app):
+    pessoa = Pessoa(nome="Maria", cpf_cnpj="12345678901")
+    for i in range(40):
+        criar_documento(f"doc{i}", i - 10, [[30, 15, 7, 1], [5, 0], [-1, 3], []][i % 4], pessoa)
+    db.session.commit()
+
+    vencidos, proximos = classificar_documentos(HOJE)
+    todos = Documento.query.all()
+    assert {d.id for d in vencidos} == {d.id for d in todos if d.esta_vencido}
+    assert {d.id for d in proximos} == {d.id for d in todos if not d.esta_vencido and d.precisa_notificar}
+
+def test_carrega_apenas_as_linhas_encontradas(app):
+    pessoa = Pessoa(nome="Maria", cpf_cnpj="12345678901")
+    for i in range(60):
+        criar_documento(f"doc{i}", 100 + i, [30], pessoa)
+    criar_documento("alvo", 30, [30], pessoa)
+    db.session.commit()
+    db.session.expunge_all()
+
+    carregados = []
+    def contar(session, instance):
+        if isinstance(instance, Documento):
+            carregados.append(instance)
+    event.listen(db.session, "loaded_as_persistent", contar)
+    try:
+        agrupados = documentos_por_prazo(HOJE)
+    finally:
+        event.remove(db.session, "loaded_as_persistent", contar)
+    assert [d.nome for d in agrupados[30]] == ["alvo"]
+    assert len(carregados) == 1
+
+def test_api_vencidos(client):
+    criar_documento("vencido", -1, [30])
+    criar_documento("proximo", 30, [30])
+    criar_documento("distante", 31, [30])
+    db.session.commit()
+    dados = client.get("/api/documentos/vencidos").get_json()
+    assert [d["nome"] for d in dados["vencidos"]] == ["vencido"]
+    assert [(d["nome"], d["dias_restantes"]) for d in dados["proximos_vencimento"]] == [("proximo", 30)]
+    assert dados["vencidos"][0]["entidade_nome"] == "Dono vencido"
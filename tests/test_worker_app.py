@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que os workers não devem importar (o tempo de importação é medido
+# em benchmarks/bench_startup.py)
+PESADOS = ("src.routes", "flask_login", "flask_wtf", "wtforms", "flask_migrate", "alembic", "numpy", "celery")
+
+SCRIPT_WORKER = """
+import json
+from src.main import create_worker_app
+from src.models.db import db
+from src.models.pessoa import Pessoa
+from src.utils.dashboard import obter_resumo, reconciliar
+app = create_worker_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'SECRET_KEY': 'teste'})
+with app.app_context():
+    db.create_all()
+    reconciliar()
+    db.session.add(Pessoa(nome='Ana', cpf_cnpj='1'))
+    db.session.commit()
+    print(json.dumps(obter_resumo()))
+"""
+
+def executar(codigo):
+    """Roda ``codigo`` em um interpretador novo com -X importtime; retorna (stdout, {módulo: segundos})"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    modulos = {}
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos[nome[1:].rstrip()] = int(acumulado) / 1e6  # mantém o recuo que indica o nível
+    return resultado.stdout, modulos
+
+def pesados_importados(modulos):
+    nomes = {nome.strip() for nome in modulos}
+    return sorted(nome for nome in nomes if any(nome == p or nome.startswith(p + ".") for p in PESADOS))
+
+def test_importar_main_nao_carrega_rotas_nem_dependencias_pesadas():
+    _, modulos = executar("import src.main")
+    assert pesados_importados(modulos) == []
+
+def test_worker_app_carrega_so_modelos_e_servicos():
+    saida, modulos = executar(SCRIPT_WORKER)
+    assert pesados_importados(modulos) == []
+    # listeners do resumo do dashboard ativos sem a aplicação web
+    assert json.loads(saida.strip().splitlines()[-1])["total_pessoas"] == 1
+
+def test_maintenance_usa_worker_app():
+    os.makedirs(os.path.join(RAIZ, "logs"), exist_ok=True)  # maintenance.py registra em logs/maintenance.log
+    _, modulos = executar("import maintenance")
+    assert pesados_importados(modulos) == []